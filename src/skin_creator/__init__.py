@@ -1,4 +1,64 @@
-from .generator import SkinGenerator
-from .palette import base_palettes, Palette
+"""Minecraft skin generator.
 
-__all__ = ["SkinGenerator", "base_palettes", "Palette"]
+The public names below are imported lazily (PEP 562), so importing the
+package, or a light submodule such as ``palette``, does not pull in
+Pillow, NumPy and the photo pipeline until one of them is first used.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "SkinGenerator": ".generator",
+    "base_palettes": ".palette",
+    "Palette": ".palette",
+    "PhotoSkinGenerator": ".photo",
+    "apply_face_tile": ".photo",
+    "derive_from_photo": ".photo",
+    "derive_palette_from_photo": ".photo",
+    "face_tile_from_photo": ".photo",
+    "load_photo": ".photo",
+    "locate_face": ".face",
+}
+
+if TYPE_CHECKING:
+    from .face import locate_face
+    from .generator import SkinGenerator
+    from .palette import Palette, base_palettes
+    from .photo import (
+        PhotoSkinGenerator,
+        apply_face_tile,
+        derive_from_photo,
+        derive_palette_from_photo,
+        face_tile_from_photo,
+        load_photo,
+    )
+
+
+def __getattr__(name: str) -> object:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+__all__ = [
+    "SkinGenerator",
+    "base_palettes",
+    "Palette",
+    "PhotoSkinGenerator",
+    "apply_face_tile",
+    "derive_from_photo",
+    "derive_palette_from_photo",
+    "face_tile_from_photo",
+    "load_photo",
+    "locate_face",
+]
@@ -0,0 +1,341 @@
+"""Read existing 64x64 skins back and summarise each body part.
+
+Legacy 64x32 skins are upgraded to 64x64 first, as Minecraft does: the
+left limbs reuse the right limbs' texture and the second layer (except the
+head overlay) is empty.
+
+``analyze`` walks a directory (recursively) or a ZIP/TAR archive of PNGs,
+decodes them on a thread pool and computes, per skin and per ``PARTS``
+entry of the classic ``SkinLayout``:
+
+* ``dominant`` / ``secondary``: mean RGBA of the most and second most
+  frequent colour bin (3 bits per channel) among the visible pixels;
+* ``coverage``: fraction of the part's pixels that are not fully
+  transparent (for overlays: how much of the second layer is used);
+* ``translucent``: fraction of pixels with 0 < alpha < 255, which
+  Minecraft renders inconsistently;
+
+plus ``transparency_misuse``, the fraction of base-layer (non-overlay)
+pixels that are not fully opaque, and a derived ``Palette``. Everything is
+written to one columnar ``.npz`` file. Skins are decoded and analysed in
+fixed-size chunks on a thread pool, every statistic computed for the
+whole chunk at once, so memory is bounded by the chunks in flight plus a
+few hundred bytes of results per skin (tens of MB for 100k skins).
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import pathlib
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from .layout import PARTS, SkinLayout, get_layout
+from .palette import PALETTE_FIELDS, Palette
+from .sinks import archive_format
+
+SKIN_SIZE = (64, 64)
+LEGACY_SIZE = (64, 32)
+OVERLAY_PARTS = tuple(part for part in PARTS if part.endswith("_overlay"))
+BASE_PARTS = tuple(part for part in PARTS if part not in OVERLAY_PARTS)
+_BIN_BITS = 3
+_BINS = 1 << (3 * _BIN_BITS)
+
+# Item handed to a decode worker: an entry name plus a path or the raw bytes.
+SourceItem = Tuple[str, Union[pathlib.Path, bytes]]
+
+
+@dataclass
+class AnalysisResult:
+    count: int
+    skipped: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+@lru_cache(maxsize=64)
+def part_map(layout: SkinLayout) -> np.ndarray:
+    """Flat ``(height * width,)`` map of each pixel's index in ``PARTS``, -1 if unused."""
+
+    width, height = layout.size
+    parts = np.full((height, width), -1, dtype=np.int16)
+    for index, name in enumerate(PARTS):
+        faces = getattr(layout, name)
+        if faces is None:
+            continue
+        for x0, y0, x1, y1 in faces:
+            parts[y0:y1, x0:x1] = index
+    parts = parts.ravel()
+    parts.setflags(write=False)
+    return parts
+
+
+def iter_sources(source: Union[str, pathlib.Path]) -> Iterator[SourceItem]:
+    """Yield ``(name, path_or_bytes)`` for every PNG under a directory or in an archive.
+
+    Directories are walked in sorted order and only paths are yielded, so
+    the file reads happen in the decode workers. Archive members are read
+    here, one at a time, because archive handles are not thread-safe.
+    """
+
+    source = pathlib.Path(source)
+    if source.is_dir():
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".png"):
+                    path = pathlib.Path(root) / name
+                    yield path.relative_to(source).as_posix(), path
+        return
+
+    if archive_format(source) == "zip":
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".png"):
+                    yield info.filename, archive.read(info)
+        return
+
+    with tarfile.open(source, "r:*") as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith(".png"):
+                yield member.name, archive.extractfile(member).read()
+
+
+def upgrade_legacy(pixels: np.ndarray) -> np.ndarray:
+    """Turn a ``(32, 64, 4)`` legacy skin into the ``(64, 64, 4)`` format.
+
+    The game mirrors the right limbs onto the left ones; a plain copy of
+    each limb's UV block gives the same per-part statistics.
+    """
+
+    upgraded = np.zeros((SKIN_SIZE[1], SKIN_SIZE[0], 4), dtype=np.uint8)
+    upgraded[:32] = pixels
+    upgraded[48:64, 16:32] = pixels[16:32, 0:16]  # right leg -> left leg
+    upgraded[48:64, 32:48] = pixels[16:32, 40:56]  # right arm -> left arm
+    return upgraded
+
+
+def decode_skin(data: Union[pathlib.Path, bytes]) -> Optional[np.ndarray]:
+    """Decode one skin to a ``(64, 64, 4)`` array, or ``None`` if it is not a 64x64 or 64x32 image."""
+
+    try:
+        if isinstance(data, pathlib.Path):
+            data = data.read_bytes()
+        with Image.open(io.BytesIO(data)) as image:
+            if image.size == LEGACY_SIZE:
+                return upgrade_legacy(np.asarray(image.convert("RGBA")))
+            if image.size != SKIN_SIZE:
+                return None
+            return np.asarray(image.convert("RGBA"))
+    except (OSError, UnidentifiedImageError):
+        return None
+
+
+T = TypeVar("T")
+
+
+def map_chunks(
+    items: Iterator[SourceItem],
+    func: Callable[[List[SourceItem]], T],
+    workers: int | None = None,
+    chunk_size: int = 128,
+) -> Iterator[T]:
+    """Apply ``func`` to successive chunks of ``items`` on a thread pool, in order.
+
+    At most ``2 * workers`` chunks are in flight, so memory does not grow
+    with the number of skins. Pillow decodes and most NumPy kernels release
+    the GIL, so threads scale without the pickling cost of processes.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Future] = deque()
+
+        def submit() -> bool:
+            chunk = list(islice(items, chunk_size))
+            if chunk:
+                pending.append(pool.submit(func, chunk))
+            return bool(chunk)
+
+        while len(pending) < workers * 2 and submit():
+            pass
+        while pending:
+            result = pending.popleft().result()
+            submit()
+            yield result
+
+
+def _top_two(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    rows = np.arange(len(counts))
+    first = counts.argmax(axis=1)
+    masked = counts.copy()
+    masked[rows, first] = -1
+    second = masked.argmax(axis=1)
+    return first, np.where(masked[rows, second] > 0, second, -1)
+
+
+def _bin_means(packed: np.ndarray, groups: np.ndarray, bins: np.ndarray, target: np.ndarray, count: int) -> np.ndarray:
+    """Mean RGBA per group over the pixels whose bin equals the group's ``target`` bin."""
+
+    hit = bins == target[groups]
+    hit_groups, hit_pixels = groups[hit], packed[hit]
+    totals = np.maximum(np.bincount(hit_groups, minlength=count), 1)
+    means = np.zeros((count, 4), dtype=np.uint8)
+    for channel in range(4):
+        values = (hit_pixels >> (8 * channel)) & 0xFF
+        means[:, channel] = np.round(np.bincount(hit_groups, weights=values, minlength=count) / totals)
+    return means
+
+
+def analyze_pixels(pixels: np.ndarray, layout: SkinLayout | None = None) -> Dict[str, np.ndarray]:
+    """Per-part statistics for a ``(N, 64, 64, 4)`` batch of skins.
+
+    Pixels are handled as packed little-endian ``uint32`` RGBA and every
+    statistic is a ``bincount`` over (skin, part) group ids, so the cost is
+    a handful of passes over the batch regardless of the number of parts.
+    """
+
+    layout = layout or get_layout()
+    parts = part_map(layout)
+    used = np.flatnonzero(parts >= 0)
+    count = len(pixels)
+    part_count = len(PARTS)
+    groups_total = count * part_count
+    packed = np.ascontiguousarray(pixels).view("<u4").reshape(count, len(parts))[:, used].ravel()
+    groups = (np.arange(count, dtype=np.int64)[:, None] * part_count + parts[used][None, :]).ravel()
+    sizes = np.bincount(parts[used], minlength=part_count)
+
+    alpha = packed >> 24
+    visible = alpha > 0
+    packed, groups, alpha = packed[visible], groups[visible], alpha[visible]
+    coverage = np.bincount(groups, minlength=groups_total).reshape(count, part_count) / sizes
+    translucent = np.bincount(groups[alpha < 255], minlength=groups_total).reshape(count, part_count) / sizes
+    base = [PARTS.index(part) for part in BASE_PARTS]
+    misuse = ((1 - coverage) + translucent)[:, base] @ sizes[base] / sizes[base].sum()
+
+    mask, shift = (1 << _BIN_BITS) - 1, 8 - _BIN_BITS
+    bins = (
+        (((packed >> shift) & mask) << (2 * _BIN_BITS))
+        | (((packed >> (8 + shift)) & mask) << _BIN_BITS)
+        | ((packed >> (16 + shift)) & mask)
+    ).astype(np.int64)
+    counts = np.bincount(groups * _BINS + bins, minlength=groups_total * _BINS).reshape(groups_total, _BINS)
+    first, second = _top_two(counts)
+    dominant = _bin_means(packed, groups, bins, first, groups_total)
+    secondary = _bin_means(packed, groups, bins, second, groups_total)
+    empty = counts.max(axis=1) == 0
+    dominant[empty] = 0
+    return {
+        "dominant": dominant.reshape(count, part_count, 4),
+        "secondary": secondary.reshape(count, part_count, 4),
+        "coverage": coverage.astype(np.float32),
+        "translucent": translucent.astype(np.float32),
+        "transparency_misuse": misuse.astype(np.float32),
+    }
+
+
+def _analyze_chunk(chunk: List[SourceItem]) -> Tuple[List[str], Optional[Dict[str, np.ndarray]], int]:
+    decoded = [(name, decode_skin(data)) for name, data in chunk]
+    decoded = [(name, pixels) for name, pixels in decoded if pixels is not None]
+    skipped = len(chunk) - len(decoded)
+    if not decoded:
+        return [], None, skipped
+    stats = analyze_pixels(np.stack([pixels for _, pixels in decoded]))
+    stats.update(palette_columns(stats))
+    return [name for name, _ in decoded], stats, skipped
+
+
+def palette_columns(stats: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Derive ``palette_<field>`` columns (``(N, 4)`` uint8) from part statistics.
+
+    skin, shirt and pants are the dominant colours of head, body and right
+    leg; hair is the head overlay's when it covers at least a tenth of it,
+    else the head's second colour; accent is the body's second colour.
+    """
+
+    dominant, secondary = stats["dominant"], stats["secondary"]
+    head, overlay, body, leg = (PARTS.index(part) for part in ("head", "head_overlay", "body", "right_leg"))
+    has_hair = stats["coverage"][:, overlay, None] >= 0.1
+    accent = np.where(secondary[:, body, 3:] > 0, secondary[:, body], dominant[:, body])
+    return {
+        "palette_skin": dominant[:, head],
+        "palette_hair": np.where(has_hair, dominant[:, overlay], secondary[:, head]),
+        "palette_shirt": dominant[:, body],
+        "palette_pants": dominant[:, leg],
+        "palette_accent": accent,
+    }
+
+
+def analyze(
+    source: Union[str, pathlib.Path],
+    out: Union[str, pathlib.Path],
+    workers: int | None = None,
+    chunk_size: int = 128,
+) -> AnalysisResult:
+    """Analyse every 64x64 or 64x32 PNG under ``source`` and write the columns to ``out`` (.npz).
+
+    Files of other sizes (or not images) are skipped and counted.
+    """
+
+    started = time.perf_counter()
+    names: List[str] = []
+    columns: Dict[str, List[np.ndarray]] = {}
+    skipped = 0
+    chunks = map_chunks(iter_sources(source), _analyze_chunk, workers=workers, chunk_size=chunk_size)
+    for chunk_names, stats, chunk_skipped in chunks:
+        skipped += chunk_skipped
+        if stats is None:
+            continue
+        names.extend(chunk_names)
+        for key, value in stats.items():
+            columns.setdefault(key, []).append(value)
+
+    if columns:
+        arrays = {key: np.concatenate(values) for key, values in columns.items()}
+    else:  # no skins: write empty columns of the usual shapes
+        arrays = analyze_pixels(np.zeros((0, *SKIN_SIZE[::-1], 4), dtype=np.uint8))
+        arrays.update(palette_columns(arrays))
+    out = pathlib.Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(out, name=np.array(names), parts=np.array(PARTS), **arrays)
+    return AnalysisResult(count=len(names), skipped=skipped, elapsed=time.perf_counter() - started)
+
+
+def load_palettes(path: Union[str, pathlib.Path]) -> Iterator[Tuple[str, Palette]]:
+    """Yield ``(name, Palette)`` for each skin in an analysis file."""
+
+    with np.load(path) as data:
+        if len(data["name"]) == 0:
+            return
+        fields = [data[f"palette_{field}"] for field in PALETTE_FIELDS]
+        for index, name in enumerate(data["name"]):
+            yield str(name), Palette(*(tuple(int(v) for v in column[index]) for column in fields))
+
+
+__all__ = [
+    "AnalysisResult",
+    "analyze",
+    "analyze_pixels",
+    "decode_skin",
+    "iter_sources",
+    "load_palettes",
+    "map_chunks",
+    "palette_columns",
+    "part_map",
+    "upgrade_legacy",
+]
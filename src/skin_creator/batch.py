@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import astuple, dataclass, field, replace
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar, Union
+
+from PIL import Image
+
+from .dedupe import DEFAULT_MAX_DISTANCE, HashIndex, skin_hash
+from .export import PngOptions, encode_png
+from .generator import GENERATOR_VERSION, SkinGenerator
+from .palette import Palette
+from .photo import PHOTO_ALGORITHM_VERSION, apply_face_tile, derive_palette_from_photo, face_tile_from_photo, load_photo
+from .sinks import DirectorySink, SkinSink
+
+# Written next to the skins by ``run_incremental``.
+MANIFEST_NAME = ".skin-manifest.json"
+MANIFEST_VERSION = 1
+
+# Re-seeded near-duplicates use seed + attempt * RESEED_STRIDE, far away
+# from any seed range a batch would normally cover.
+RESEED_STRIDE = 1 << 32
+# Seeds rendered per palette to tell whether the hash can tell seeds apart.
+SEED_PROBES = 4
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """A single skin to render: a named palette plus the seed for its accents.
+
+    Jobs with a ``photo`` also get that photo's face tile; their palette is
+    the one derived from the photo (see ``iter_photo_jobs``). Their files
+    are named ``photo-<stem>-<digest>_<seed>.png``, with the first eight hex
+    digits of the photo's SHA-256 (``photo_digest``, computed if not given),
+    so photos sharing a stem, or named like a palette, never overwrite each
+    other.
+    """
+
+    palette_name: str
+    palette: Palette
+    seed: int
+    accent_mode: str = "compat"
+    layout: str = "classic"
+    scale: int = 1
+    photo: Optional[str] = None
+    photo_digest: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.photo is not None and self.photo_digest is None:
+            object.__setattr__(self, "photo_digest", _file_digest(self.photo))
+
+    @property
+    def filename(self) -> str:
+        if self.photo is not None:
+            return f"photo-{self.palette_name}-{self.photo_digest[:8]}_{self.seed}.png"
+        return f"{self.palette_name}_{self.seed}.png"
+
+
+@dataclass
+class BatchResult:
+    """``count`` skins written, plus what incremental runs and duplicate filtering skipped."""
+
+    count: int
+    elapsed: float
+    unchanged: int = 0
+    removed: int = 0
+    rejected: int = 0
+    reseeded: int = 0
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+def parse_seed_range(text: str) -> range:
+    """Parse ``START:STOP`` (stop exclusive) or a single ``SEED`` into a range."""
+
+    if ":" in text:
+        start, stop = text.split(":", 1)
+        return range(int(start), int(stop))
+    seed = int(text)
+    return range(seed, seed + 1)
+
+
+def iter_jobs(
+    palettes: Mapping[str, Palette],
+    names: Sequence[str],
+    seeds: Iterable[int],
+    accent_mode: str = "compat",
+    layout: str = "classic",
+    scale: int = 1,
+) -> Iterator[BatchJob]:
+    """Expand palettes x seeds into jobs lazily, ordered palette-major.
+
+    Every job carries its own seed, so the pixels of a given (palette, seed)
+    pair never depend on which worker renders it or in which order.
+    """
+
+    for name in names:
+        for seed in seeds:
+            yield BatchJob(name, palettes[name], seed, accent_mode, layout, scale)
+
+
+def iter_photo_jobs(
+    photos: Iterable[Union[str, pathlib.Path]],
+    seeds: Iterable[int],
+    accent_mode: str = "compat",
+    layout: str = "classic",
+    scale: int = 1,
+) -> Iterator[BatchJob]:
+    """Jobs rendering each photo's derived palette and face tile for every seed.
+
+    Jobs are named after the photo's stem and digest (see ``BatchJob``).
+    Each photo is decoded here once to derive its palette; the workers
+    decode it again for the face tile, so the output matches
+    ``PhotoSkinGenerator`` for the same seed.
+    """
+
+    for photo in photos:
+        path = pathlib.Path(photo)
+        palette = derive_palette_from_photo(load_photo(path))
+        digest = _file_digest(str(path))
+        for seed in seeds:
+            yield BatchJob(path.stem, palette, seed, accent_mode, layout, scale, str(path), digest)
+
+
+def build_jobs(
+    palettes: Mapping[str, Palette],
+    names: Sequence[str],
+    seeds: Iterable[int],
+    accent_mode: str = "compat",
+    layout: str = "classic",
+    scale: int = 1,
+) -> List[BatchJob]:
+    return list(iter_jobs(palettes, names, list(seeds), accent_mode, layout, scale))
+
+
+@lru_cache(maxsize=16)
+def _face_tile(photo: str, size: int) -> Image.Image:
+    return face_tile_from_photo(load_photo(photo), size=size)
+
+
+def render_job(job: BatchJob) -> Image.Image:
+    generator = SkinGenerator(
+        palette=job.palette, seed=job.seed, accent_mode=job.accent_mode, layout=job.layout, scale=job.scale
+    )
+    image = generator.generate()
+    if job.photo is not None:
+        image = apply_face_tile(image, _face_tile(job.photo, 8 * job.scale), generator.layout, in_place=True)
+    return image
+
+
+def encode_job(job: BatchJob, png: PngOptions = PngOptions()) -> bytes:
+    return encode_png(render_job(job), png)
+
+
+def encode_hashed_job(job: BatchJob, png: PngOptions = PngOptions()) -> Tuple[bytes, int]:
+    """The job's PNG bytes plus its ``skin_hash``, computed where it is rendered."""
+
+    image = render_job(job)
+    return encode_png(image, png), skin_hash(image)
+
+
+T = TypeVar("T")
+
+
+def _encode_chunk(chunk: List[BatchJob], png: PngOptions, encode: Callable[[BatchJob, PngOptions], T]) -> List[T]:
+    return [encode(job, png) for job in chunk]
+
+
+def iter_encoded(
+    jobs: Iterable[BatchJob],
+    workers: int | None = None,
+    png: PngOptions = PngOptions(),
+    chunk_size: int = 32,
+    encode: Callable[[BatchJob, PngOptions], T] = encode_job,
+) -> Iterator[Tuple[BatchJob, T]]:
+    """Yield ``(job, encode(job, png))`` in job order, rendering on a process pool.
+
+    Jobs are pulled lazily and sent to the workers in chunks, with at most
+    two chunks per worker outstanding. A new chunk is only submitted once
+    the consumer has taken the oldest one, so a slow consumer (a disk that
+    cannot keep up) throttles rendering and memory stays bounded by
+    ``workers * 2 * chunk_size`` encoded skins, however long ``jobs`` is.
+    ``workers=1`` renders in-process. ``encode`` must be a module-level
+    function so it can be sent to the workers; it defaults to PNG bytes.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    jobs = iter(jobs)
+    if workers == 1:
+        for job in jobs:
+            yield job, encode(job, png)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Tuple[List[BatchJob], Future]] = deque()
+
+        def submit() -> bool:
+            chunk = list(islice(jobs, chunk_size))
+            if chunk:
+                pending.append((chunk, pool.submit(_encode_chunk, chunk, png, encode)))
+            return bool(chunk)
+
+        while len(pending) < workers * 2 and submit():
+            pass
+        while pending:
+            chunk, future = pending.popleft()
+            encoded = future.result()
+            submit()
+            yield from zip(chunk, encoded)
+
+
+def seeds_distinguishable(job: BatchJob, max_distance: int = DEFAULT_MAX_DISTANCE) -> bool:
+    """Whether other seeds of ``job``'s palette (and photo) hash more than ``max_distance`` apart.
+
+    Seeds only move the accent dots, which barely touch the hash, so with
+    the default distance every seed of a palette is usually a near-duplicate
+    of the others; ``SEED_PROBES`` re-seeded renders tell.
+    """
+
+    probes = [replace(job, seed=job.seed + probe * RESEED_STRIDE) for probe in range(SEED_PROBES)]
+    hashes = [skin_hash(render_job(probe)) for probe in probes]
+    return any(bin(hashes[0] ^ value).count("1") > max_distance for value in hashes[1:])
+
+
+@dataclass
+class DuplicateFilter:
+    """Rejects skins within ``max_distance`` bits of one already in ``index``.
+
+    A near-duplicate is re-rendered with up to ``reseeds`` other seeds (see
+    ``RESEED_STRIDE``) before it is dropped. Accepted skins are added to
+    ``index``, which may be pre-loaded to dedupe against earlier batches.
+
+    The first job of each palette (and photo) is probed with
+    ``seeds_distinguishable``. If seeds cannot be told apart, at most one
+    skin of that palette is kept, re-seeding is skipped for it as it could
+    never succeed, the palette's name is added to ``indistinct``, and
+    ``on_indistinct`` (if given) is called with the name straight away.
+    """
+
+    index: HashIndex = field(default_factory=HashIndex)
+    max_distance: int = DEFAULT_MAX_DISTANCE
+    reseeds: int = 0
+    on_indistinct: Optional[Callable[[str], None]] = None
+    rejected: int = 0
+    reseeded: int = 0
+    indistinct: List[str] = field(default_factory=list)
+    _probed: Dict[tuple, bool] = field(default_factory=dict, repr=False)
+
+    def _can_reseed(self, job: BatchJob) -> bool:
+        key = (job.palette, job.accent_mode, job.layout, job.scale, job.photo)
+        if key not in self._probed:
+            self._probed[key] = seeds_distinguishable(job, self.max_distance)
+            if not self._probed[key]:
+                self.indistinct.append(job.palette_name)
+                if self.on_indistinct is not None:
+                    self.on_indistinct(job.palette_name)
+        return self._probed[key]
+
+    def admit(
+        self, job: BatchJob, data: bytes, value: int, png: PngOptions = PngOptions()
+    ) -> Optional[Tuple[BatchJob, bytes]]:
+        """Return the job (possibly re-seeded) and PNG to write, or ``None`` to drop it."""
+
+        candidate = job
+        reseeds = self.reseeds if self._can_reseed(job) else 0
+        for attempt in range(reseeds + 1):
+            if attempt:
+                candidate = replace(job, seed=job.seed + attempt * RESEED_STRIDE)
+                data, value = encode_hashed_job(candidate, png)
+            if self.index.nearest(value, self.max_distance) is None:
+                self.index.add(value)
+                if attempt:
+                    self.reseeded += 1
+                return candidate, data
+        self.rejected += 1
+        return None
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    sink: SkinSink,
+    workers: int | None = None,
+    png: PngOptions = PngOptions(),
+    duplicates: DuplicateFilter | None = None,
+) -> BatchResult:
+    """Render ``jobs`` over a process pool and hand each PNG to ``sink``.
+
+    With ``duplicates``, skins are hashed in the workers and near-duplicates
+    are re-seeded (in this process) or dropped before reaching the sink.
+    The sink is closed when the batch finishes.
+    """
+
+    started = time.perf_counter()
+    count = 0
+    with sink:
+        if duplicates is None:
+            encoded = iter_encoded(jobs, workers=workers, png=png)
+        else:
+            admitted = (
+                duplicates.admit(job, data, value, png)
+                for job, (data, value) in iter_encoded(jobs, workers=workers, png=png, encode=encode_hashed_job)
+            )
+            encoded = (item for item in admitted if item is not None)
+        for job, data in encoded:
+            sink.write(job.filename, data, _job_meta(job))
+            count += 1
+    result = BatchResult(count=count, elapsed=time.perf_counter() - started)
+    if duplicates is not None:
+        result.rejected, result.reseeded = duplicates.rejected, duplicates.reseeded
+    return result
+
+
+def _job_meta(job: BatchJob) -> dict:
+    meta = {"palette": job.palette_name, "seed": job.seed}
+    if job.photo is not None:
+        meta["photo"] = job.photo
+    return meta
+
+
+def job_fingerprint(job: BatchJob, png: PngOptions = PngOptions(), photo_digest: str | None = None) -> str:
+    """SHA-256 over everything that determines a job's PNG bytes.
+
+    That is the palette colours (not its name), seed, accent mode, layout,
+    scale, PNG options and ``GENERATOR_VERSION``, plus for photo jobs the
+    SHA-256 of the photo (``photo_digest``) and ``PHOTO_ALGORITHM_VERSION``.
+    """
+
+    inputs = {
+        "generator": GENERATOR_VERSION,
+        "palette": astuple(job.palette),
+        "seed": job.seed,
+        "accent_mode": job.accent_mode,
+        "layout": job.layout,
+        "scale": job.scale,
+        "png": astuple(png),
+    }
+    if job.photo is not None:
+        inputs["photo"] = (photo_digest, PHOTO_ALGORITHM_VERSION)
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("ascii")).hexdigest()
+
+
+def load_manifest(path: Union[str, pathlib.Path]) -> Dict[str, dict]:
+    """Entries of a build manifest by file name; empty if missing, unreadable or of another version.
+
+    ``run_incremental`` deletes files by these names, so entries that are
+    not a bare file name in the manifest's directory (``../x``, ``a/b``,
+    absolute paths) are dropped.
+    """
+
+    try:
+        manifest = json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    entries = manifest.get("entries")
+    if not isinstance(entries, dict):
+        return {}
+    return {name: entry for name, entry in entries.items() if _is_file_name(name) and isinstance(entry, dict)}
+
+
+def _is_file_name(name: str) -> bool:
+    return (
+        name not in ("", ".", "..")
+        and "/" not in name
+        and "\\" not in name
+        and pathlib.PurePath(name).name == name
+        and not pathlib.PureWindowsPath(name).drive
+    )
+
+
+def save_manifest(path: Union[str, pathlib.Path], entries: Mapping[str, dict]) -> None:
+    """Write the manifest atomically (temporary file plus ``os.replace``)."""
+
+    path = pathlib.Path(path)
+    payload = json.dumps({"version": MANIFEST_VERSION, "entries": dict(sorted(entries.items()))}, indent=1)
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False, encoding="utf-8") as handle:
+        handle.write(payload + "\n")
+    os.replace(handle.name, path)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_incremental(
+    jobs: Iterable[BatchJob],
+    directory: Union[str, pathlib.Path],
+    workers: int | None = None,
+    png: PngOptions = PngOptions(),
+) -> BatchResult:
+    """Like ``run_batch`` into ``directory``, but only render what changed.
+
+    ``MANIFEST_NAME`` in the directory maps each file to the
+    ``job_fingerprint`` it was rendered from and its size. A job is skipped
+    when its file still has that fingerprint and size; otherwise it is
+    rendered again. Files listed in the manifest that no job produces any
+    more are deleted; files the manifest does not know are left alone. The
+    manifest is rewritten even if rendering fails part-way, so finished
+    skins are not rendered twice.
+    """
+
+    started = time.perf_counter()
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / MANIFEST_NAME
+    previous = load_manifest(manifest_path)
+    entries: Dict[str, dict] = {}
+    stale: List[Tuple[BatchJob, str]] = []
+    unchanged = 0
+    for job in jobs:
+        fingerprint = job_fingerprint(job, png, job.photo_digest)
+        entry = previous.get(job.filename)
+        if entry is not None:
+            # Kept even when stale, so an interrupted run still tracks the file.
+            entries[job.filename] = entry
+        if entry is not None and entry.get("fingerprint") == fingerprint and _has_size(directory / job.filename, entry):
+            unchanged += 1
+        else:
+            stale.append((job, fingerprint))
+
+    removed = 0
+    for name in previous.keys() - entries.keys() - {job.filename for job, _ in stale}:
+        try:
+            (directory / name).unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    count = 0
+    fingerprints = {job.filename: fingerprint for job, fingerprint in stale}
+    try:
+        with DirectorySink(directory) as sink:
+            for job, data in iter_encoded((job for job, _ in stale), workers=workers, png=png):
+                sink.write(job.filename, data, _job_meta(job))
+                entries[job.filename] = {"fingerprint": fingerprints[job.filename], "bytes": len(data)}
+                count += 1
+    finally:
+        save_manifest(manifest_path, entries)
+    return BatchResult(count=count, elapsed=time.perf_counter() - started, unchanged=unchanged, removed=removed)
+
+
+def _has_size(path: pathlib.Path, entry: dict) -> bool:
+    try:
+        return path.stat().st_size == entry.get("bytes")
+    except OSError:
+        return False
+
+
+__all__ = [
+    "MANIFEST_NAME",
+    "BatchJob",
+    "BatchResult",
+    "DuplicateFilter",
+    "build_jobs",
+    "encode_hashed_job",
+    "encode_job",
+    "iter_encoded",
+    "iter_jobs",
+    "iter_photo_jobs",
+    "job_fingerprint",
+    "load_manifest",
+    "parse_seed_range",
+    "render_job",
+    "run_batch",
+    "run_incremental",
+    "save_manifest",
+    "seeds_distinguishable",
+]
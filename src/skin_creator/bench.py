@@ -0,0 +1,483 @@
+"""Per-stage benchmarks with a stored baseline and a regression gate.
+
+Run from the repository root::
+
+    python -m src.skin_creator.bench                    # compare with the baseline
+    python -m src.skin_creator.bench --save-baseline    # record a new baseline
+
+Each stage is timed in isolation on synthetic inputs generated locally, so
+the suite needs no fixtures. Stages whose fastest repeat exceeds the
+baseline by more than ``--threshold`` are reported and make the command
+exit with 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import pathlib
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .analysis import analyze_pixels
+from .compositor import Layer, LayerStack
+from .dedupe import HashIndex, skin_hashes
+from .export import PngOptions, encode_png
+from .face import locate_faces
+from .generator import SkinGenerator, TemplateCache, accent_boxes, scatter_accent, scatter_accent_bulk
+from .layout import LAYOUT_NAMES, SCALES, SkinLayout, build_layout, get_layout
+from .library import PaletteLibrary
+from .palette import PALETTE_FIELDS, Palette, base_palettes
+from .photo import (
+    QUANTIZERS,
+    _quantized_colors,
+    apply_face_tile,
+    derive_palette_from_photo,
+    face_tile_from_photo,
+    load_photo,
+)
+from .preview import projection_table, render_isometric
+
+DEFAULT_BASELINE = pathlib.Path("benchmarks/baseline.json")
+PHOTO_SIZES = {"small": (320, 240), "medium": (1600, 1200), "large": (4000, 3000)}
+
+Setup = Callable[[], Callable[[], object]]
+STAGES: Dict[str, Setup] = {}
+
+
+def stage(name: str) -> Callable[[Setup], Setup]:
+    """Register a stage; the decorated setup returns the callable to time."""
+
+    def register(setup: Setup) -> Setup:
+        STAGES[name] = setup
+        return setup
+
+    return register
+
+
+def synthetic_photo(size, seed: int = 0) -> Image.Image:
+    """A portrait-like test image: smooth gradients, a bright oval and noise."""
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    u, v = xs / width, ys / height
+    pixels = np.stack([90 + 120 * u, 60 + 80 * v, 140 - 60 * u * v], axis=-1)
+    face = ((u - 0.5) / 0.22) ** 2 + ((v - 0.45) / 0.3) ** 2 < 1
+    pixels[face] = (214, 176, 150)
+    pixels += rng.normal(0, 12, pixels.shape).astype(np.float32)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+
+def synthetic_jpeg(size, seed: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    synthetic_photo(size, seed).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+@stage("layout")
+def _layout() -> Callable[[], object]:
+    return SkinLayout  # a fresh classic layout; get_layout would only time a lookup
+
+
+for _name in LAYOUT_NAMES:
+
+    @stage(f"build_layout[{_name}]")
+    def _build_layout(name=_name) -> Callable[[], object]:
+        return lambda: build_layout(name)
+
+    @stage(f"generate_layout[{_name}]")
+    def _generate_layout(name=_name) -> Callable[[], object]:
+        palette = base_palettes()["classic"]
+        seeds = iter(range(10**9))
+        return lambda: SkinGenerator(palette, seed=next(seeds), layout=name).generate()
+
+
+for _name, _palette in base_palettes().items():
+
+    @stage(f"generate[{_name}]")
+    def _generate(palette=_palette) -> Callable[[], object]:
+        seeds = iter(range(10**9))
+        return lambda: SkinGenerator(palette, seed=next(seeds)).generate()
+
+    @stage(f"generate_uncached[{_name}]")
+    def _generate_uncached(palette=_palette) -> Callable[[], object]:
+        def run():
+            return SkinGenerator(palette, seed=1, cache=TemplateCache(maxsize=1)).generate()
+
+        return run
+
+
+for _scale in SCALES:
+
+    @stage(f"generate_scale[x{_scale}]")
+    def _generate_scale(scale=_scale) -> Callable[[], object]:
+        palette = base_palettes()["classic"]
+        seeds = iter(range(10**9))
+
+        def run():
+            return SkinGenerator(palette, seed=next(seeds), scale=scale, cache=TemplateCache(maxsize=1)).generate()
+
+        return run
+
+
+@stage("scatter_accent")
+def _scatter_accent() -> Callable[[], object]:
+    palette = base_palettes()["classic"]
+    boxes = accent_boxes(get_layout())
+    draw = ImageDraw.Draw(Image.new("RGBA", (64, 64)))
+    return lambda: scatter_accent(draw, boxes, palette, random.Random(1), probability=0.04)
+
+
+@stage("scatter_accent_bulk")
+def _scatter_accent_bulk() -> Callable[[], object]:
+    palette = base_palettes()["classic"]
+    boxes = accent_boxes(get_layout())
+    draw = ImageDraw.Draw(Image.new("RGBA", (64, 64)))
+    return lambda: scatter_accent_bulk(draw, boxes, palette, random.Random(1), probability=0.04)
+
+
+for _label, _size in PHOTO_SIZES.items():
+
+    @stage(f"load_photo[{_label}]")
+    def _load(size=_size) -> Callable[[], object]:
+        data = synthetic_jpeg(size)
+        return lambda: load_photo(io.BytesIO(data))
+
+    @stage(f"derive_palette_from_photo[{_label}]")
+    def _derive(size=_size) -> Callable[[], object]:
+        image = load_photo(io.BytesIO(synthetic_jpeg(size)))
+        return lambda: derive_palette_from_photo(image)
+
+    @stage(f"face_tile_from_photo[{_label}]")
+    def _face(size=_size) -> Callable[[], object]:
+        image = load_photo(io.BytesIO(synthetic_jpeg(size)))
+        return lambda: face_tile_from_photo(image)
+
+    for _quantizer in QUANTIZERS:
+
+        @stage(f"quantize[{_quantizer}][{_label}]")
+        def _quantize(size=_size, quantizer=_quantizer) -> Callable[[], object]:
+            image = synthetic_photo(size)
+            return lambda: _quantized_colors(image, quantizer=quantizer)
+
+
+@stage("locate_faces[64]")
+def _locate_faces() -> Callable[[], object]:
+    images = [synthetic_photo(PHOTO_SIZES["small"], seed) for seed in range(64)]
+    return lambda: locate_faces(images)
+
+
+@stage("apply_face_tile")
+def _apply_face() -> Callable[[], object]:
+    generator = SkinGenerator(base_palettes()["classic"], seed=1)
+    skin = generator.generate()
+    face = face_tile_from_photo(synthetic_photo(PHOTO_SIZES["small"]))
+    return lambda: apply_face_tile(skin, face, generator.layout)
+
+
+for _scale in SCALES[1:]:
+
+    @stage(f"apply_face_tile[x{_scale}]")
+    def _apply_face_scaled(scale=_scale) -> Callable[[], object]:
+        generator = SkinGenerator(base_palettes()["classic"], seed=1, scale=scale)
+        skin = generator.generate()
+        face = face_tile_from_photo(synthetic_photo(PHOTO_SIZES["small"]), size=8 * scale)
+        return lambda: apply_face_tile(skin, face, generator.layout)
+
+
+@stage("palette_nearest[10k]")
+def _palette_nearest() -> Callable[[], object]:
+    rng = np.random.default_rng(0)
+    colors = rng.integers(0, 256, size=(10_000, len(PALETTE_FIELDS), 4), dtype=np.uint8)
+    colors[..., 3] = 255
+    library = PaletteLibrary([f"p{index}" for index in range(len(colors))], colors)
+    palette = base_palettes()["forest"]
+    library.nearest(palette)
+    return lambda: library.nearest(palette)
+
+
+@stage("analyze_pixels[128]")
+def _analyze_pixels() -> Callable[[], object]:
+    palettes = list(base_palettes().values())
+    skins = [
+        np.asarray(SkinGenerator(palettes[seed % len(palettes)], seed=seed).generate()) for seed in range(128)
+    ]
+    pixels = np.stack(skins)
+    return lambda: analyze_pixels(pixels)
+
+
+@stage("skin_hashes[128]")
+def _skin_hashes() -> Callable[[], object]:
+    palettes = list(base_palettes().values())
+    pixels = np.stack(
+        [np.asarray(SkinGenerator(palettes[seed % len(palettes)], seed=seed).generate()) for seed in range(128)]
+    )
+    return lambda: skin_hashes(pixels)
+
+
+@stage("hash_index_query[1M]")
+def _hash_index_query() -> Callable[[], object]:
+    rng = np.random.default_rng(0)
+    index = HashIndex(rng.integers(0, 1 << 63, size=1_000_000, dtype=np.uint64))
+    value = int(index.hashes[123_456]) ^ 0b101
+    index.query(value)
+    return lambda: index.query(value)
+
+
+@stage("isometric_render[128]")
+def _isometric_render() -> Callable[[], object]:
+    palettes = list(base_palettes().values())
+    pixels = np.stack(
+        [np.asarray(SkinGenerator(palettes[seed % len(palettes)], seed=seed).generate()) for seed in range(128)]
+    )
+    layout = get_layout()
+    return lambda: render_isometric(pixels, layout)
+
+
+@stage("projection_table")
+def _projection_table() -> Callable[[], object]:
+    layout = get_layout()
+    return lambda: projection_table.__wrapped__(layout)
+
+
+def _decal_stack() -> LayerStack:
+    generator = SkinGenerator(base_palettes()["classic"], seed=1)
+    face = face_tile_from_photo(synthetic_photo(PHOTO_SIZES["small"]))
+    stack = LayerStack(generator.generate(), base_key=("classic", 1)).push(
+        Layer("face", face, generator.layout.head.front[:2], key="face")
+    )
+    for index in range(4):
+        decal = Image.new("RGBA", (4, 4), (255, 255, 255, 96 + 32 * index))
+        stack = stack.push(Layer(f"decal{index}", decal, (20 + 4 * index, 22), key=index))
+    return stack
+
+
+@stage("layer_stack")
+def _layer_stack() -> Callable[[], object]:
+    stack = _decal_stack()
+    return stack.render
+
+
+@stage("layer_stack_cached")
+def _layer_stack_cached() -> Callable[[], object]:
+    stack, cache = _decal_stack(), TemplateCache(maxsize=4)
+    return lambda: stack.render(cache)
+
+
+@stage("png_encode")
+def _png_encode() -> Callable[[], object]:
+    skin = SkinGenerator(base_palettes()["classic"], seed=1).generate()
+    return lambda: skin.save(io.BytesIO(), format="PNG")
+
+
+@stage("png_encode_indexed")
+def _png_encode_indexed() -> Callable[[], object]:
+    skin = SkinGenerator(base_palettes()["classic"], seed=1).generate()
+    options = PngOptions(indexed=True)
+    return lambda: encode_png(skin, options)
+
+
+def measure(func: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> Dict[str, float]:
+    """Time ``func`` like ``timeit.autorange``: calibrate a loop count, then repeat."""
+
+    func()  # warm caches and lazy imports
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeat or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / (repeat * 10) else 2
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number * 1000)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def run(names: Sequence[str], min_time: float = 0.2, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name in names:
+        results[name] = measure(STAGES[name](), min_time=min_time, repeat=repeat)
+        print(f"{name:45s} {results[name]['median_ms']:10.4f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Return a line per stage slower than ``1 + threshold`` times the baseline.
+
+    Stages are compared on their fastest repeat, which is far less sensitive
+    to noisy neighbours than the median.
+    """
+
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = result["min_ms"] / reference["min_ms"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {result['min_ms']:.4f} ms vs baseline {reference['min_ms']:.4f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def _palette_distance(a: Palette, b: Palette) -> float:
+    """Mean RGB distance between the matching fields of two palettes."""
+
+    first = np.array([getattr(a, field)[:3] for field in PALETTE_FIELDS], dtype=np.float64)
+    second = np.array([getattr(b, field)[:3] for field in PALETTE_FIELDS], dtype=np.float64)
+    return float(np.linalg.norm(first - second, axis=1).mean())
+
+
+def _perturbations(image: Image.Image, seed: int = 1) -> Dict[str, Image.Image]:
+    """Variants of ``image`` a stable quantiser should map to nearly the same palette."""
+
+    width, height = image.size
+    rng = np.random.default_rng(seed)
+    noisy = np.asarray(image, dtype=np.float32) + rng.normal(0, 6, (height, width, 3)).astype(np.float32)
+    return {
+        "shift": image.crop((width // 50, height // 50, width, height)),
+        "noise": Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8), "RGB"),
+        "rescale": image.resize((width * 3 // 4, height * 3 // 4), Image.BILINEAR),
+    }
+
+
+def palette_stability(sizes: Dict[str, tuple] = PHOTO_SIZES) -> Dict[str, Dict[str, float]]:
+    """Palette drift per quantiser when the photo is shifted, re-noised or rescaled.
+
+    Each value is the mean RGB distance (0-441) between the palette of the
+    original photo and that of the perturbed one; lower is more stable.
+    """
+
+    stability: Dict[str, Dict[str, float]] = {}
+    for label, size in sizes.items():
+        image = synthetic_photo(size)
+        variants = _perturbations(image)
+        for quantizer in QUANTIZERS:
+            reference = derive_palette_from_photo(image, quantizer=quantizer)
+            drift = {
+                name: _palette_distance(reference, derive_palette_from_photo(variant, quantizer=quantizer))
+                for name, variant in variants.items()
+            }
+            drift["mean"] = statistics.mean(drift.values())
+            stability[f"{quantizer}[{label}]"] = drift
+            print(f"stability {quantizer}[{label}]".ljust(45) + f" {drift['mean']:10.2f}", file=sys.stderr)
+    return stability
+
+
+def scaling(results: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Fit how ``generate_scale`` time grows with the pixel count.
+
+    Returns the nanoseconds per output pixel at each scale and the slope of
+    log(time) against log(pixels): 1.0 is linear, below 1 means fixed
+    per-skin overhead is still visible at the small sizes.
+    """
+
+    points = []
+    report: Dict[str, float] = {}
+    for scale in SCALES:
+        result = results.get(f"generate_scale[x{scale}]")
+        if result is None:
+            continue
+        pixels = (64 * scale) ** 2
+        points.append((np.log(pixels), np.log(result["min_ms"])))
+        report[f"ns_per_pixel[x{scale}]"] = result["min_ms"] * 1e6 / pixels
+    if len(points) >= 2:
+        xs, ys = np.array(points).T
+        report["slope"] = float(np.polyfit(xs, ys, 1)[0])
+    return report
+
+
+def _report(results: Dict[str, Dict[str, float]]) -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark each skin pipeline stage.")
+    parser.add_argument("--stage", dest="stages", action="append", help="Stage to run (repeatable; substring match).")
+    parser.add_argument("--list", action="store_true", help="List the stage names and exit.")
+    parser.add_argument("--out", type=pathlib.Path, help="Write the results JSON here.")
+    parser.add_argument("--baseline", type=pathlib.Path, default=DEFAULT_BASELINE, help="Baseline JSON to compare with.")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown before a stage counts as a regression (0.25 = 25%%).",
+    )
+    parser.add_argument("--min-time", type=float, default=0.2, help="Approximate seconds spent per stage.")
+    parser.add_argument(
+        "--scaling",
+        action="store_true",
+        help="Run the generate_scale stages and report ns per pixel and the log-log slope (1.0 = linear).",
+    )
+    parser.add_argument(
+        "--stability",
+        action="store_true",
+        help="Also measure palette drift per quantiser under crop, noise and rescale (not part of the gate).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    patterns = (args.stages or []) + (["generate_scale"] if args.scaling else [])
+    names = [name for name in STAGES if not patterns or any(part in name for part in patterns)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    report = _report(run(names, min_time=args.min_time))
+    if args.scaling:
+        report["scaling"] = scaling(report["results"])
+        for key, value in report["scaling"].items():
+            print(f"scaling {key}".ljust(45) + f" {value:10.4f}", file=sys.stderr)
+    if args.stability:
+        report["stability"] = palette_stability()
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+    baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare(report["results"], baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
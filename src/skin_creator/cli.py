@@ -2,16 +2,130 @@ from __future__ import annotations
 
 import argparse
 import pathlib
+import sys
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, List, Sequence
 
-from . import SkinGenerator, base_palettes
+# Everything heavier than argparse is imported where it is used, so each
+# subcommand only pays for the modules it needs.
+if TYPE_CHECKING:
+    from .export import PngOptions
 
 
-def parse_args() -> argparse.Namespace:
+def add_accent_mode_argument(parser: argparse.ArgumentParser) -> None:
+    from .generator import ACCENT_MODES
+
+    parser.add_argument(
+        "--accent-mode",
+        choices=ACCENT_MODES,
+        default="compat",
+        help=(
+            "Accent RNG: 'compat' reproduces skins from earlier releases for the same "
+            "seed, 'v2' is faster but places dots differently."
+        ),
+    )
+
+
+def add_layout_argument(parser: argparse.ArgumentParser) -> None:
+    from .layout import LAYOUT_NAMES, SCALES
+
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUT_NAMES,
+        default="classic",
+        help="Skin format: 'classic' (64x64, 4px arms), 'slim' (64x64, 3px \"Alex\" arms) or 'legacy' (64x32).",
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        choices=SCALES,
+        default=1,
+        help=(
+            "HD factor: 2, 4 or 8 give 128x128, 256x256 or 512x512 skins for HD resource packs. "
+            "The design is the 1x skin upscaled with nearest neighbour; only a photo face is pasted at full detail."
+        ),
+    )
+
+
+def add_png_arguments(parser: argparse.ArgumentParser) -> None:
+    from .export import PNG_STRATEGIES
+
+    parser.add_argument(
+        "--indexed",
+        action="store_true",
+        help="Write palettised PNGs with a tRNS chunk (lossless, verified, about half the size).",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        choices=range(10),
+        default=6,
+        metavar="0-9",
+        help="zlib compression level (defaults to 6).",
+    )
+    parser.add_argument(
+        "--compress-strategy",
+        choices=sorted(PNG_STRATEGIES),
+        default="default",
+        help="zlib strategy for the PNG encoder.",
+    )
+
+
+def add_dedupe_arguments(parser: argparse.ArgumentParser) -> None:
+    from .dedupe import DEFAULT_MAX_DISTANCE
+
+    parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help=(
+            f"Hashes at most this many bits apart count as near-duplicates (defaults to "
+            f"{DEFAULT_MAX_DISTANCE}; skins of different built-in palettes are 6+ apart)."
+        ),
+    )
+    parser.add_argument(
+        "--hash-index",
+        type=pathlib.Path,
+        default=None,
+        help="A .npy hash index to dedupe against; created or extended with the kept skins.",
+    )
+
+
+def check_skin_source(parser: argparse.ArgumentParser, source: pathlib.Path) -> None:
+    """Reject a skin source that is neither a directory nor a readable archive."""
+
+    from .sinks import archive_format
+
+    if source.is_dir():
+        return
+    if not source.exists():
+        parser.error(f"{source} does not exist")
+    try:
+        archive_format(source)
+    except ValueError as error:
+        parser.error(str(error))
+
+
+def png_options(args: argparse.Namespace) -> PngOptions:
+    from .export import PngOptions
+
+    return PngOptions(indexed=args.indexed, compress_level=args.compress_level, strategy=args.compress_strategy)
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    from .palette import base_palettes
+
     parser = argparse.ArgumentParser(
         description=(
-            "Generate a ready-to-upload 64x64 Minecraft skin PNG that works "
+            "Generate a ready-to-upload Minecraft skin PNG that works "
             "with editors like minecraftskins.com and Novaskin."
-        )
+        ),
+        epilog=(
+            "Subcommands: 'batch' for parallel batch generation, 'serve' for the HTTP service, "
+            "'worker' for JSON-lines jobs on stdin, 'analyze' to summarise existing skins, "
+            "'dedupe' to find near-duplicate skins, 'contact-sheet' to preview many skins at once, "
+            "'ingest' to turn folders of photos into skins."
+        ),
     )
     parser.add_argument(
         "--palette",
@@ -25,27 +139,577 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional RNG seed to keep accent placement deterministic.",
     )
+    add_accent_mode_argument(parser)
+    add_layout_argument(parser)
     parser.add_argument(
         "--out",
         type=pathlib.Path,
         required=True,
         help="Output PNG path. The parent directory is created if needed.",
     )
-    return parser.parse_args()
+    add_png_arguments(parser)
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="PATH",
+        help="Dump a per-stage timing breakdown as JSON to PATH (stderr if omitted).",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="With --profile, also record the tracemalloc peak of each stage.",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
+def parse_batch_args(argv: Sequence[str]) -> argparse.Namespace:
+    from .batch import parse_seed_range
+    from .palette import base_palettes
+
+    parser = argparse.ArgumentParser(
+        prog="skin_creator.cli batch",
+        description="Generate many skins in one run, spread over all CPU cores.",
+    )
+    parser.add_argument(
+        "--palette",
+        dest="palettes",
+        nargs="+",
+        choices=sorted(base_palettes().keys()),
+        default=None,
+        help="One or more palette styles; every palette is rendered for every seed (defaults to classic).",
+    )
+    parser.add_argument(
+        "--photo",
+        dest="photos",
+        nargs="+",
+        type=pathlib.Path,
+        default=[],
+        help=(
+            "Photos to render for every seed with their derived palette and face, named "
+            "photo-<photo stem>-<8 hex digits of its SHA-256>_<seed>.png. Without --palette only "
+            "the photos are rendered."
+        ),
+    )
+    parser.add_argument(
+        "--seeds",
+        type=parse_seed_range,
+        default=range(0, 1),
+        help="Seed range as START:STOP (stop exclusive) or a single seed. Defaults to 0.",
+    )
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument(
+        "--out-dir",
+        type=pathlib.Path,
+        help="Directory for the PNGs, named <palette>_<seed>.png. Created if needed.",
+    )
+    output.add_argument(
+        "--archive",
+        type=pathlib.Path,
+        help=(
+            "Stream the PNGs into a .zip, .tar or .tar.gz archive instead, with a "
+            "<archive>.manifest.jsonl listing palette, seed and SHA-256 per entry."
+        ),
+    )
+    add_accent_mode_argument(parser)
+    add_layout_argument(parser)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (defaults to the CPU count; 1 renders in-process).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "With --out-dir, only render skins whose inputs changed since the last run "
+            "(tracked in a manifest in the directory) and delete ones no longer requested."
+        ),
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Drop skins that are near-duplicates (by perceptual hash) of one already written.",
+    )
+    parser.add_argument(
+        "--reseed",
+        type=int,
+        default=0,
+        metavar="N",
+        help="With --dedupe, try up to N other seeds for a near-duplicate before dropping it.",
+    )
+    add_dedupe_arguments(parser)
+    add_png_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.incremental and args.archive:
+        parser.error("--incremental needs --out-dir")
+    if args.incremental and args.dedupe:
+        parser.error("--dedupe cannot be combined with --incremental")
+    if args.palettes is None:
+        args.palettes = [] if args.photos else ["classic"]
+    return args
+
+
+def batch_main(argv: Sequence[str]) -> None:
+    from itertools import chain
+
+    from .batch import DuplicateFilter, iter_jobs, iter_photo_jobs, run_batch, run_incremental
+    from .dedupe import HashIndex
+    from .palette import base_palettes
+    from .sinks import ArchiveSink, DirectorySink
+
+    args = parse_batch_args(argv)
+
+    def warn_indistinct(name: str) -> None:
+        print(
+            f"warning: seeds of {name!r} only move accent dots and hash within --max-distance "
+            f"{args.max_distance} of each other; --dedupe keeps at most one {name!r} skin"
+            + (" and --reseed cannot help" if args.reseed else ""),
+            file=sys.stderr,
+        )
+
+    jobs = chain(
+        iter_jobs(base_palettes(), args.palettes, args.seeds, args.accent_mode, args.layout, args.scale),
+        iter_photo_jobs(args.photos, args.seeds, args.accent_mode, args.layout, args.scale),
+    )
+    if args.incremental:
+        result = run_incremental(jobs, args.out_dir, workers=args.workers, png=png_options(args))
+        print(
+            f"Rebuilt {result.count} skins in {args.out_dir.resolve()} ({result.unchanged} unchanged, "
+            f"{result.removed} orphans removed) in {result.elapsed:.2f}s"
+        )
+        return
+    destination = args.archive or args.out_dir
+    sink = ArchiveSink(args.archive) if args.archive else DirectorySink(args.out_dir)
+    duplicates = None
+    if args.dedupe:
+        index = HashIndex.load(args.hash_index) if args.hash_index and args.hash_index.exists() else HashIndex()
+        duplicates = DuplicateFilter(
+            index, max_distance=args.max_distance, reseeds=args.reseed, on_indistinct=warn_indistinct
+        )
+    result = run_batch(jobs, sink, workers=args.workers, png=png_options(args), duplicates=duplicates)
+    print(
+        f"Saved {result.count} skins to {destination.resolve()} "
+        f"in {result.elapsed:.2f}s ({result.rate:.1f} skins/sec)"
+    )
+    if duplicates is not None:
+        print(f"Near-duplicates: {result.reseeded} re-seeded, {result.rejected} dropped")
+        if args.hash_index:
+            duplicates.index.save(args.hash_index)
+
+
+def parse_serve_args(argv: Sequence[str]) -> argparse.Namespace:
+    from .server import DEFAULT_TIMEOUT
+
+    parser = argparse.ArgumentParser(
+        prog="skin_creator.cli serve",
+        description="Serve skins over HTTP: GET /skin?palette=..&seed=.. or POST a photo to /photo.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (defaults to localhost only).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (0 picks a free port).")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Render threads (defaults to the CPU count).",
+    )
+    parser.add_argument(
+        "--photo-cache",
+        type=pathlib.Path,
+        default=None,
+        help="Directory for the on-disk cache of photo-derived palettes and face tiles.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=(
+            f"Seconds a client may take to send its request, or to accept each chunk of the "
+            f"response (defaults to {DEFAULT_TIMEOUT:g})."
+        ),
+    )
+    add_png_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    return args
+
+
+def serve_main(argv: Sequence[str]) -> None:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .photo import PhotoCache
+    from .server import SkinServer
+
+    args = parse_serve_args(argv)
+    server = SkinServer(
+        host=args.host,
+        port=args.port,
+        executor=ThreadPoolExecutor(max_workers=args.workers),
+        photo_cache=PhotoCache(args.photo_cache) if args.photo_cache else None,
+        png=png_options(args),
+        timeout=args.timeout,
+    )
+
+    async def run() -> None:
+        await server.start()
+        print(f"Serving skins on http://{server.host}:{server.port}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_analyze_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="skin_creator.cli analyze",
+        description=(
+            "Summarise existing 64x64 skins per body part (dominant colours, overlay "
+            "coverage, transparency misuse) into a columnar .npz file."
+        ),
+    )
+    parser.add_argument("source", type=pathlib.Path, help="Directory of PNGs (searched recursively) or a .zip/.tar archive.")
+    parser.add_argument("--out", type=pathlib.Path, required=True, help="Output .npz path.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Decode threads (defaults to the CPU count).",
+    )
+    parser.add_argument("--chunk-size", type=int, default=128, help="Skins analysed per batch (bounds memory).")
+    return parser.parse_args(argv)
+
+
+def analyze_main(argv: Sequence[str]) -> None:
+    from .analysis import analyze
+
+    args = parse_analyze_args(argv)
+    result = analyze(args.source, args.out, workers=args.workers, chunk_size=args.chunk_size)
+    print(
+        f"Analysed {result.count} skins ({result.skipped} skipped) into {args.out.resolve()} "
+        f"in {result.elapsed:.2f}s ({result.rate:.1f} skins/sec)"
+    )
+
+
+def parse_dedupe_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="skin_creator.cli dedupe",
+        description=(
+            "List skins that are near-duplicates of an earlier skin (in sorted path order) "
+            "by perceptual hash, and optionally delete them."
+        ),
+    )
+    parser.add_argument("source", type=pathlib.Path, help="Directory of PNGs (searched recursively) or a .zip/.tar archive.")
+    add_dedupe_arguments(parser)
+    parser.add_argument("--delete", action="store_true", help="Delete the duplicates (directories only).")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Hashing threads (defaults to the CPU count).",
+    )
+    args = parser.parse_args(argv)
+    check_skin_source(parser, args.source)
+    if args.delete and not args.source.is_dir():
+        parser.error("--delete needs a directory")
+    return args
+
+
+def dedupe_main(argv: Sequence[str]) -> None:
+    from .dedupe import HashIndex, find_duplicates
+
+    args = parse_dedupe_args(argv)
+    index = HashIndex.load(args.hash_index) if args.hash_index and args.hash_index.exists() else HashIndex()
+    before = len(index)
+    count = 0
+    for duplicate in find_duplicates(args.source, args.max_distance, index, workers=args.workers):
+        print(f"{duplicate.name}\t{duplicate.original}\t{duplicate.distance}")
+        if args.delete:
+            (args.source / duplicate.name).unlink()
+        count += 1
+    if args.hash_index:
+        index.save(args.hash_index)
+    action = "deleted" if args.delete else "found"
+    print(f"{count} near-duplicates {action}, {len(index) - before} unique skins kept", file=sys.stderr)
+
+
+def parse_contact_sheet_args(argv: Sequence[str]) -> argparse.Namespace:
+    from .palette import parse_hex_color
+    from .preview import DEFAULT_ZOOM, VIEW_NAMES
+
+    parser = argparse.ArgumentParser(
+        prog="skin_creator.cli contact-sheet",
+        description=(
+            "Render isometric previews of many skins and tile them into contact sheet PNGs, "
+            "plus an index.tsv mapping sheet positions to skin names."
+        ),
+    )
+    parser.add_argument("source", type=pathlib.Path, help="Directory of PNGs (searched recursively) or a .zip/.tar archive.")
+    parser.add_argument("--out-dir", type=pathlib.Path, required=True, help="Directory for sheet_NNNN.png and index.tsv.")
+    parser.add_argument("--columns", type=int, default=40, help="Skins per sheet row (defaults to 40).")
+    parser.add_argument("--rows", type=int, default=25, help="Rows per sheet (defaults to 25).")
+    parser.add_argument(
+        "--view",
+        dest="views",
+        nargs="+",
+        choices=VIEW_NAMES,
+        default=list(VIEW_NAMES),
+        help="Views shown side by side for each skin (defaults to front and back).",
+    )
+    parser.add_argument(
+        "--zoom",
+        type=int,
+        default=DEFAULT_ZOOM,
+        help=f"Preview pixels per skin pixel (defaults to {DEFAULT_ZOOM}).",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=("classic", "slim"),
+        default=None,
+        help="Layout of square skins (guessed per skin by default; 64x32 skins are always legacy).",
+    )
+    parser.add_argument(
+        "--background",
+        type=parse_hex_color,
+        default=(0, 0, 0, 0),
+        help="Sheet background as rrggbb or rrggbbaa (defaults to transparent).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Render threads (defaults to the CPU count).",
+    )
+    args = parser.parse_args(argv)
+    check_skin_source(parser, args.source)
+    if args.columns < 1 or args.rows < 1 or args.zoom < 1:
+        parser.error("--columns, --rows and --zoom must be positive")
+    return args
+
+
+def contact_sheet_main(argv: Sequence[str]) -> None:
+    import time
+
+    from .analysis import iter_sources
+    from .export import PngOptions, save_png
+    from .preview import iter_contact_sheets
+
+    args = parse_contact_sheet_args(argv)
+    started = time.perf_counter()
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    sheets = iter_contact_sheets(
+        iter_sources(args.source),
+        columns=args.columns,
+        rows=args.rows,
+        square=args.layout,
+        views=args.views,
+        zoom=args.zoom,
+        background=args.background,
+        workers=args.workers,
+    )
+    count = skins = 0
+    with (args.out_dir / "index.tsv").open("w", encoding="utf-8") as index:
+        index.write("sheet\trow\tcolumn\tname\n")
+        for count, sheet in enumerate(sheets, start=1):
+            filename = f"sheet_{count - 1:04d}.png"
+            save_png(sheet.image, args.out_dir / filename, PngOptions(compress_level=1))
+            for position, name in enumerate(sheet.names):
+                row, column = divmod(position, sheet.columns)
+                index.write(f"{filename}\t{row}\t{column}\t{name}\n")
+            skins += len(sheet.names)
+    print(
+        f"Wrote {count} contact sheets of {skins} skins to {args.out_dir.resolve()} "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+
+def parse_ingest_args(argv: Sequence[str]) -> argparse.Namespace:
+    from .ingest import STAGES
+    from .photo import QUANTIZERS
+
+    parser = argparse.ArgumentParser(
+        prog="skin_creator.cli ingest",
+        description=(
+            "Turn a folder of photos into skins, overlapping file reads, decoding, palette "
+            "derivation and rendering. Exits with status 1 if any photo failed."
+        ),
+    )
+    parser.add_argument("source", type=pathlib.Path, help="A photo, or a directory of photos (searched recursively).")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument(
+        "--out-dir",
+        type=pathlib.Path,
+        help="Directory for the skins, at the photos' relative paths with a .png suffix.",
+    )
+    output.add_argument(
+        "--archive",
+        type=pathlib.Path,
+        help="Stream the skins into a .zip, .tar or .tar.gz archive instead, with a manifest.",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Seed for every skin (random if omitted).")
+    add_accent_mode_argument(parser)
+    add_layout_argument(parser)
+    parser.add_argument("--quantizer", choices=QUANTIZERS, default="mediancut", help="Photo colour extraction method.")
+    parser.add_argument(
+        "--photo-cache",
+        type=pathlib.Path,
+        default=None,
+        help="Directory for the on-disk cache of photo-derived palettes and face tiles.",
+    )
+    for stage in STAGES:
+        parser.add_argument(
+            f"--{stage}-workers",
+            type=int,
+            default=None,
+            help=f"Threads for the {stage} stage (defaults to {4 if stage == 'read' else 'the CPU count'}).",
+        )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Photos in the pipeline at once, bounding memory (defaults to 4 per thread).",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress on stderr.")
+    add_png_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def ingest_main(argv: Sequence[str]) -> None:
+    from .ingest import STAGES, IngestProgress, ingest_photos, iter_photos
+    from .photo import PhotoCache
+    from .sinks import ArchiveSink, DirectorySink
+
+    args = parse_ingest_args(argv)
+    photos = list(iter_photos(args.source))
+    workers = {stage: getattr(args, f"{stage}_workers") for stage in STAGES}
+
+    def report(progress: IngestProgress) -> None:
+        print(
+            f"\r{progress.done + progress.failed}/{progress.total} photos, {progress.failed} failed, "
+            f"{progress.rate:.1f} skins/sec",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    destination = args.archive or args.out_dir
+    result = ingest_photos(
+        photos,
+        ArchiveSink(args.archive) if args.archive else DirectorySink(args.out_dir),
+        seed=args.seed,
+        accent_mode=args.accent_mode,
+        layout=args.layout,
+        scale=args.scale,
+        quantizer=args.quantizer,
+        png=png_options(args),
+        cache=PhotoCache(args.photo_cache) if args.photo_cache else None,
+        workers={stage: count for stage, count in workers.items() if count is not None},
+        max_in_flight=args.max_in_flight,
+        total=len(photos),
+        progress=None if args.quiet else report,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    for name, error in result.failures:
+        print(f"{name}: {error}", file=sys.stderr)
+    busy = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result.busy.items())
+    print(
+        f"Saved {result.count} skins to {destination.resolve()} ({result.failed} failed) "
+        f"in {result.elapsed:.2f}s ({result.rate:.1f} skins/sec; busy: {busy})"
+    )
+    if result.failures:
+        sys.exit(1)
+
+
+def parse_worker_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="skin_creator.cli worker",
+        description=(
+            "Render skins for JSON-lines jobs read from stdin, writing one JSON result "
+            "line per job to stdout, until stdin is closed."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Render threads (defaults to the CPU count, at most 4).",
+    )
+    parser.add_argument(
+        "--photo-cache",
+        type=pathlib.Path,
+        default=None,
+        help="Directory for the on-disk cache of photo-derived palettes and face tiles.",
+    )
+    add_png_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def worker_main(argv: Sequence[str]) -> None:
+    from .photo import PhotoCache
+    from .worker import JsonLinesWorker
+
+    args = parse_worker_args(argv)
+    worker = JsonLinesWorker(
+        workers=args.workers,
+        png=png_options(args),
+        photo_cache=PhotoCache(args.photo_cache) if args.photo_cache else None,
+    )
+    stats = worker.serve(sys.stdin, sys.stdout)
+    print(
+        f"Ran {stats.count} jobs ({stats.failed} failed) in {stats.elapsed:.2f}s ({stats.rate:.1f} jobs/sec)",
+        file=sys.stderr,
+    )
+
+
+COMMANDS = {
+    "analyze": analyze_main,
+    "batch": batch_main,
+    "contact-sheet": contact_sheet_main,
+    "dedupe": dedupe_main,
+    "ingest": ingest_main,
+    "serve": serve_main,
+    "worker": worker_main,
+}
+
+
+def main(argv: List[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        COMMANDS[argv[0]](argv[1:])
+        return
+
+    from .export import save_png
+    from .generator import SkinGenerator
+    from .palette import base_palettes
+    from .profiling import Profiler, stage
+
+    args = parse_args(argv)
     palettes = base_palettes()
     palette = palettes[args.palette]
 
-    generator = SkinGenerator(palette=palette, seed=args.seed)
-    image = generator.generate()
+    profiler = Profiler(trace_memory=args.profile_memory) if args.profile else nullcontext()
+    with profiler:
+        generator = SkinGenerator(
+            palette=palette, seed=args.seed, accent_mode=args.accent_mode, layout=args.layout, scale=args.scale
+        )
+        image = generator.generate()
 
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    image.save(args.out, format="PNG")
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with stage("png.encode", pixels=image.width * image.height):
+            save_png(image, args.out, png_options(args))
     print(f"Saved skin to {args.out.resolve()}")
 
+    if args.profile == "-":
+        print(profiler.to_json(), file=sys.stderr)
+    elif args.profile:
+        pathlib.Path(args.profile).write_text(profiler.to_json() + "\n")
+
 
 if __name__ == "__main__":
     main()
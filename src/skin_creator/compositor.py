@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Hashable, Optional, Tuple
+
+from PIL import Image
+
+from .generator import TemplateCache
+from .layout import Box
+from .profiling import stage
+
+
+@dataclass(frozen=True)
+class Layer:
+    """An RGBA image placed at ``origin`` on the skin canvas.
+
+    ``key`` identifies the layer's content for ``LayerStack`` caching; a
+    layer without a key makes every stack containing it uncacheable.
+    """
+
+    name: str
+    image: Image.Image
+    origin: Tuple[int, int] = (0, 0)
+    key: Optional[Hashable] = None
+
+    @property
+    def box(self) -> Box:
+        x, y = self.origin
+        return (x, y, x + self.image.width, y + self.image.height)
+
+    @cached_property
+    def opaque(self) -> bool:
+        if self.image.mode == "RGB":
+            return True
+        return self.image.mode == "RGBA" and self.image.getchannel("A").getextrema()[0] == 255
+
+
+def composite_layer(canvas: Image.Image, layer: Layer) -> None:
+    """Composite ``layer`` onto ``canvas`` in place, touching only its box.
+
+    Fully opaque layers are pasted, which gives the same pixels as
+    compositing them.
+    """
+
+    with stage(f"layer.{layer.name}", pixels=layer.image.width * layer.image.height):
+        if layer.opaque:
+            canvas.paste(layer.image, layer.origin)
+        else:
+            image = layer.image if layer.image.mode == "RGBA" else layer.image.convert("RGBA")
+            box = layer.box
+            canvas.paste(Image.alpha_composite(canvas.crop(box), image), box)
+
+
+@dataclass(frozen=True)
+class LayerStack:
+    """A skin as a base image plus layers composited bottom to top.
+
+    Stacks are immutable: ``push`` returns a new stack that shares the base
+    and lower layers. ``render`` composites each layer over its own bounding
+    box only, so a face tile or decal costs in proportion to its area, not
+    the canvas. Given a ``TemplateCache`` and a ``base_key`` (plus keys on
+    all layers), ``render`` starts from the longest already-rendered prefix
+    of the stack and caches its result, so stacks that share lower layers
+    share their work.
+    """
+
+    base: Image.Image
+    layers: Tuple[Layer, ...] = ()
+    base_key: Optional[Hashable] = None
+
+    def push(self, layer: Layer) -> "LayerStack":
+        return LayerStack(self.base, self.layers + (layer,), self.base_key)
+
+    def dirty_boxes(self) -> Tuple[Box, ...]:
+        """The canvas regions the layers change, in compositing order."""
+
+        return tuple(layer.box for layer in self.layers)
+
+    def _keys(self) -> Optional[Tuple[Hashable, ...]]:
+        keys = (self.base_key,) + tuple(layer.key for layer in self.layers)
+        return None if None in keys else keys
+
+    def render(self, cache: TemplateCache | None = None) -> Image.Image:
+        """Return a new image with every layer composited over the base."""
+
+        keys = self._keys() if cache is not None else None
+        if keys is None:
+            canvas = self.base.copy()
+            for layer in self.layers:
+                composite_layer(canvas, layer)
+            return canvas
+
+        start, canvas = 0, None
+        for depth in range(len(self.layers), 0, -1):
+            cached = cache.peek(keys[: depth + 1])
+            if cached is not None:
+                start, canvas = depth, cached.copy()
+                break
+        if canvas is None:
+            canvas = self.base.copy()
+        for layer in self.layers[start:]:
+            composite_layer(canvas, layer)
+        if start < len(self.layers):
+            cache.put(keys, canvas.copy())
+        return canvas
+
+
+__all__ = ["Layer", "LayerStack", "composite_layer"]
@@ -0,0 +1,253 @@
+"""Perceptual hashes of skins and a Hamming-distance index over them.
+
+``skin_hash`` packs a skin into 64 bits. 32 bits describe its luminance
+structure, as in pHash: the signs of the 32 lowest non-DC DCT coefficients
+of a 32x32 reduction relative to their median. The other 32 bits are the
+signs of the 4x4 lowest DCT coefficients of two opponent-colour channels
+(red-green and yellow-blue). Generated skins all share the same shading,
+so luminance alone barely tells palettes apart; the colour bits keep
+skins of different palettes 6-11 bits apart, while skins that differ only
+in accent dots or slightly tweaked colours stay within 0-2 bits.
+
+``HashIndex`` stores hashes in one growable ``uint64`` array and finds
+those within a Hamming radius. For radii up to 3 it uses multi-index
+hashing: every hash is split into four 16-bit chunks, and by pigeonhole
+any hash within 3 bits shares at least one chunk exactly, so a lookup
+only examines the hashes found by four binary searches over sorted chunk
+tables. New hashes go to an unsorted tail that is scanned directly and
+merged into the tables once it grows past an eighth of the index, so
+inserts stay cheap at millions of entries. Larger radii scan everything.
+"""
+
+from __future__ import annotations
+
+import io
+import pathlib
+from functools import lru_cache
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from .analysis import SourceItem, iter_sources, map_chunks
+
+DEFAULT_MAX_DISTANCE = 3
+_CHUNKS = 4
+_MIN_TAIL = 1024
+
+# Luma, red-green and yellow-blue, as columns for ``rgb @ _OPPONENT``.
+_OPPONENT = np.array([[0.299, 0.587, 0.114], [1.0, -1.0, 0.0], [0.5, 0.5, -1.0]], dtype=np.float32).T
+_ZIGZAG = sorted(((u, v) for u in range(8) for v in range(8)), key=lambda uv: (uv[0] + uv[1], uv[0]))
+_LUMA_COEFFS = np.array([u * 8 + v for u, v in _ZIGZAG[1:33]])
+
+if hasattr(np, "bitwise_count"):
+    popcount = np.bitwise_count
+else:  # NumPy < 2.0
+    _BYTE_BITS = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+    def popcount(values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.uint64)
+        return _BYTE_BITS[values.view(np.uint8).reshape(*values.shape, 8)].sum(axis=-1, dtype=np.uint8)
+
+
+def _box_filter(size: int, target: int = 32) -> np.ndarray:
+    """``(target, size)`` area-averaging weights that resample ``size`` samples to ``target``."""
+
+    edges = np.arange(target + 1) * size / target
+    starts, stops = edges[:-1, None], edges[1:, None]
+    pixels = np.arange(size)[None, :]
+    weights = np.clip(np.minimum(stops, pixels + 1) - np.maximum(starts, pixels), 0, None)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+@lru_cache(maxsize=None)
+def _projection(size: int) -> np.ndarray:
+    """``(8, size)`` float32: reduce ``size`` samples to 32, then take the 8 lowest DCT-II terms."""
+
+    index = np.arange(32)
+    dct = np.cos(np.pi * (2 * index[None, :] + 1) * index[:8, None] / 64)
+    return (dct @ _box_filter(size)).astype(np.float32)
+
+
+def skin_hashes(pixels: np.ndarray) -> np.ndarray:
+    """64-bit perceptual hashes of a ``(N, H, W, 4)`` uint8 batch of skins.
+
+    Translucent pixels are composited over black, so an unused overlay
+    counts as dark. Any skin size works (64x32, 64x64, HD). The 32x32
+    reduction and the DCT are folded into one ``(8, H)`` and one
+    ``(W, 8)`` matrix, so each RGB plane costs two small matrix products;
+    being linear, the opponent-colour mix is applied to the 8x8 results.
+    """
+
+    pixels = np.asarray(pixels)
+    count, height, width = pixels.shape[:3]
+    planes = pixels.transpose(0, 3, 1, 2).astype(np.float32)
+    rgb = planes[:, :3] * (planes[:, 3:] * np.float32(1 / 255))
+    coeffs = np.einsum("co,ncab->noab", _OPPONENT, _projection(height) @ rgb @ _projection(width).T)
+    luma = coeffs[:, 0].reshape(count, 64)[:, _LUMA_COEFFS]
+    median = np.sort(luma, axis=1)[:, 15:17].mean(axis=1, keepdims=True)
+    bits = np.concatenate([luma > median, coeffs[:, 1:, :4, :4].reshape(count, 32) > 0], axis=1)
+    return np.packbits(bits, axis=1, bitorder="little").view("<u8")[:, 0].astype(np.uint64)
+
+
+def skin_hash(image: Image.Image) -> int:
+    """``skin_hashes`` for a single image."""
+
+    return int(skin_hashes(np.asarray(image.convert("RGBA"))[None])[0])
+
+
+class Match(NamedTuple):
+    id: int
+    distance: int
+
+
+class HashIndex:
+    """Growable array of 64-bit hashes with Hamming-radius lookup.
+
+    Ids are insertion positions. Save and load the index as a ``.npy`` of
+    the hashes (8 bytes per skin); the chunk tables are rebuilt on demand.
+    """
+
+    def __init__(self, hashes: Iterable[int] | np.ndarray = ()) -> None:
+        self._hashes = np.zeros(_MIN_TAIL, dtype=np.uint64)
+        self._count = 0
+        self._indexed = 0
+        self._keys: List[np.ndarray] = []
+        self._order: List[np.ndarray] = []
+        self.extend(hashes)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def hashes(self) -> np.ndarray:
+        view = self._hashes[: self._count]
+        view.setflags(write=False)
+        return view
+
+    @classmethod
+    def load(cls, path: Union[str, pathlib.Path]) -> "HashIndex":
+        return cls(np.load(path))
+
+    def save(self, path: Union[str, pathlib.Path]) -> None:
+        np.save(path, self._hashes[: self._count])
+
+    def extend(self, hashes: Iterable[int] | np.ndarray) -> None:
+        hashes = np.asarray(hashes if isinstance(hashes, np.ndarray) else list(hashes), dtype=np.uint64)
+        needed = self._count + len(hashes)
+        if needed > len(self._hashes):
+            grown = np.zeros(max(needed, 2 * len(self._hashes)), dtype=np.uint64)
+            grown[: self._count] = self._hashes[: self._count]
+            self._hashes = grown
+        self._hashes[self._count:needed] = hashes
+        self._count = needed
+
+    def add(self, value: int) -> int:
+        self.extend([value])
+        return self._count - 1
+
+    def _reindex(self) -> None:
+        hashes = self._hashes[: self._count]
+        self._keys, self._order = [], []
+        for chunk in range(_CHUNKS):
+            keys = ((hashes >> np.uint64(16 * chunk)) & np.uint64(0xFFFF)).astype(np.uint16)
+            order = np.argsort(keys, kind="stable")
+            self._keys.append(keys[order])
+            self._order.append(order)
+        self._indexed = self._count
+
+    def _candidates(self, value: np.uint64) -> np.ndarray:
+        if self._count - self._indexed > max(_MIN_TAIL, self._indexed // 8):
+            self._reindex()
+        found = [np.arange(self._indexed, self._count)]
+        for chunk in range(_CHUNKS):
+            key = np.uint16((int(value) >> (16 * chunk)) & 0xFFFF)
+            keys = self._keys[chunk] if self._keys else np.empty(0, dtype=np.uint16)
+            lo, hi = np.searchsorted(keys, key, "left"), np.searchsorted(keys, key, "right")
+            if hi > lo:
+                found.append(self._order[chunk][lo:hi])
+        return np.unique(np.concatenate(found))
+
+    def query(self, value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Match]:
+        """Hashes within ``max_distance`` bits of ``value``, closest (then oldest) first."""
+
+        value = np.uint64(value)
+        if max_distance < _CHUNKS and self._count > _MIN_TAIL:
+            ids = self._candidates(value)
+            distances = popcount(self._hashes[ids] ^ value)
+        else:
+            ids = np.arange(self._count)
+            distances = popcount(self._hashes[: self._count] ^ value)
+        keep = distances <= max_distance
+        ids, distances = ids[keep], distances[keep]
+        order = np.lexsort((ids, distances))
+        return [Match(int(ids[index]), int(distances[index])) for index in order]
+
+    def nearest(self, value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> Optional[Match]:
+        matches = self.query(value, max_distance)
+        return matches[0] if matches else None
+
+
+def _hash_chunk(chunk: List[SourceItem]) -> List[Tuple[str, Optional[int]]]:
+    decoded: List[Optional[np.ndarray]] = []
+    for _, data in chunk:
+        try:
+            with Image.open(data if isinstance(data, pathlib.Path) else io.BytesIO(data)) as image:
+                decoded.append(np.asarray(image.convert("RGBA")))
+        except (OSError, UnidentifiedImageError):
+            decoded.append(None)
+    hashes: List[Optional[int]] = [None] * len(chunk)
+    shapes = {pixels.shape for pixels in decoded if pixels is not None}
+    for shape in shapes:
+        positions = [index for index, pixels in enumerate(decoded) if pixels is not None and pixels.shape == shape]
+        for position, value in zip(positions, skin_hashes(np.stack([decoded[index] for index in positions]))):
+            hashes[position] = int(value)
+    return [(name, value) for (name, _), value in zip(chunk, hashes)]
+
+
+class Duplicate(NamedTuple):
+    name: str
+    original: str
+    distance: int
+
+
+def find_duplicates(
+    source: Union[str, pathlib.Path],
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    index: HashIndex | None = None,
+    workers: int | None = None,
+) -> Iterator[Duplicate]:
+    """Yield every skin under ``source`` that is within ``max_distance`` of an earlier one.
+
+    Skins are visited in ``iter_sources`` order and the first of each group
+    is kept and added to ``index``; matches against hashes already in a
+    given ``index`` name the entry's id instead of a file. Unreadable files
+    are skipped. Hashing runs on a thread pool.
+    """
+
+    index = index if index is not None else HashIndex()
+    offset = len(index)
+    names: List[str] = []
+    for chunk in map_chunks(iter_sources(source), _hash_chunk, workers=workers):
+        for name, value in chunk:
+            if value is None:
+                continue
+            match = index.nearest(value, max_distance)
+            if match is None:
+                index.add(value)
+                names.append(name)
+            else:
+                original = names[match.id - offset] if match.id >= offset else f"index entry {match.id}"
+                yield Duplicate(name, original, match.distance)
+
+
+__all__ = [
+    "DEFAULT_MAX_DISTANCE",
+    "Duplicate",
+    "HashIndex",
+    "Match",
+    "find_duplicates",
+    "popcount",
+    "skin_hash",
+    "skin_hashes",
+]
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .generator import (
+    ACCENT_PROBABILITY,
+    TemplateCache,
+    accent_boxes,
+    accent_coordinates,
+    accent_draws,
+    accent_rng,
+    draw_base,
+)
+from .layout import SkinLayout, get_layout
+from .palette import Color, Palette, base_palettes
+
+Op = Tuple[str, tuple, Color]
+
+
+class _OpRecorder:
+    """Stands in for ``ImageDraw`` and records the primitives of the recipe."""
+
+    def __init__(self) -> None:
+        self.ops: List[Op] = []
+
+    def rectangle(self, xy, fill=None) -> None:
+        self.ops.append(("rectangle", tuple(xy), fill))
+
+    def point(self, xy, fill=None) -> None:
+        self.ops.append(("point", tuple(xy), fill))
+
+    def line(self, xy, fill=None) -> None:
+        self.ops.append(("line", tuple(xy), fill))
+
+
+def record_ops(layout: SkinLayout, palette: Palette) -> List[Op]:
+    recorder = _OpRecorder()
+    draw_base(recorder, layout, palette)
+    return recorder.ops
+
+
+def compile_role_map(layout: SkinLayout, size: Tuple[int, int] | None = None) -> np.ndarray:
+    """Rasterise the draw recipe into a per-pixel role index map.
+
+    Role ``i`` (1-based) is the ``i``-th primitive drawn by ``draw_base``;
+    role 0 is untouched, transparent canvas. The geometry of the recipe does
+    not depend on the palette, so any palette can be used to record it. The
+    primitives are replayed through ``ImageDraw`` on an ``L`` canvas, so the
+    rasterisation (including Pillow's inclusive rectangle edges) is exactly
+    the one the Pillow path produces. ``size`` defaults to the layout's.
+    """
+
+    ops = record_ops(layout, base_palettes()["classic"])
+    if len(ops) > 255:
+        raise ValueError(f"draw recipe has {len(ops)} primitives; at most 255 fit a uint8 role map")
+    canvas = Image.new("L", size or layout.size, 0)
+    draw = ImageDraw.Draw(canvas)
+    for role, (kind, xy, _) in enumerate(ops, start=1):
+        getattr(draw, kind)(xy, fill=role)
+    return np.asarray(canvas, dtype=np.uint8).copy()
+
+
+@lru_cache(maxsize=64)
+def role_map(layout: SkinLayout) -> np.ndarray:
+    """The shared, read-only role map of ``layout``, compiled on first use.
+
+    Cached by the layout's value (see ``SkinLayout.key``), so fresh but
+    equal layouts reuse one map.
+
+    The draw recipe is defined on the 1x texel grid, so an HD layout's map
+    is the 1x map with every texel repeated ``scale`` times on both axes:
+    the eyes, fringe, belt and straps keep their proportions, and an HD skin
+    only differs from an upscaled 1x skin where finer detail (such as a
+    photo face tile) is pasted on top.
+    """
+
+    if layout.scale == 1:
+        roles = compile_role_map(layout)
+    else:
+        roles = role_map(layout.base).repeat(layout.scale, axis=0).repeat(layout.scale, axis=1)
+    roles.setflags(write=False)
+    return roles
+
+
+def color_table(layout: SkinLayout, palette: Palette) -> np.ndarray:
+    """Return the ``(roles + 1, 4)`` RGBA lookup table for ``palette``."""
+
+    ops = record_ops(layout, palette)
+    table = np.zeros((len(ops) + 1, 4), dtype=np.uint8)
+    table[1:] = [fill for _, _, fill in ops]
+    return table
+
+
+@lru_cache(maxsize=64)
+def accent_indices(layout: SkinLayout) -> np.ndarray:
+    """Flat pixel indices of each accent texel, in ``scatter_accent`` draw order.
+
+    Returns an ``(N, scale**2)`` array: row ``i`` lists the pixels of the
+    ``scale`` x ``scale`` block that the ``i``-th RNG draw colours. Accents
+    are drawn per 1x texel, so a seed yields the same design at every scale.
+    """
+
+    scale, width = layout.scale, layout.size[0]
+    coordinates = accent_coordinates(tuple(accent_boxes(layout.base))) * scale
+    dy, dx = np.divmod(np.arange(scale * scale), scale)
+    indices = (coordinates[:, 1, None] + dy) * width + coordinates[:, 0, None] + dx
+    indices.setflags(write=False)
+    return indices
+
+
+def pack_color(color) -> np.uint32:
+    """An RGBA colour as the native ``uint32`` used by the packed pixel paths."""
+
+    return np.array(color, dtype=np.uint8).view(np.uint32)[0]
+
+
+class SkinEngine:
+    """Array-backed renderer producing the same pixels as ``SkinGenerator``.
+
+    The layout and draw recipe are compiled once into a role index map; each
+    skin is then a single palette lookup plus the accent dots, both done on
+    whole RGBA pixels packed as ``uint32``, so the cost grows linearly with
+    the pixel count at HD ``scale``.
+    """
+
+    def __init__(self, layout: SkinLayout | str = "classic", accent_mode: str = "compat", scale: int = 1) -> None:
+        self.layout = get_layout(layout, scale) if isinstance(layout, str) else layout
+        self.size = self.layout.size
+        self.roles = role_map(self.layout)
+        self.accents = accent_indices(self.layout)
+        self.accent_probability = ACCENT_PROBABILITY
+        self.accent_mode = accent_mode
+        self.tables = TemplateCache(maxsize=256)
+
+    def palette_table(self, palette: Palette) -> np.ndarray:
+        return self.tables.get(palette, lambda: color_table(self.layout.base, palette))
+
+    def _accent_hits(self, seed: int | None) -> np.ndarray:
+        draws = accent_draws(accent_rng(seed, self.accent_mode), len(self.accents))
+        return self.accents[draws < self.accent_probability]
+
+    def render(self, palette: Palette, seed: int | None = None) -> np.ndarray:
+        """Render one skin as a ``(height, width, 4)`` uint8 array."""
+
+        return self.render_batch([palette], [seed])[0]
+
+    def render_batch(self, palettes: Sequence[Palette], seeds: Sequence[int | None]) -> np.ndarray:
+        """Render ``len(palettes)`` skins into one contiguous ``(N, height, width, 4)`` array."""
+
+        if len(palettes) != len(seeds):
+            raise ValueError("palettes and seeds must have the same length")
+        tables = np.stack([self.palette_table(palette).view(np.uint32)[:, 0] for palette in palettes])
+        flat = tables[np.arange(len(palettes))[:, None], self.roles.ravel()[None]]
+        for index, (palette, seed) in enumerate(zip(palettes, seeds)):
+            flat[index, self._accent_hits(seed).ravel()] = pack_color(palette.accent)
+        width, height = self.size
+        return flat.view(np.uint8).reshape(len(palettes), height, width, 4)
+
+    def render_image(self, palette: Palette, seed: int | None = None) -> Image.Image:
+        return Image.fromarray(self.render(palette, seed), "RGBA")
+
+
+__all__ = ["SkinEngine", "color_table", "compile_role_map", "role_map"]
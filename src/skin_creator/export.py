@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import io
+import pathlib
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+# zlib strategies accepted by Pillow's PNG encoder as ``compress_type``. -1 is
+# Pillow's own default, which also keeps its adaptive row filtering and so
+# produces the same bytes as a plain ``image.save(..., "PNG")``.
+PNG_STRATEGIES = {"default": -1, "filtered": 1, "huffman": 2, "rle": 3, "fixed": 4}
+
+
+@dataclass(frozen=True)
+class PngOptions:
+    """How skins are written to PNG.
+
+    ``indexed`` stores a palettised (mode ``P``) PNG with a tRNS chunk when
+    the skin has at most 256 distinct RGBA colours, which a generated skin
+    always does; otherwise, or if the round trip is not exact, the skin is
+    written as RGBA. ``compress_level`` (0-9) and ``strategy`` (see
+    ``PNG_STRATEGIES``) are passed to zlib.
+    """
+
+    indexed: bool = False
+    compress_level: int = 6
+    strategy: str = "default"
+    verify: bool = True
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.compress_level <= 9:
+            raise ValueError("compress_level must be between 0 and 9")
+        if self.strategy not in PNG_STRATEGIES:
+            raise ValueError(f"unknown strategy {self.strategy!r}; expected one of {sorted(PNG_STRATEGIES)}")
+
+
+def to_indexed(image: Image.Image) -> Optional[Image.Image]:
+    """Convert ``image`` losslessly to mode ``P`` with per-entry alpha.
+
+    Returns ``None`` when the image has more than 256 distinct RGBA colours.
+    Palette entries that are not fully opaque come first so the tRNS chunk
+    only needs to cover them. The palette is exactly as long as the number of
+    colours, which lets Pillow pick the smallest PLTE and bit depth.
+    """
+
+    rgba = np.ascontiguousarray(np.asarray(image.convert("RGBA")))
+    packed = rgba.view(np.uint32).reshape(rgba.shape[:2])
+    colors, indices = np.unique(packed, return_inverse=True)
+    if len(colors) > 256:
+        return None
+    entries = colors.view(np.uint8).reshape(-1, 4)
+    order = np.lexsort((colors, entries[:, 3] == 255))
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    entries = entries[order]
+
+    indexed = Image.fromarray(remap[indices.reshape(packed.shape)].astype(np.uint8), "P")
+    indexed.putpalette(entries[:, :3].tobytes(), "RGB")
+    translucent = int(np.count_nonzero(entries[:, 3] != 255))
+    if translucent:
+        indexed.info["transparency"] = entries[:translucent, 3].tobytes()
+    return indexed
+
+
+def encode_png(image: Image.Image, options: PngOptions = PngOptions()) -> bytes:
+    """Encode ``image`` to PNG bytes according to ``options``."""
+
+    params = {"compress_level": options.compress_level, "compress_type": PNG_STRATEGIES[options.strategy]}
+    if options.indexed:
+        indexed = to_indexed(image)
+        if indexed is not None:
+            buffer = io.BytesIO()
+            indexed.save(buffer, format="PNG", **params)
+            data = buffer.getvalue()
+            if not options.verify or _decodes_to(data, image):
+                return data
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", **params)
+    return buffer.getvalue()
+
+
+def _decodes_to(data: bytes, image: Image.Image) -> bool:
+    with Image.open(io.BytesIO(data)) as decoded:
+        return decoded.convert("RGBA").tobytes() == image.convert("RGBA").tobytes()
+
+
+def save_png(
+    image: Image.Image,
+    destination: Union[str, pathlib.Path, BinaryIO],
+    options: PngOptions = PngOptions(),
+) -> None:
+    data = encode_png(image, options)
+    if isinstance(destination, (str, pathlib.Path)):
+        pathlib.Path(destination).write_bytes(data)
+    else:
+        destination.write(data)
+
+
+__all__ = ["PNG_STRATEGIES", "PngOptions", "encode_png", "save_png", "to_indexed"]
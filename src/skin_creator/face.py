@@ -0,0 +1,181 @@
+"""Locate the face in a portrait photo, so off-centre portraits still crop well.
+
+The photo (already reduced by ``load_photo``) is shrunk to a thumbnail
+whose shorter side is ``ANALYSIS_SIDE`` pixels and converted to YCbCr.
+Every pixel gets a skin-tone likelihood from a Gaussian over (Cb, Cr),
+weighted slightly towards the centre of the frame. The face is the square
+that maximises the summed ``likelihood - SKIN_THRESHOLD`` over its pixels,
+so it grows while it gains more skin than background; the sum for every
+position of a given side is four lookups in one integral image, and a
+dozen sides are tried. The winning square is widened by ``FACE_MARGIN``
+and raised by ``FACE_LIFT`` to take in the hairline, then mapped back to
+photo pixels. When the best square is mostly not skin (for example an
+avatar or a landscape), the central square of the old fixed crop is used.
+
+Photos whose thumbnails share a shape are searched as one NumPy batch;
+most of the roughly one millisecond per photo (less in batches) goes to
+making the thumbnail.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .layout import Box
+
+ANALYSIS_SIDE = 48
+
+# Skin chrominance as a Gaussian in (Cb, Cr), fitted to light through dark
+# skin tones; Cb and Cr are anti-correlated along the tone range.
+_SKIN_MEAN = np.array([102.0, 153.0], dtype=np.float32)
+_SKIN_INV_COV = np.linalg.inv(np.array([[160.0, -45.0], [-45.0, 90.0]])).astype(np.float32)
+# Likelihood fades out over these luma ramps: shadows and dark hair share
+# skin's chroma, and blown highlights have none.
+_DARK_LUMA = (50.0, 90.0)
+_BRIGHT_LUMA = (235.0, 250.0)
+
+SKIN_THRESHOLD = 0.3
+# Mean likelihood the best square needs before it is trusted over the centre.
+MIN_CONFIDENCE = 0.45
+# Candidate square sides, as fractions of the thumbnail's shorter side.
+_SIDES = np.linspace(0.2, 0.8, 13)
+# How much the likelihood fades towards the corners (0 disables the prior).
+_CENTRE_PRIOR = 0.25
+
+FACE_MARGIN = 0.15
+FACE_LIFT = 0.1
+
+
+def central_box(size: Tuple[int, int], ratio: float = 0.5) -> Box:
+    """The centred square covering ``ratio`` of the shorter side of ``size``."""
+
+    ratio = max(0.05, min(1.0, ratio))
+    width, height = size
+    side = max(1, int(min(width, height) * ratio))
+    left = (width - side) // 2
+    top = (height - side) // 2
+    return (left, top, left + side, top + side)
+
+
+def _analysis_size(size: Tuple[int, int]) -> Tuple[int, int]:
+    width, height = size
+    factor = min(1.0, ANALYSIS_SIDE / min(width, height))
+    return max(1, round(width * factor)), max(1, round(height * factor))
+
+
+def skin_likelihood(ycbcr: np.ndarray) -> np.ndarray:
+    """Skin-tone likelihood in [0, 1] of a ``(..., 3)`` uint8 YCbCr array, as float32."""
+
+    ycbcr = np.asarray(ycbcr)
+    cb = ycbcr[..., 1].astype(np.float32) - _SKIN_MEAN[0]
+    cr = ycbcr[..., 2].astype(np.float32) - _SKIN_MEAN[1]
+    (a, b), (_, c) = _SKIN_INV_COV
+    distance = a * cb * cb + 2 * b * cb * cr + c * cr * cr
+    luma = ycbcr[..., 0].astype(np.float32)
+    dark = np.clip((luma - _DARK_LUMA[0]) / (_DARK_LUMA[1] - _DARK_LUMA[0]), 0, 1)
+    bright = np.clip((_BRIGHT_LUMA[1] - luma) / (_BRIGHT_LUMA[1] - _BRIGHT_LUMA[0]), 0, 1)
+    return np.exp(-0.5 * distance) * dark * bright
+
+
+def _centre_weights(height: int, width: int) -> np.ndarray:
+    ys = (np.arange(height, dtype=np.float32) + 0.5) / height - 0.5
+    xs = (np.arange(width, dtype=np.float32) + 0.5) / width - 0.5
+    return 1 - _CENTRE_PRIOR * 2 * (ys[:, None] ** 2 + xs[None, :] ** 2)
+
+
+def search_squares(likelihood: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Best skin square of each map in a ``(N, H, W)`` likelihood batch.
+
+    Returns ``(N, 3)`` ``(left, top, side)`` in map pixels and the mean
+    likelihood inside each square.
+    """
+
+    count, height, width = likelihood.shape
+    weighted = likelihood * _centre_weights(height, width) - SKIN_THRESHOLD
+    integral = np.zeros((count, height + 1, width + 1), dtype=np.float32)
+    np.cumsum(np.cumsum(weighted, axis=1), axis=2, out=integral[:, 1:, 1:])
+    rows = np.arange(count)
+    best = np.full(count, -np.inf, dtype=np.float32)
+    squares = np.zeros((count, 3), dtype=np.int64)
+    for side in sorted({max(2, int(round(fraction * min(height, width)))) for fraction in _SIDES}):
+        sums = (
+            integral[:, side:, side:]
+            - integral[:, :-side, side:]
+            - integral[:, side:, :-side]
+            + integral[:, :-side, :-side]
+        ).reshape(count, -1)
+        positions = sums.argmax(axis=1)
+        scores = sums[rows, positions]
+        better = scores > best
+        best[better] = scores[better]
+        tops, lefts = np.divmod(positions, width - side + 1)
+        squares[better] = np.stack([lefts, tops, np.full(count, side)], axis=1)[better]
+
+    confidence = np.array(
+        [likelihood[index, top : top + side, left : left + side].mean() for index, (left, top, side) in enumerate(squares)],
+        dtype=np.float32,
+    )
+    return squares, confidence
+
+
+def _face_box(square: np.ndarray, scale: float, size: Tuple[int, int]) -> Box:
+    """Widen and lift a thumbnail square, map it to photo pixels and keep it inside the photo."""
+
+    left, top, side = (float(value) for value in square)
+    grown = side * (1 + 2 * FACE_MARGIN)
+    centre_x, centre_y = left + side / 2, top + side / 2 - FACE_LIFT * side
+    width, height = size
+    side = min(int(round(grown * scale)), width, height)
+    left = int(round(centre_x * scale - side / 2))
+    top = int(round(centre_y * scale - side / 2))
+    left = min(max(left, 0), width - side)
+    top = min(max(top, 0), height - side)
+    return (left, top, left + side, top + side)
+
+
+def locate_faces(images: Sequence[Image.Image], fallback_ratio: float = 0.5) -> List[Box]:
+    """Square face boxes ``(left, top, right, bottom)`` for each photo, in photo pixels.
+
+    Photos where no face is found, or too thin to search (a thumbnail side
+    under 2 pixels), get ``central_box(size, fallback_ratio)``.
+    """
+
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    for index, image in enumerate(images):
+        groups.setdefault(_analysis_size(image.size), []).append(index)
+    boxes: List[Box] = [central_box(image.size, fallback_ratio) for image in images]
+    for size, members in groups.items():
+        if min(size) < 2:
+            continue
+        thumbnails = np.stack(
+            [np.asarray(images[index].convert("RGB").resize(size, Image.BOX).convert("YCbCr")) for index in members]
+        )
+        squares, confidence = search_squares(skin_likelihood(thumbnails))
+        for index, square, trusted in zip(members, squares, confidence >= MIN_CONFIDENCE):
+            if trusted:
+                image = images[index]
+                boxes[index] = _face_box(square, min(image.size) / min(size), image.size)
+    return boxes
+
+
+def locate_face(image: Image.Image, fallback_ratio: float = 0.5) -> Box:
+    """``locate_faces`` for one photo."""
+
+    return locate_faces([image], fallback_ratio)[0]
+
+
+__all__ = [
+    "ANALYSIS_SIDE",
+    "FACE_LIFT",
+    "FACE_MARGIN",
+    "MIN_CONFIDENCE",
+    "SKIN_THRESHOLD",
+    "central_box",
+    "locate_face",
+    "locate_faces",
+    "search_squares",
+    "skin_likelihood",
+]
@@ -1,38 +1,44 @@
 from __future__ import annotations
 
 import random
-from typing import Iterable
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Hashable, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
 
+import numpy as np
 from PIL import Image, ImageDraw
 
-from .layout import SkinLayout, Box
+from .layout import Box, Faces, SkinLayout, get_layout
 from .palette import Palette, adjust_color
+from .profiling import stage
 
 
 def fill(draw: ImageDraw.ImageDraw, box: Box, color) -> None:
     draw.rectangle(box, fill=color)
 
 
-def draw_cube(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], color: Palette) -> None:
-    fill(draw, faces["top"], color.lighter.skin)
-    fill(draw, faces["bottom"], color.darker.skin)
-    fill(draw, faces["front"], color.skin)
-    fill(draw, faces["back"], color.skin)
-    fill(draw, faces["left"], color.darker.skin)
-    fill(draw, faces["right"], color.lighter.skin)
+def draw_cube(draw: ImageDraw.ImageDraw, faces: Faces, color: Palette) -> None:
+    fill(draw, faces.top, color.lighter.skin)
+    fill(draw, faces.bottom, color.darker.skin)
+    fill(draw, faces.front, color.skin)
+    fill(draw, faces.back, color.skin)
+    fill(draw, faces.left, color.darker.skin)
+    fill(draw, faces.right, color.lighter.skin)
 
 
-def draw_hair(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], palette: Palette) -> None:
+def draw_hair(draw: ImageDraw.ImageDraw, faces: Faces, palette: Palette) -> None:
     accent = adjust_color(palette.hair, -10)
-    fill(draw, faces["top"], palette.hair)
-    fill(draw, faces["back"], accent)
+    fill(draw, faces.top, palette.hair)
+    fill(draw, faces.back, accent)
     # fringe
-    x0, y0, x1, y1 = faces["front"]
+    x0, y0, x1, y1 = faces.front
     draw.rectangle((x0, y1 - 2, x1, y1), fill=palette.hair)
 
 
-def draw_face(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], palette: Palette) -> None:
-    x0, y0, x1, y1 = faces["front"]
+def draw_face(draw: ImageDraw.ImageDraw, faces: Faces, palette: Palette) -> None:
+    x0, y0, x1, y1 = faces.front
     # eyes
     eye = adjust_color(palette.accent, -20)
     draw.point((x0 + 2, y0 + 3), fill=eye)
@@ -41,41 +47,41 @@ def draw_face(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], palette: Palette
     draw.line((x0 + 2, y0 + 6, x0 + 5, y0 + 6), fill=adjust_color(palette.hair, 10))
 
 
-def draw_torso(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], palette: Palette) -> None:
-    fill(draw, faces["top"], palette.darker.shirt)
-    fill(draw, faces["bottom"], palette.darker.shirt)
-    fill(draw, faces["front"], palette.shirt)
-    fill(draw, faces["back"], palette.darker.shirt)
-    fill(draw, faces["left"], palette.lighter.shirt)
-    fill(draw, faces["right"], palette.lighter.shirt)
+def draw_torso(draw: ImageDraw.ImageDraw, faces: Faces, palette: Palette) -> None:
+    fill(draw, faces.top, palette.darker.shirt)
+    fill(draw, faces.bottom, palette.darker.shirt)
+    fill(draw, faces.front, palette.shirt)
+    fill(draw, faces.back, palette.darker.shirt)
+    fill(draw, faces.left, palette.lighter.shirt)
+    fill(draw, faces.right, palette.lighter.shirt)
 
     # belt line
     belt = adjust_color(palette.pants, 8)
-    x0, y0, x1, y1 = faces["front"]
+    x0, y0, x1, y1 = faces.front
     draw.rectangle((x0, y1 - 3, x1, y1), fill=belt)
 
 
-def draw_limb(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], palette: Palette, *, use_pants: bool) -> None:
+def draw_limb(draw: ImageDraw.ImageDraw, faces: Faces, palette: Palette, *, use_pants: bool) -> None:
     fabric = palette.pants if use_pants else palette.shirt
     darker = adjust_color(fabric, -10)
     lighter = adjust_color(fabric, 12)
-    fill(draw, faces["top"], lighter)
-    fill(draw, faces["bottom"], darker)
-    fill(draw, faces["front"], fabric)
-    fill(draw, faces["back"], darker)
-    fill(draw, faces["left"], darker)
-    fill(draw, faces["right"], lighter)
+    fill(draw, faces.top, lighter)
+    fill(draw, faces.bottom, darker)
+    fill(draw, faces.front, fabric)
+    fill(draw, faces.back, darker)
+    fill(draw, faces.left, darker)
+    fill(draw, faces.right, lighter)
 
 
-def draw_boots(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], palette: Palette) -> None:
+def draw_boots(draw: ImageDraw.ImageDraw, faces: Faces, palette: Palette) -> None:
     boot = adjust_color(palette.pants, -25)
-    x0, y0, x1, y1 = faces["front"]
+    x0, y0, x1, y1 = faces.front
     draw.rectangle((x0, y1 - 4, x1, y1), fill=boot)
 
 
-def draw_gloves(draw: ImageDraw.ImageDraw, faces: Dict[str, Box], palette: Palette) -> None:
+def draw_gloves(draw: ImageDraw.ImageDraw, faces: Faces, palette: Palette) -> None:
     glove = adjust_color(palette.shirt, -20)
-    x0, y0, x1, y1 = faces["front"]
+    x0, y0, x1, y1 = faces.front
     draw.rectangle((x0, y1 - 3, x1, y1), fill=glove)
 
 
@@ -86,6 +92,8 @@ def scatter_accent(
     rng: random.Random,
     probability: float = 0.08,
 ) -> None:
+    """Reference per-pixel accent scatter; ``scatter_accent_bulk`` is the fast path."""
+
     accent = palette.accent
     for box in boxes:
         x0, y0, x1, y1 = box
@@ -95,66 +103,311 @@ def scatter_accent(
                     draw.point((x, y), fill=accent)
 
 
+AccentRng = Union[random.Random, np.random.Generator]
+
+ACCENT_MODES = ("compat", "v2")
+
+# Bump whenever SkinGenerator renders different pixels for the same palette,
+# seed, accent mode, layout and scale; incremental batch builds then
+# regenerate every skin instead of trusting their manifest.
+GENERATOR_VERSION = 1
+
+# Below this many draws the state round-trip costs more than the draws.
+_MT_TRANSFER_THRESHOLD = 8192
+
+
+def accent_rng(seed: int | None, mode: str = "compat") -> AccentRng:
+    """Create the accent RNG for ``mode``.
+
+    ``compat`` keeps the ``random.Random(seed)`` stream so existing seeds
+    produce the same skins; ``v2`` uses NumPy's PCG64 and is meant for new
+    seeds only.
+    """
+
+    if mode == "compat":
+        return random.Random(seed)
+    if mode == "v2":
+        return np.random.default_rng(seed)
+    raise ValueError(f"unknown accent mode {mode!r}; expected one of {ACCENT_MODES}")
+
+
+def accent_draws(rng: AccentRng, count: int) -> np.ndarray:
+    """Draw ``count`` uniforms in one shot.
+
+    A ``random.Random`` yields exactly the values, and is left in exactly the
+    state, of ``count`` successive ``rng.random()`` calls. Small draws are
+    pulled through ``np.fromiter`` without touching bytecode per value; large
+    ones move the Mersenne Twister state into NumPy, advance it there and
+    write it back, which only pays off beyond ``_MT_TRANSFER_THRESHOLD``.
+    """
+
+    if isinstance(rng, np.random.Generator):
+        return rng.random(count)
+    if count < _MT_TRANSFER_THRESHOLD:
+        return np.fromiter(iter(rng.random, None), dtype=np.float64, count=count)
+
+    version, internal, gauss_next = rng.getstate()
+    bit_generator = np.random.MT19937()
+    bit_generator.state = {
+        "bit_generator": "MT19937",
+        "state": {"key": np.asarray(internal[:-1], dtype=np.uint32), "pos": internal[-1]},
+    }
+    draws = np.random.Generator(bit_generator).random(count)
+    state = bit_generator.state["state"]
+    rng.setstate((version, tuple(state["key"].tolist()) + (int(state["pos"]),), gauss_next))
+    return draws
+
+
+@lru_cache(maxsize=32)
+def accent_coordinates(boxes: Tuple[Box, ...]) -> np.ndarray:
+    """``(N, 2)`` x/y coordinates of ``boxes`` in ``scatter_accent`` visiting order.
+
+    Boxes are walked column by column, so the ``i``-th coordinate consumes
+    the ``i``-th draw of a compat RNG.
+    """
+
+    columns = [
+        np.stack(np.meshgrid(np.arange(x0, x1), np.arange(y0, y1), indexing="ij"), axis=-1).reshape(-1, 2)
+        for x0, y0, x1, y1 in boxes
+    ]
+    coordinates = np.concatenate(columns) if columns else np.empty((0, 2), dtype=int)
+    coordinates.setflags(write=False)
+    return coordinates
+
+
+def accent_points(boxes: Sequence[Box], rng: AccentRng, probability: float) -> np.ndarray:
+    """Return the ``(K, 2)`` coordinates that receive an accent dot."""
+
+    coordinates = accent_coordinates(tuple(boxes))
+    return coordinates[accent_draws(rng, len(coordinates)) < probability]
+
+
+def scatter_accent_bulk(
+    draw: ImageDraw.ImageDraw,
+    boxes: Sequence[Box],
+    palette: Palette,
+    rng: AccentRng,
+    probability: float = 0.08,
+) -> None:
+    """Vectorised ``scatter_accent``: every RNG draw in one call, every dot in one write."""
+
+    points = accent_points(boxes, rng, probability)
+    if len(points):
+        draw.point(points.ravel().tolist(), fill=palette.accent)
+
+
+def draw_cloak(draw: ImageDraw.ImageDraw, faces: Faces, palette: Palette) -> None:
+    fill(draw, faces.top, adjust_color(palette.shirt, -10))
+    fill(draw, faces.front, adjust_color(palette.shirt, -14))
+    fill(draw, faces.back, adjust_color(palette.shirt, -20))
+    fill(draw, faces.left, adjust_color(palette.shirt, -16))
+    fill(draw, faces.right, adjust_color(palette.shirt, -12))
+
+
+def draw_straps(draw: ImageDraw.ImageDraw, parts: Iterable[Faces], palette: Palette) -> None:
+    accent = adjust_color(palette.accent, -12)
+    for part in parts:
+        x0, y0, x1, y1 = part.front
+        draw.rectangle((x0 + 1, y0 + 1, x0 + 3, y1 - 1), fill=accent)
+
+
+def draw_base(draw: ImageDraw.ImageDraw, layout: SkinLayout, palette: Palette) -> None:
+    """Draw everything except the seed-dependent accent dots.
+
+    Only ``rectangle``, ``point`` and ``line`` are called on ``draw`` so the
+    recipe can be replayed by the array engine (see ``engine.py``).
+    """
+
+    arms = [arm for arm in (layout.right_arm, layout.left_arm) if arm is not None]
+    legs = [leg for leg in (layout.right_leg, layout.left_leg) if leg is not None]
+
+    # Base skin
+    draw_cube(draw, layout.head, palette)
+    draw_face(draw, layout.head, palette)
+    draw_torso(draw, layout.body, palette)
+    for arm in arms:
+        draw_limb(draw, arm, palette, use_pants=False)
+    for leg in legs:
+        draw_limb(draw, leg, palette, use_pants=True)
+
+    for leg in legs:
+        draw_boots(draw, leg, palette)
+    for arm in arms:
+        draw_gloves(draw, arm, palette)
+
+    # Overlays
+    draw_hair(draw, layout.head_overlay, palette)
+    if layout.body_overlay is not None:
+        draw_cloak(draw, layout.body_overlay, palette)
+    draw_straps(draw, [layout.body] + arms[::-1], palette)
+
+
+def accent_boxes(layout: SkinLayout) -> List[Box]:
+    """Faces that receive scattered accent pixels, in RNG draw order."""
+
+    parts = (layout.body, layout.right_arm, layout.left_arm, layout.right_leg, layout.left_leg)
+    return [part.front for part in parts if part is not None]
+
+
+ACCENT_PROBABILITY = 0.04
+
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class TemplateCache:
+    """Thread-safe bounded LRU cache for per-palette render products.
+
+    ``SkinGenerator`` stores the base skin (everything but the accent dots)
+    here, keyed by palette value; the counters tell how well ``maxsize``
+    fits the working set.
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """Return the entry for ``key``, building it with ``factory`` on a miss.
+
+        The factory runs outside the lock, so two threads missing on the same
+        key may both build it; the first to finish wins.
+        """
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            self._misses += 1
+        return self.put(key, factory())
+
+    def peek(self, key: Hashable) -> Optional[T]:
+        """Return the entry for ``key`` if present, without building it.
+
+        Counts as a hit or a miss like ``get``.
+        """
+
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: T) -> T:
+        """Store ``value`` unless ``key`` is already present; returns the stored entry.
+
+        Not counted as a lookup: callers pair it with the ``peek`` that missed.
+        """
+
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._entries), self.maxsize)
+
+
+template_cache = TemplateCache()
+
+
 class SkinGenerator:
-    def __init__(self, palette: Palette, seed: int | None = None) -> None:
+    def __init__(
+        self,
+        palette: Palette,
+        seed: int | None = None,
+        accent_mode: str = "compat",
+        cache: TemplateCache | None = None,
+        layout: Union[str, SkinLayout] = "classic",
+        scale: int = 1,
+    ) -> None:
         self.palette = palette
-        self.random = random.Random(seed)
-        self.layout = SkinLayout()
+        self.random = accent_rng(seed, accent_mode)
+        self.layout = get_layout(layout, scale) if isinstance(layout, str) else layout
+        self.cache = template_cache if cache is None else cache
+
+    def render_base(self) -> Image.Image:
+        """Render the palette-only part of the skin, without accent dots.
+
+        The layout's precompiled role map is looked up through the palette's
+        colour table, which yields the pixels ``draw_base`` would draw.
+        """
+
+        from .engine import color_table, role_map  # engine.py builds on this module
+
+        width, height = self.layout.size
+        with stage("skin.draw", pixels=width * height):
+            # Gathering whole RGBA pixels as uint32 is several times faster
+            # than indexing the (roles, 4) table row by row.
+            table = color_table(self.layout.base, self.palette).view(np.uint32).ravel()
+            pixels = table.take(role_map(self.layout))
+            return Image.fromarray(pixels.view(np.uint8).reshape(height, width, 4), "RGBA")
 
     def generate(self) -> Image.Image:
-        img = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-
-        # Base skin
-        draw_cube(draw, self.layout.head, self.palette)
-        draw_face(draw, self.layout.head, self.palette)
-        draw_torso(draw, self.layout.body, self.palette)
-        draw_limb(draw, self.layout.right_arm, self.palette, use_pants=False)
-        draw_limb(draw, self.layout.left_arm, self.palette, use_pants=False)
-        draw_limb(draw, self.layout.right_leg, self.palette, use_pants=True)
-        draw_limb(draw, self.layout.left_leg, self.palette, use_pants=True)
-
-        draw_boots(draw, self.layout.right_leg, self.palette)
-        draw_boots(draw, self.layout.left_leg, self.palette)
-        draw_gloves(draw, self.layout.right_arm, self.palette)
-        draw_gloves(draw, self.layout.left_arm, self.palette)
-
-        # Overlays
-        draw_hair(draw, self.layout.head_overlay, self.palette)
-        self._draw_cloak(draw)
-        self._draw_straps(draw)
+        width, height = self.layout.size
+        key = (self.layout, self.palette)
+        with stage("skin.template", pixels=width * height):
+            template = self.cache.get(key, self.render_base)
 
+        if self.layout.scale > 1:
+            return self._scatter_hd(template)
+
+        img = template.copy()
         # Scatter accent pixels for texture
-        scatter_accent(
-            draw,
-            [
-                self.layout.body["front"],
-                self.layout.right_arm["front"],
-                self.layout.left_arm["front"],
-                self.layout.right_leg["front"],
-                self.layout.left_leg["front"],
-            ],
-            self.palette,
-            self.random,
-            probability=0.04,
-        )
+        boxes = accent_boxes(self.layout)
+        with stage("skin.accents", pixels=len(accent_coordinates(tuple(boxes)))):
+            scatter_accent_bulk(
+                ImageDraw.Draw(img),
+                boxes,
+                self.palette,
+                self.random,
+                probability=ACCENT_PROBABILITY,
+            )
 
         return img
 
-    def _draw_cloak(self, draw: ImageDraw.ImageDraw) -> None:
-        overlay = self.layout.body_overlay
-        fill(draw, overlay["top"], adjust_color(self.palette.shirt, -10))
-        fill(draw, overlay["front"], adjust_color(self.palette.shirt, -14))
-        fill(draw, overlay["back"], adjust_color(self.palette.shirt, -20))
-        fill(draw, overlay["left"], adjust_color(self.palette.shirt, -16))
-        fill(draw, overlay["right"], adjust_color(self.palette.shirt, -12))
+    def _scatter_hd(self, template: Image.Image) -> Image.Image:
+        """Accent dots as ``scale`` x ``scale`` blocks, written with one array assignment."""
+
+        from .engine import accent_indices, pack_color  # engine.py builds on this module
 
-    def _draw_straps(self, draw: ImageDraw.ImageDraw) -> None:
-        accent = adjust_color(self.palette.accent, -12)
-        for part in [self.layout.body, self.layout.left_arm, self.layout.right_arm]:
-            front = part["front"]
-            x0, y0, x1, y1 = front
-            draw.rectangle((x0 + 1, y0 + 1, x0 + 3, y1 - 1), fill=accent)
+        blocks = accent_indices(self.layout)
+        with stage("skin.accents", pixels=blocks.size):
+            hits = blocks[accent_draws(self.random, len(blocks)) < ACCENT_PROBABILITY]
+            pixels = np.array(template).view(np.uint32).ravel()
+            pixels[hits.ravel()] = pack_color(self.palette.accent)
+            width, height = self.layout.size
+            return Image.fromarray(pixels.view(np.uint8).reshape(height, width, 4), "RGBA")
 
 
-__all__ = ["SkinGenerator"]
+__all__ = ["CacheStats", "GENERATOR_VERSION", "SkinGenerator", "TemplateCache", "template_cache"]
@@ -1,19 +1,156 @@
 from __future__ import annotations
 
+import os
 import pathlib
+import queue
+import random
+import threading
 import tkinter as tk
+from dataclasses import dataclass
 from tkinter import filedialog, messagebox
+from typing import Optional, Tuple
 
 from PIL import Image, ImageTk
 
+from .export import PngOptions, save_png
+from .face import locate_face
+from .library import LIBRARY_ENV, snap_palette
+from .preview import render_thumbnail
 from . import (
-    PhotoSkinGenerator,
+    Palette,
     SkinGenerator,
     apply_face_tile,
     base_palettes,
+    derive_palette_from_photo,
     face_tile_from_photo,
+    load_photo,
 )
 
+PREVIEW_DEBOUNCE_MS = 250
+POLL_INTERVAL_MS = 40
+# Isometric front/back views at this zoom, next to the flat skin scaled to their height.
+PREVIEW_ZOOM = 5
+
+
+@dataclass(frozen=True)
+class RenderRequest:
+    job_id: int
+    photo_path: str
+    palette_key: str
+    include_face: bool
+    seed: int
+    output: Optional[pathlib.Path] = None
+    snap: bool = False
+
+
+@dataclass
+class RenderResult:
+    request: RenderRequest
+    skin: Optional[Image.Image] = None
+    palette_label: str = ""
+    error: Optional[str] = None
+
+
+class _Superseded(Exception):
+    pass
+
+
+class RenderWorker:
+    """Renders skins on a background thread so Tk's loop never blocks.
+
+    Preview requests supersede each other: a newer preview makes the worker
+    drop an older one between stages (decode, palette, render). Save
+    requests always run to completion. The decoded photo, its derived palette
+    and face tile are kept for the last photo (keyed by path, mtime and
+    size), so re-rendering for a palette or face toggle skips the decode.
+    Finished ``RenderResult``s are put on ``results`` for the UI thread.
+    """
+
+    def __init__(self) -> None:
+        self.results: "queue.Queue[RenderResult]" = queue.Queue()
+        self._requests: "queue.Queue[Optional[RenderRequest]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._latest_preview = -1
+        self._photo_key: Optional[tuple] = None
+        self._photo: Optional[Tuple[Image.Image, Palette, Image.Image]] = None
+        self._thread = threading.Thread(target=self._run, name="skin-render", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self, photo_path: str, palette_key: str, include_face: bool, seed: int, output=None, snap: bool = False
+    ) -> int:
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+            if output is None:
+                self._latest_preview = job_id
+        self._requests.put(RenderRequest(job_id, photo_path, palette_key, include_face, seed, output, snap))
+        return job_id
+
+    def cancel_previews(self) -> None:
+        with self._lock:
+            self._latest_preview = self._next_id
+
+    def stop(self) -> None:
+        self._requests.put(None)
+
+    def _check(self, request: RenderRequest) -> None:
+        if request.output is None and request.job_id != self._latest_preview:
+            raise _Superseded()
+
+    def _photo_state(self, path: str, request: RenderRequest) -> Tuple[Image.Image, Palette, Image.Image]:
+        stat = pathlib.Path(path).stat()
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key != self._photo_key:
+            image = load_photo(path)
+            self._check(request)
+            face_box = locate_face(image)
+            palette = derive_palette_from_photo(image, face_box=face_box)
+            self._check(request)
+            face = face_tile_from_photo(image, face_box=face_box)
+            self._photo_key, self._photo = key, (image, palette, face)
+        return self._photo
+
+    def render(self, request: RenderRequest) -> Tuple[Image.Image, str]:
+        state = self._photo_state(request.photo_path, request) if request.photo_path else None
+        if request.palette_key == "auto":
+            if state is None:
+                raise ValueError("「auto」には写真が必要です")
+            _, palette, face = state
+            include_face, label = True, "写真から自動抽出"
+            if request.snap:
+                match = snap_palette(palette)
+                palette, label = match.palette, f"{match.name} (写真に最も近いパレット)"
+        else:
+            palette = base_palettes()[request.palette_key]
+            face = state[2] if state else None
+            include_face, label = request.include_face and face is not None, request.palette_key
+        generator = SkinGenerator(palette=palette, seed=request.seed)
+        skin = generator.generate()
+        if include_face:
+            skin = apply_face_tile(skin, face, generator.layout, in_place=True)
+        self._check(request)
+        if request.output is not None:
+            request.output.parent.mkdir(parents=True, exist_ok=True)
+            save_png(skin, request.output, PngOptions())
+        return skin, label
+
+    def _run(self) -> None:
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            try:
+                self._check(request)
+                skin, label = self.render(request)
+            except _Superseded:
+                continue
+            except Exception as exc:  # reported to the UI thread
+                self.results.put(RenderResult(request, error=str(exc)))
+                continue
+            self.results.put(RenderResult(request, skin=skin, palette_label=label))
+
 
 class SkinGuiApp:
     def __init__(self) -> None:
@@ -24,10 +161,22 @@ class SkinGuiApp:
         self.output_path = tk.StringVar(value=str(pathlib.Path("build/photo_skin.png")))
         self.palette_choice = tk.StringVar(value="auto")
         self.include_face = tk.BooleanVar(value=True)
+        # Snapping only pays off with a curated library; with just the
+        # built-in palettes it would throw the photo's colours away.
+        self.snap = tk.BooleanVar(value=bool(os.environ.get(LIBRARY_ENV)))
         self.status = tk.StringVar(value="写真を選んでから生成してください")
         self.preview_image = None
+        # Live previews reuse the seed of the last generated skin, so they
+        # match what was saved; each click of "generate" draws a new one.
+        self.seed = random.randrange(2**31)
+        self.worker = RenderWorker()
+        self._preview_after: Optional[str] = None
 
         self._build_layout()
+        for variable in (self.photo_path, self.palette_choice, self.include_face, self.snap):
+            variable.trace_add("write", self._schedule_preview)
+        self.root.protocol("WM_DELETE_WINDOW", self._close)
+        self.root.after(POLL_INTERVAL_MS, self._poll_results)
 
     def _build_layout(self) -> None:
         frame = tk.Frame(self.root, padx=16, pady=16)
@@ -47,22 +196,25 @@ class SkinGuiApp:
         tk.Checkbutton(frame, text="顔も写真から 8x8 で取り込み", variable=self.include_face).grid(
             row=3, column=1, sticky="w"
         )
+        tk.Checkbutton(frame, text="auto: パレット集の最も近いものに合わせる", variable=self.snap).grid(
+            row=4, column=0, columnspan=2, sticky="w"
+        )
 
-        tk.Label(frame, text="3. 出力先ファイル").grid(row=4, column=0, sticky="w", pady=(8, 0))
+        tk.Label(frame, text="3. 出力先ファイル").grid(row=5, column=0, sticky="w", pady=(8, 0))
         tk.Entry(frame, textvariable=self.output_path, width=38).grid(
-            row=5, column=0, sticky="we", padx=(0, 8)
+            row=6, column=0, sticky="we", padx=(0, 8)
         )
-        tk.Button(frame, text="保存先...", command=self._select_output).grid(row=5, column=1)
+        tk.Button(frame, text="保存先...", command=self._select_output).grid(row=6, column=1)
 
         tk.Button(frame, text="スキンを生成", command=self._generate, width=20).grid(
-            row=6, column=0, pady=(12, 4), sticky="w"
+            row=7, column=0, pady=(12, 4), sticky="w"
         )
         tk.Label(frame, textvariable=self.status, fg="#2c5282").grid(
-            row=6, column=1, sticky="w"
+            row=7, column=1, sticky="w"
         )
 
         self.preview_label = tk.Label(frame, text="プレビューはここに表示されます")
-        self.preview_label.grid(row=7, column=0, columnspan=2, pady=(12, 0))
+        self.preview_label.grid(row=8, column=0, columnspan=2, pady=(12, 0))
 
     def _select_photo(self) -> None:
         filename = filedialog.askopenfilename(
@@ -78,46 +230,77 @@ class SkinGuiApp:
         if filename:
             self.output_path.set(filename)
 
-    def _load_photo(self) -> Image.Image:
-        return Image.open(self.photo_path.get()).convert("RGBA")
+    def _schedule_preview(self, *_: object) -> None:
+        """Debounce: re-render the preview once the inputs stop changing."""
+
+        if self._preview_after is not None:
+            self.root.after_cancel(self._preview_after)
+        self.worker.cancel_previews()
+        self._preview_after = self.root.after(PREVIEW_DEBOUNCE_MS, self._request_preview)
+
+    def _request_preview(self) -> None:
+        self._preview_after = None
+        photo = self.photo_path.get()
+        if photo and not pathlib.Path(photo).is_file():
+            return
+        if not photo and self.palette_choice.get() == "auto":
+            return
+        self.worker.submit(
+            photo, self.palette_choice.get(), self.include_face.get(), self.seed, snap=self.snap.get()
+        )
+        self.status.set("プレビューを生成中...")
 
     def _generate(self) -> None:
         if not self.photo_path.get():
             messagebox.showerror("エラー", "まず写真を選択してください")
             return
 
-        try:
-            photo = self._load_photo()
-        except Exception as exc:  # pragma: no cover - GUI message surface
-            messagebox.showerror("読み込み失敗", f"画像を開けませんでした: {exc}")
-            return
-
         output = pathlib.Path(self.output_path.get()).expanduser()
-        output.parent.mkdir(parents=True, exist_ok=True)
+        self.seed = random.randrange(2**31)
+        self.worker.submit(
+            self.photo_path.get(),
+            self.palette_choice.get(),
+            self.include_face.get(),
+            self.seed,
+            output=output,
+            snap=self.snap.get(),
+        )
+        self.status.set("生成中...")
 
-        palette_key = self.palette_choice.get()
-        if palette_key == "auto":
-            generator = PhotoSkinGenerator(photo_path=pathlib.Path(self.photo_path.get()))
-            skin = generator.generate()
-            palette_used = "写真から自動抽出"
+    def _poll_results(self) -> None:
+        try:
+            while True:
+                self._handle_result(self.worker.results.get_nowait())
+        except queue.Empty:
+            pass
+        self.root.after(POLL_INTERVAL_MS, self._poll_results)
+
+    def _handle_result(self, result: RenderResult) -> None:
+        output = result.request.output
+        if result.error is not None:
+            if output is not None:
+                messagebox.showerror("生成失敗", f"スキンを生成できませんでした: {result.error}")
+            self.status.set(f"エラー: {result.error}")
+            return
+        if output is not None:
+            self.status.set(f"{output} に保存しました (パレット: {result.palette_label})")
         else:
-            palette = base_palettes()[palette_key]
-            base_generator = SkinGenerator(palette=palette)
-            skin = base_generator.generate()
-            if self.include_face.get():
-                face = face_tile_from_photo(photo)
-                skin = apply_face_tile(skin, face, base_generator.layout)
-            palette_used = palette_key
-
-        skin.save(output, format="PNG")
-        self.status.set(f"{output} に保存しました (パレット: {palette_used})")
-        self._show_preview(skin)
+            self.status.set(f"プレビュー (パレット: {result.palette_label})")
+        self._show_preview(result.skin)
 
     def _show_preview(self, skin) -> None:
-        preview = skin.resize((192, 192), Image.NEAREST)
+        views = render_thumbnail(skin, zoom=PREVIEW_ZOOM)
+        flat = skin.resize((views.height * skin.width // skin.height, views.height), Image.NEAREST)
+        preview = Image.new("RGBA", (views.width + 8 + flat.width, views.height))
+        preview.paste(views, (0, 0))
+        preview.paste(flat, (views.width + 8, 0))
         self.preview_image = ImageTk.PhotoImage(preview)
         self.preview_label.configure(image=self.preview_image)
 
+    def _close(self) -> None:
+        self.worker.stop()
+        self.root.destroy()
+
     def run(self) -> None:
         self.root.mainloop()
 
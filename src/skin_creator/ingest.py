@@ -0,0 +1,319 @@
+"""Bulk photo-to-skin ingestion as a pipeline of overlapping stages.
+
+``PhotoSkinGenerator`` runs one photo start to finish, so the CPU idles
+while the next file is read. ``ingest_photos`` instead passes every photo
+through four stages, each with its own thread pool, connected by bounded
+queues:
+
+* ``read``: the file's bytes (I/O bound);
+* ``decode``: ``PhotoCache`` lookup, else ``load_photo`` (Pillow decodes
+  and reduces without holding the GIL);
+* ``derive``: face location, palette and face tile, stored back into
+  the cache;
+* ``render``: skin generation, face compositing and PNG encoding (zlib
+  also releases the GIL).
+
+The calling thread writes the PNGs to a ``SkinSink`` in input order. At
+most ``max_in_flight`` photos are anywhere in the pipeline, including
+finished ones waiting for an earlier photo, so memory stays bounded no
+matter how many files there are or how slow the sink is. A photo that
+fails in any stage is recorded with its error and skipped by the later
+stages; it never stalls the others. For the same seed each skin matches
+``PhotoSkinGenerator``'s.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import pathlib
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from PIL import Image, UnidentifiedImageError
+
+from .export import PngOptions, encode_png
+from .face import locate_face
+from .generator import SkinGenerator
+from .layout import Box
+from .palette import Palette
+from .photo import PhotoCache, apply_face_tile, derive_from_photo, load_photo
+from .sinks import SkinSink
+
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+STAGES = ("read", "decode", "derive", "render")
+
+_DONE = object()
+
+
+def iter_photos(source: Union[str, pathlib.Path]) -> Iterator[Tuple[str, pathlib.Path]]:
+    """Yield ``(name, path)`` for each photo under ``source`` (sorted, recursive), or ``source`` itself.
+
+    ``name`` is the path relative to ``source`` with the extension replaced
+    by ``.png``, which is where the skin is written.
+    """
+
+    source = pathlib.Path(source)
+    if not source.is_dir():
+        yield source.with_suffix(".png").name, source
+        return
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(PHOTO_EXTENSIONS):
+                path = pathlib.Path(root) / name
+                yield path.relative_to(source).with_suffix(".png").as_posix(), path
+
+
+@dataclass
+class _Item:
+    index: int
+    name: str
+    path: pathlib.Path
+    data: Optional[bytes] = None
+    key: Optional[str] = None
+    image: Optional[Image.Image] = None
+    derived: Optional[Tuple[Palette, Image.Image, Box]] = None
+    png: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestProgress:
+    """Snapshot passed to the ``progress`` callback; ``total`` is ``None`` if unknown."""
+
+    done: int
+    failed: int
+    total: Optional[int]
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+@dataclass
+class IngestResult:
+    """Written skins, per-photo failures as ``(name, error)``, and busy seconds per stage."""
+
+    count: int
+    elapsed: float
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+    busy: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+class _Stage:
+    """``workers`` threads applying ``func`` to items from ``inbox`` and passing them on.
+
+    Items that already failed, or every item once ``stop`` is set, are
+    passed through untouched. An exception from ``func`` marks the item
+    failed. The last thread to see ``_DONE`` forwards it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[_Item], None],
+        workers: int,
+        inbox: "queue.Queue",
+        outbox: "queue.Queue",
+        stop: threading.Event,
+    ) -> None:
+        self.name, self.func, self.inbox, self.outbox, self.stop = name, func, inbox, outbox, stop
+        self.busy = 0.0
+        self._lock = threading.Lock()
+        self._running = workers
+        self.threads = [
+            threading.Thread(target=self._run, name=f"ingest-{name}-{index}", daemon=True) for index in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self) -> None:
+        busy = 0.0
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                self.inbox.put(_DONE)  # wake the sibling threads
+                break
+            if item.error is None and not self.stop.is_set():
+                started = time.perf_counter()
+                try:
+                    self.func(item)
+                except Exception as exc:  # recorded per photo, the pipeline goes on
+                    item.error = f"{type(exc).__name__}: {exc}"
+                    item.data = item.image = item.derived = item.png = None
+                busy += time.perf_counter() - started
+            self.outbox.put(item)
+        with self._lock:
+            self.busy += busy
+            self._running -= 1
+            if not self._running:
+                self.outbox.put(_DONE)
+
+
+def ingest_photos(
+    photos: Iterable[Tuple[str, Union[str, pathlib.Path]]],
+    sink: SkinSink,
+    *,
+    seed: int | None = None,
+    accent_mode: str = "compat",
+    layout: str = "classic",
+    scale: int = 1,
+    quantizer: str = "mediancut",
+    png: PngOptions = PngOptions(),
+    cache: PhotoCache | None = None,
+    workers: Optional[Dict[str, int]] = None,
+    max_in_flight: int | None = None,
+    total: int | None = None,
+    progress: Callable[[IngestProgress], None] | None = None,
+    progress_interval: float = 1.0,
+) -> IngestResult:
+    """Turn ``(name, path)`` photos (see ``iter_photos``) into skins written to ``sink``.
+
+    ``workers`` maps stage names (``STAGES``) to thread counts; ``read``
+    defaults to 4 and the others to the CPU count. ``max_in_flight``
+    defaults to four photos per thread. ``progress`` is called from this
+    thread at most every ``progress_interval`` seconds and once at the end.
+    Errors from the sink abort the run and are raised after the pipeline
+    has wound down; the sink is closed either way.
+    """
+
+    cpus = os.cpu_count() or 1
+    counts = {"read": 4, "decode": cpus, "derive": cpus, "render": cpus, **(workers or {})}
+    unknown = sorted(set(counts) - set(STAGES))
+    if unknown or min(counts.values()) < 1:
+        raise ValueError(f"workers must map {STAGES} to positive thread counts, got {workers!r}")
+    max_in_flight = max_in_flight or 4 * sum(counts.values())
+    tile_size = 8 * scale
+
+    def read(item: _Item) -> None:
+        item.data = item.path.read_bytes()
+
+    def decode(item: _Item) -> None:
+        if cache is not None:
+            item.key = cache.key(item.data, tile_size=tile_size, quantizer=quantizer)
+            item.derived = cache.load(item.key)
+        if item.derived is None:
+            try:
+                item.image = load_photo(io.BytesIO(item.data))
+            except UnidentifiedImageError:
+                raise ValueError("not an image Pillow can read") from None
+        item.data = None
+
+    def derive(item: _Item) -> None:
+        if item.derived is None:
+            face_box = locate_face(item.image)
+            palette, tile = derive_from_photo(item.image, quantizer=quantizer, tile_size=tile_size, face_box=face_box)
+            item.derived = palette, tile, face_box
+            if cache is not None:
+                cache.store(item.key, *item.derived)
+        item.image = None
+
+    def render(item: _Item) -> None:
+        palette, face, _ = item.derived
+        generator = SkinGenerator(palette=palette, seed=seed, accent_mode=accent_mode, layout=layout, scale=scale)
+        skin = apply_face_tile(generator.generate(), face, generator.layout, in_place=True)
+        item.png = encode_png(skin, png)
+        item.derived = None
+
+    started = time.perf_counter()
+    stop = threading.Event()
+    slots = threading.Semaphore(max_in_flight)
+    queues = [queue.Queue(maxsize=max_in_flight) for _ in range(len(STAGES) + 1)]
+    stages = [
+        _Stage(name, func, counts[name], queues[index], queues[index + 1], stop)
+        for index, (name, func) in enumerate(zip(STAGES, (read, decode, derive, render)))
+    ]
+
+    def feed() -> None:
+        try:
+            for index, (name, path) in enumerate(photos):
+                slots.acquire()
+                if stop.is_set():
+                    break
+                queues[0].put(_Item(index, name, pathlib.Path(path)))
+        except BaseException as exc:  # e.g. the photo listing failed; surfaced below
+            feed_error.append(exc)
+            stop.set()
+        queues[0].put(_DONE)
+
+    feed_error: List[BaseException] = []
+    feeder = threading.Thread(target=feed, name="ingest-feed", daemon=True)
+    feeder.start()
+
+    result = IngestResult(count=0, elapsed=0.0)
+    pending: Dict[int, _Item] = {}
+    next_index = 0
+    reported = started
+    error: Optional[BaseException] = None
+    finished = False
+    try:
+        with sink:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    finished = True
+                    break
+                pending[item.index] = item
+                while next_index in pending:
+                    ready = pending.pop(next_index)
+                    next_index += 1
+                    slots.release()
+                    if stop.is_set():
+                        continue
+                    if ready.error is not None:
+                        result.failures.append((ready.name, ready.error))
+                        continue
+                    try:
+                        sink.write(ready.name, ready.png, {"photo": str(ready.path), "seed": seed})
+                    except Exception as exc:  # stop feeding and drain, then raise
+                        error = exc
+                        stop.set()
+                        continue
+                    result.count += 1
+                now = time.perf_counter()
+                if progress is not None and now - reported >= progress_interval:
+                    reported = now
+                    progress(IngestProgress(result.count, result.failed, total, now - started))
+    finally:
+        if not finished:  # interrupted: let every thread run out before leaving
+            stop.set()
+            for _ in range(max_in_flight):
+                slots.release()
+            while queues[-1].get() is not _DONE:
+                pass
+        feeder.join()
+        for stage in stages:
+            for thread in stage.threads:
+                thread.join()
+    if error is not None:
+        raise error
+    if feed_error:
+        raise feed_error[0]
+    result.elapsed = time.perf_counter() - started
+    result.busy = {stage.name: stage.busy for stage in stages}
+    if progress is not None:
+        progress(IngestProgress(result.count, result.failed, total, result.elapsed))
+    return result
+
+
+__all__ = [
+    "PHOTO_EXTENSIONS",
+    "STAGES",
+    "IngestProgress",
+    "IngestResult",
+    "ingest_photos",
+    "iter_photos",
+]
@@ -1,60 +1,240 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
 
 Box = Tuple[int, int, int, int]
 
 
+class Faces(NamedTuple):
+    """The six UV boxes of one cuboid part.
+
+    Boxes are read as attributes (``faces.front``), by ``FACE_*`` index, or
+    by name as with the old per-part dicts (``faces["front"]``).
+    """
+
+    top: Box
+    bottom: Box
+    right: Box
+    front: Box
+    left: Box
+    back: Box
+
+    def __getitem__(self, key: Union[str, int, slice]) -> Any:  # type: ignore[override]
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+
+FACE_TOP, FACE_BOTTOM, FACE_RIGHT, FACE_FRONT, FACE_LEFT, FACE_BACK = range(6)
+
+PARTS = (
+    "head",
+    "head_overlay",
+    "body",
+    "body_overlay",
+    "right_arm",
+    "right_arm_overlay",
+    "right_leg",
+    "right_leg_overlay",
+    "left_leg",
+    "left_leg_overlay",
+    "left_arm",
+    "left_arm_overlay",
+)
+
+
+def _cube(x: int, y: int) -> Faces:
+    return Faces(
+        top=(x + 8, y, x + 16, y + 8),
+        bottom=(x + 16, y, x + 24, y + 8),
+        right=(x, y + 8, x + 8, y + 16),
+        front=(x + 8, y + 8, x + 16, y + 16),
+        left=(x + 16, y + 8, x + 24, y + 16),
+        back=(x + 24, y + 8, x + 32, y + 16),
+    )
+
+
+def _body(x: int, y: int) -> Faces:
+    return Faces(
+        top=(x + 4, y, x + 12, y + 4),
+        bottom=(x + 12, y, x + 20, y + 4),
+        right=(x, y + 4, x + 4, y + 16),
+        front=(x + 4, y + 4, x + 12, y + 16),
+        left=(x + 12, y + 4, x + 16, y + 16),
+        back=(x + 16, y + 4, x + 24, y + 16),
+    )
+
+
+def _limb(x: int, y: int, width: int = 4) -> Faces:
+    """A 4-deep, 12-high limb; slim ("Alex") arms are 3 pixels wide."""
+
+    return Faces(
+        top=(x + 4, y, x + 4 + width, y + 4),
+        bottom=(x + 4 + width, y, x + 4 + 2 * width, y + 4),
+        right=(x, y + 4, x + 4, y + 16),
+        front=(x + 4, y + 4, x + 4 + width, y + 16),
+        left=(x + 4 + width, y + 4, x + 8 + width, y + 16),
+        back=(x + 8 + width, y + 4, x + 8 + 2 * width, y + 16),
+    )
+
+
+@dataclass(frozen=True, eq=False)
 class SkinLayout:
-    """Maps Minecraft skin UV positions for a 64x64 classic skin.
+    """Maps Minecraft skin UV positions for one skin format.
 
     Coordinates are expressed as (left, top, right, bottom) with the right and
     bottom values being *exclusive* to align with Pillow's box handling.
+    Each part is a ``Faces`` tuple, or ``None`` when the format has no such
+    part (the legacy 64x32 format has no left limbs and no body or limb
+    overlays). ``boxes`` holds the same boxes as a read-only
+    ``(len(PARTS), 6, 4)`` array, with ``-1`` rows for missing parts.
+
+    Layouts are immutable and built once at import; use ``get_layout`` to
+    fetch the shared instance instead of constructing one. ``SkinLayout()``
+    with no arguments still builds a fresh classic 64x64 layout. HD layouts
+    (``scale`` > 1) have every box and the size multiplied by ``scale``.
+
+    Layouts compare and hash by ``key``, their name, size, scale and boxes,
+    so the render caches keyed by layout share one entry between equal
+    layouts and never serve one layout's pixels for another.
     """
 
-    def __init__(self) -> None:
-        self.head = self._cube((0, 0))
-        self.head_overlay = self._cube((32, 0))
-        self.body = self._body((16, 16))
-        self.body_overlay = self._body((16, 32))
-        self.right_arm = self._limb((40, 16))
-        self.right_arm_overlay = self._limb((40, 32))
-        self.right_leg = self._limb((0, 16))
-        self.right_leg_overlay = self._limb((0, 32))
-        self.left_leg = self._limb((16, 48))
-        self.left_leg_overlay = self._limb((0, 48))
-        self.left_arm = self._limb((32, 48))
-        self.left_arm_overlay = self._limb((48, 48))
-
-    def _cube(self, origin: Tuple[int, int]) -> Dict[str, Box]:
-        x, y = origin
-        return {
-            "top": (x + 8, y, x + 16, y + 8),
-            "bottom": (x + 16, y, x + 24, y + 8),
-            "right": (x, y + 8, x + 8, y + 16),
-            "front": (x + 8, y + 8, x + 16, y + 16),
-            "left": (x + 16, y + 8, x + 24, y + 16),
-            "back": (x + 24, y + 8, x + 32, y + 16),
-        }
-
-    def _body(self, origin: Tuple[int, int]) -> Dict[str, Box]:
-        x, y = origin
-        return {
-            "top": (x + 4, y, x + 12, y + 4),
-            "bottom": (x + 12, y, x + 20, y + 4),
-            "right": (x, y + 4, x + 4, y + 16),
-            "front": (x + 4, y + 4, x + 12, y + 16),
-            "left": (x + 12, y + 4, x + 16, y + 16),
-            "back": (x + 16, y + 4, x + 24, y + 16),
-        }
-
-    def _limb(self, origin: Tuple[int, int]) -> Dict[str, Box]:
-        x, y = origin
-        return {
-            "top": (x + 4, y, x + 8, y + 4),
-            "bottom": (x + 8, y, x + 12, y + 4),
-            "right": (x, y + 4, x + 4, y + 16),
-            "front": (x + 4, y + 4, x + 8, y + 16),
-            "left": (x + 8, y + 4, x + 12, y + 16),
-            "back": (x + 12, y + 4, x + 16, y + 16),
-        }
+    name: str = "classic"
+    size: Tuple[int, int] = (64, 64)
+    head: Faces = _cube(0, 0)
+    head_overlay: Faces = _cube(32, 0)
+    body: Faces = _body(16, 16)
+    right_arm: Faces = _limb(40, 16)
+    right_leg: Faces = _limb(0, 16)
+    body_overlay: Optional[Faces] = _body(16, 32)
+    right_arm_overlay: Optional[Faces] = _limb(40, 32)
+    right_leg_overlay: Optional[Faces] = _limb(0, 32)
+    left_leg: Optional[Faces] = _limb(16, 48)
+    left_leg_overlay: Optional[Faces] = _limb(0, 48)
+    left_arm: Optional[Faces] = _limb(32, 48)
+    left_arm_overlay: Optional[Faces] = _limb(48, 48)
+    scale: int = 1
+    boxes: np.ndarray = field(init=False, repr=False)
+    key: Tuple[str, Tuple[int, int], int, bytes] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        boxes = np.full((len(PARTS), 6, 4), -1, dtype=np.int16)
+        for index, part in enumerate(PARTS):
+            faces = getattr(self, part)
+            if faces is not None:
+                boxes[index] = faces
+        boxes.setflags(write=False)
+        object.__setattr__(self, "boxes", boxes)
+        object.__setattr__(self, "key", (self.name, tuple(self.size), self.scale, boxes.tobytes()))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SkinLayout):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    @property
+    def base(self) -> "SkinLayout":
+        """The 1x layout this one was scaled from (the layout itself at 1x)."""
+
+        return self if self.scale == 1 else LAYOUTS[self.name]
+
+
+def _scale_faces(faces: Optional[Faces], factor: int) -> Optional[Faces]:
+    if faces is None:
+        return None
+    return Faces(*(tuple(value * factor for value in box) for box in faces))
+
+
+def build_layout(name: str) -> SkinLayout:
+    """Build the ``classic``, ``slim`` or ``legacy`` layout from scratch."""
+
+    if name == "legacy":
+        return SkinLayout(
+            name=name,
+            size=(64, 32),
+            head=_cube(0, 0),
+            head_overlay=_cube(32, 0),
+            body=_body(16, 16),
+            right_arm=_limb(40, 16),
+            right_leg=_limb(0, 16),
+            body_overlay=None,
+            right_arm_overlay=None,
+            right_leg_overlay=None,
+            left_leg=None,
+            left_leg_overlay=None,
+            left_arm=None,
+            left_arm_overlay=None,
+        )
+    if name not in ("classic", "slim"):
+        raise ValueError(f"unknown layout {name!r}; expected one of {LAYOUT_NAMES}")
+    arm = 3 if name == "slim" else 4
+    return SkinLayout(
+        name=name,
+        size=(64, 64),
+        head=_cube(0, 0),
+        head_overlay=_cube(32, 0),
+        body=_body(16, 16),
+        body_overlay=_body(16, 32),
+        right_arm=_limb(40, 16, arm),
+        right_arm_overlay=_limb(40, 32, arm),
+        right_leg=_limb(0, 16),
+        right_leg_overlay=_limb(0, 32),
+        left_leg=_limb(16, 48),
+        left_leg_overlay=_limb(0, 48),
+        left_arm=_limb(32, 48, arm),
+        left_arm_overlay=_limb(48, 48, arm),
+    )
+
+
+LAYOUT_NAMES = ("classic", "slim", "legacy")
+LAYOUTS: Mapping[str, SkinLayout] = MappingProxyType({name: build_layout(name) for name in LAYOUT_NAMES})
+
+# HD resource-pack resolutions: 64x64 at 1x up to 512x512 at 8x.
+SCALES = (1, 2, 4, 8)
+
+
+@lru_cache(maxsize=None)
+def _scaled_layout(name: str, scale: int) -> SkinLayout:
+    base = LAYOUTS[name]
+    parts = {part: _scale_faces(getattr(base, part), scale) for part in PARTS}
+    return replace(base, size=(base.size[0] * scale, base.size[1] * scale), scale=scale, **parts)
+
+
+def get_layout(name: str = "classic", scale: int = 1) -> SkinLayout:
+    """Return the shared, precomputed layout called ``name`` at ``scale``."""
+
+    if name not in LAYOUTS:
+        raise ValueError(f"unknown layout {name!r}; expected one of {LAYOUT_NAMES}")
+    if scale not in SCALES:
+        raise ValueError(f"unsupported scale {scale!r}; expected one of {SCALES}")
+    if scale == 1:
+        return LAYOUTS[name]
+    return _scaled_layout(name, scale)
+
+
+__all__ = [
+    "FACE_BACK",
+    "FACE_BOTTOM",
+    "FACE_FRONT",
+    "FACE_LEFT",
+    "FACE_RIGHT",
+    "FACE_TOP",
+    "Faces",
+    "LAYOUTS",
+    "LAYOUT_NAMES",
+    "PARTS",
+    "SCALES",
+    "SkinLayout",
+    "build_layout",
+    "get_layout",
+]
@@ -0,0 +1,200 @@
+"""A library of named palettes with nearest-palette lookup in CIELAB.
+
+Libraries are stored as ``.npz`` files with a ``name`` column and one
+``palette_<field>`` column of ``(N, 4)`` uint8 RGBA per ``Palette`` field,
+which is the layout ``analysis.analyze`` writes, so an analysed skin
+collection can be used as a library directly. Palettes are only turned
+into ``Palette`` objects when returned from a lookup.
+
+Each palette is compared as the CIELAB (D65) coordinates of its five
+colours; the distance is the root mean square of the per-colour CIE76
+delta E, so ``2.3`` is roughly one just-noticeable difference per colour.
+Lookups are a single matrix-vector product over the whole library.
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+from functools import cached_property, lru_cache
+from typing import List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .palette import PALETTE_FIELDS, Palette, base_palettes
+
+# Path of the ``.npz`` library loaded by ``load_library()``; the built-in
+# palettes are used when it is unset.
+LIBRARY_ENV = "SKIN_CREATOR_PALETTES"
+
+_WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+_RGB_TO_XYZ = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+# sRGB decoding for every 8-bit value.
+_LINEAR = np.arange(256) / 255.0
+_LINEAR = np.where(_LINEAR <= 0.04045, _LINEAR / 12.92, ((_LINEAR + 0.055) / 1.055) ** 2.4)
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Convert ``(..., 3)`` 8-bit sRGB values to CIELAB (D65) as float32."""
+
+    xyz = _LINEAR[np.asarray(rgb, dtype=np.uint8)] @ (_RGB_TO_XYZ.T / _WHITE_D65)
+    delta = 6 / 29
+    f = np.where(xyz > delta**3, np.cbrt(xyz), xyz / (3 * delta**2) + 4 / 29)
+    lab = np.stack(
+        [116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])],
+        axis=-1,
+    )
+    return lab.astype(np.float32)
+
+
+def palette_vectors(colors: np.ndarray) -> np.ndarray:
+    """Flatten ``(N, len(PALETTE_FIELDS), >=3)`` RGB(A) colours to ``(N, 15)`` Lab rows."""
+
+    colors = np.asarray(colors)
+    return rgb_to_lab(colors[..., :3]).reshape(len(colors), -1)
+
+
+def _palette_colors(palettes: Sequence[Palette]) -> np.ndarray:
+    return np.array(
+        [[getattr(palette, field) for field in PALETTE_FIELDS] for palette in palettes],
+        dtype=np.uint8,
+    ).reshape(len(palettes), len(PALETTE_FIELDS), 4)
+
+
+class Match(NamedTuple):
+    name: str
+    palette: Palette
+    distance: float
+
+
+class PaletteLibrary:
+    """Named palettes as a ``(N, 5, 4)`` uint8 array with a Lab index.
+
+    The Lab vectors are computed on the first lookup and kept, transposed
+    and with their squared norms appended as a ``(16, N)`` index, so
+    ``nearest`` costs one matrix-vector product over contiguous rows plus
+    a partial sort for ``k`` > 1.
+    """
+
+    def __init__(self, names: Sequence[str], colors: np.ndarray) -> None:
+        colors = np.asarray(colors, dtype=np.uint8)
+        if colors.shape != (len(names), len(PALETTE_FIELDS), 4):
+            raise ValueError(
+                f"expected colours of shape ({len(names)}, {len(PALETTE_FIELDS)}, 4), got {colors.shape}"
+            )
+        self.names = tuple(str(name) for name in names)
+        self.colors = colors
+        self.colors.setflags(write=False)
+
+    @classmethod
+    def from_palettes(cls, palettes: Mapping[str, Palette]) -> "PaletteLibrary":
+        return cls(list(palettes), _palette_colors(list(palettes.values())))
+
+    @classmethod
+    def load(cls, path: Union[str, pathlib.Path]) -> "PaletteLibrary":
+        with np.load(path) as data:
+            colors = np.stack([data[f"palette_{field}"] for field in PALETTE_FIELDS], axis=1)
+            return cls(data["name"].tolist(), colors)
+
+    def save(self, path: Union[str, pathlib.Path]) -> None:
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        columns = {f"palette_{field}": self.colors[:, index] for index, field in enumerate(PALETTE_FIELDS)}
+        np.savez_compressed(path, name=np.array(self.names), **columns)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def palette(self, index: int) -> Palette:
+        return Palette(*(tuple(int(v) for v in color) for color in self.colors[index]))
+
+    @cached_property
+    def vectors(self) -> np.ndarray:
+        return palette_vectors(self.colors)
+
+    @cached_property
+    def _index(self) -> np.ndarray:
+        # [q, 1] @ [-2 v; |v|^2] = |q - v|^2 - |q|^2 for every library row v.
+        vectors = self.vectors
+        norms = np.einsum("ij,ij->i", vectors, vectors)
+        return np.ascontiguousarray(np.vstack([-2 * vectors.T, norms[None, :]]), dtype=np.float32)
+
+    def nearest(self, palette: Palette, k: int = 1) -> List[Match]:
+        """The ``k`` library palettes closest to ``palette``, closest first."""
+
+        indices, distances = self.nearest_many(_palette_colors([palette]), k)
+        return [
+            Match(self.names[index], self.palette(index), float(distance))
+            for index, distance in zip(indices[0], distances[0])
+        ]
+
+    def nearest_many(self, colors: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and distances of the ``k`` nearest palettes for each of ``(M, 5, >=3)`` colours.
+
+        Both results have shape ``(M, min(k, len(self)))``, closest first;
+        equally distant palettes come in library order. Candidates are
+        picked with the float32 index, then their distances are recomputed
+        exactly, so an identical palette is at distance ``0.0``.
+        """
+
+        if not len(self):
+            raise ValueError("the palette library is empty")
+        queries = palette_vectors(colors)
+        squared = np.hstack([queries, np.ones((len(queries), 1), dtype=np.float32)]) @ self._index
+        squared += np.einsum("ij,ij->i", queries, queries)[:, None]
+        k = min(k, len(self))
+        if k == 1:
+            indices = squared.argmin(axis=1)[:, None]
+        else:
+            indices = np.argpartition(squared, k - 1, axis=1)[:, :k]
+            # argpartition picks arbitrarily among scores tied with the k-th;
+            # those rows are sorted in full so the lowest indices win.
+            kth = np.take_along_axis(squared, indices, axis=1).max(axis=1)
+            tied = (squared <= kth[:, None]).sum(axis=1) > k
+            if tied.any():
+                indices[tied] = squared[tied].argsort(axis=1, kind="stable")[:, :k]
+        offsets = self.vectors[indices].astype(np.float64) - queries[:, None, :]
+        distances = np.sqrt(np.einsum("mkj,mkj->mk", offsets, offsets) / len(PALETTE_FIELDS))
+        order = np.lexsort((indices, distances), axis=1)
+        return np.take_along_axis(indices, order, axis=1), np.take_along_axis(distances, order, axis=1)
+
+
+@lru_cache(maxsize=None)
+def _load_library(path: Optional[str]) -> PaletteLibrary:
+    if path is None:
+        return PaletteLibrary.from_palettes(base_palettes())
+    return PaletteLibrary.load(path)
+
+
+def load_library(path: Union[str, pathlib.Path, None] = None) -> PaletteLibrary:
+    """Return the shared library at ``path``, ``$SKIN_CREATOR_PALETTES`` or the built-ins.
+
+    Each path is read once, on first use, and the same instance is
+    returned afterwards.
+    """
+
+    path = path or os.environ.get(LIBRARY_ENV) or None
+    return _load_library(None if path is None else str(pathlib.Path(path).resolve()))
+
+
+def snap_palette(palette: Palette, library: PaletteLibrary | None = None) -> Match:
+    """The library palette closest to ``palette`` (e.g. one derived from a photo)."""
+
+    return (library or load_library()).nearest(palette)[0]
+
+
+__all__ = [
+    "LIBRARY_ENV",
+    "Match",
+    "PaletteLibrary",
+    "load_library",
+    "palette_vectors",
+    "rgb_to_lab",
+    "snap_palette",
+]
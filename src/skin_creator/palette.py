@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Tuple
+from dataclasses import dataclass, fields, replace
+from functools import cached_property, lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
 
 Color = Tuple[int, int, int, int]
 
@@ -20,15 +22,30 @@ def with_alpha(color: Tuple[int, int, int], alpha: int = 255) -> Color:
     return (r, g, b, alpha)
 
 
-@dataclass
+def parse_hex_color(text: str) -> Color:
+    """Parse ``#rrggbb`` / ``rrggbb`` (opaque) or ``rrggbbaa`` into a colour."""
+
+    digits = text.strip().lstrip("#")
+    if len(digits) not in (6, 8):
+        raise ValueError(f"expected a hex colour like #d8b59a, got {text!r}")
+    try:
+        channels = tuple(int(digits[index:index + 2], 16) for index in range(0, len(digits), 2))
+    except ValueError:
+        raise ValueError(f"expected a hex colour like #d8b59a, got {text!r}") from None
+    return channels if len(channels) == 4 else with_alpha(channels)
+
+
+@dataclass(frozen=True)
 class Palette:
+    """Colours for each body part. Frozen so palettes can key caches."""
+
     skin: Color
     hair: Color
     shirt: Color
     pants: Color
     accent: Color
 
-    @property
+    @cached_property
     def darker(self) -> "Palette":
         return Palette(
             skin=adjust_color(self.skin, -12),
@@ -38,7 +55,7 @@ class Palette:
             accent=adjust_color(self.accent, -18),
         )
 
-    @property
+    @cached_property
     def lighter(self) -> "Palette":
         return Palette(
             skin=adjust_color(self.skin, 16),
@@ -49,8 +66,9 @@ class Palette:
         )
 
 
-def base_palettes() -> Dict[str, Palette]:
-    return {
+@lru_cache(maxsize=None)
+def _base_palettes() -> Mapping[str, Palette]:
+    return MappingProxyType({
         "classic": Palette(
             skin=with_alpha((216, 181, 154)),
             hair=with_alpha((84, 57, 45)),
@@ -72,4 +90,31 @@ def base_palettes() -> Dict[str, Palette]:
             pants=with_alpha((54, 67, 94)),
             accent=with_alpha((108, 221, 255)),
         ),
-    }
+    })
+
+
+def base_palettes() -> Dict[str, Palette]:
+    """The built-in palettes by name, as a new dict the caller may change.
+
+    The palettes themselves are built once and shared; they are frozen.
+    """
+
+    return dict(_base_palettes())
+
+
+PALETTE_FIELDS = tuple(field.name for field in fields(Palette))
+
+
+def resolve_palette(name: str = "classic", overrides: Mapping[str, str] | None = None) -> Palette:
+    """Look up a base palette by name and replace parts with hex colours.
+
+    ``overrides`` maps part names (``skin``, ``hair``, ``shirt``, ``pants``,
+    ``accent``) to hex strings; other keys are ignored. Unknown palette names
+    and malformed colours raise ``ValueError``.
+    """
+
+    palettes = _base_palettes()
+    if name not in palettes:
+        raise ValueError(f"unknown palette {name!r}; expected one of {sorted(palettes)}")
+    colors = {part: parse_hex_color(value) for part, value in (overrides or {}).items() if part in PALETTE_FIELDS}
+    return replace(palettes[name], **colors)
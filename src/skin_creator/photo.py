@@ -1,32 +1,79 @@
 from __future__ import annotations
 
+import hashlib
+import io
+import json
+import math
+import os
 import pathlib
-from typing import List, Tuple
+import shutil
+import struct
+import tempfile
+from functools import cached_property
+from typing import BinaryIO, List, Optional, Tuple, Union
 
+import numpy as np
 from PIL import Image
 
+from .compositor import Layer, LayerStack, composite_layer
+from .face import locate_face
 from .generator import SkinGenerator
-from .layout import SkinLayout
+from .layout import Box, SkinLayout
 from .palette import Palette, adjust_color, base_palettes, with_alpha
+from .profiling import stage
 
 RGB = Tuple[int, int, int]
 
+# Shortest photo side the pipeline needs: _quantized_colors samples the photo
+# at 96x96 and the face tile is an 8x8 downscale of the face box, which
+# spans at least a quarter of the shorter side (48 px) at this size.
+PHOTO_DECODE_SIDE = 192
+
+# Modes Image.reduce handles natively; anything else is converted first.
+_REDUCIBLE_MODES = {"L", "LA", "RGB", "RGBA", "CMYK"}
+
+
+def load_photo(source: Union[str, pathlib.Path, BinaryIO], min_side: int = PHOTO_DECODE_SIDE) -> Image.Image:
+    """Decode a photo at the smallest scale the pipeline needs, as RGBA.
+
+    JPEGs are decoded through ``Image.draft``, which lets libjpeg scale by
+    1/2, 1/4 or 1/8 while decoding, so the full-resolution frame is never
+    materialised. The result is then ``reduce``d by an integer factor and
+    only that small image is converted to RGBA. Its shorter side ends up
+    between ``min_side`` and ``2 * min_side`` unless the photo is smaller.
+
+    Peak memory per photo is bounded by the drafted frame: about
+    ``3 * w * h / 64`` bytes for a large JPEG (roughly 1.1 MB for a
+    24-megapixel phone photo, instead of 96 MB as full-size RGBA). Formats
+    without draft support (PNG, WebP, ...) still decode the full frame once,
+    but skip the full-size RGBA conversion.
+    """
+
+    with Image.open(source) as image:
+        width, height = image.size
+        factor = min(width, height) // min_side
+        if factor >= 2:
+            image.draft(None, (math.ceil(width / factor), math.ceil(height / factor)))
+        with stage("photo.decode", pixels=image.width * image.height):
+            image.load()
+        with stage("photo.reduce", pixels=image.width * image.height):
+            if image.mode not in _REDUCIBLE_MODES:
+                image = image.convert("RGBA")
+            factor = min(image.size) // min_side
+            if factor >= 2:
+                image = image.reduce(factor)
+            return image.convert("RGBA")
+
 
 def _brightness(color: RGB) -> float:
     r, g, b = color
     return (0.299 * r) + (0.587 * g) + (0.114 * b)
 
 
-def _central_crop(image: Image.Image, ratio: float = 0.6) -> Image.Image:
-    ratio = max(0.05, min(1.0, ratio))
-    width, height = image.size
-    side = int(min(width, height) * ratio)
-    left = (width - side) // 2
-    top = (height - side) // 2
-    return image.crop((left, top, left + side, top + side))
+QUANTIZERS = ("mediancut", "histogram")
 
 
-def _quantized_colors(image: Image.Image, colors: int = 6) -> List[RGB]:
+def _mediancut_colors(image: Image.Image, colors: int = 6) -> List[RGB]:
     reduced = image.convert("RGB").resize((96, 96))
     quantized = reduced.quantize(colors=colors, method=Image.Quantize.MEDIANCUT)
     palette_data = quantized.getpalette() or []
@@ -44,24 +91,220 @@ def _quantized_colors(image: Image.Image, colors: int = 6) -> List[RGB]:
     return ranked
 
 
-def derive_palette_from_photo(image: Image.Image) -> Palette:
+# Larger images are box-reduced to about this many pixels before binning.
+HISTOGRAM_PIXELS = 512 * 512
+
+
+def _color_histogram(image: Image.Image, bits: int, max_pixels: int = HISTOGRAM_PIXELS) -> np.ndarray:
+    """Count pixels per bin of a ``2**bits`` per channel 3D colour histogram.
+
+    Images over ``max_pixels`` are first shrunk with ``Image.reduce``, which
+    averages every source pixel into the result, so memory and time stay
+    bounded; ``load_photo`` output is already below the limit.
+    """
+
+    factor = math.ceil(math.sqrt(image.width * image.height / max_pixels))
+    if factor >= 2:
+        if image.mode not in _REDUCIBLE_MODES:
+            image = image.convert("RGB")
+        image = image.reduce(factor)
+    # One little-endian uint32 per pixel: R in the low byte, then G, B.
+    packed = np.asarray(image.convert("RGBX")).view("<u4").ravel()
+    mask = (1 << bits) - 1
+    shift = 8 - bits
+    index = (
+        (((packed >> shift) & mask) << (2 * bits))
+        | (((packed >> (8 + shift)) & mask) << bits)
+        | ((packed >> (16 + shift)) & mask)
+    )
+    return np.bincount(index, minlength=1 << (3 * bits))
+
+
+def _bin_centers(bins: np.ndarray, bits: int) -> np.ndarray:
+    mask = (1 << bits) - 1
+    levels = np.stack([(bins >> (2 * bits)) & mask, (bins >> bits) & mask, bins & mask], axis=1)
+    return (levels + 0.5) * (1 << (8 - bits))
+
+
+def _nearest_centers(points_t: np.ndarray, centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Labels and ``|c|^2 - 2 p.c`` scores of the nearest centre, per attempt.
+
+    ``points_t`` is ``(3, N)`` and ``centers`` ``(attempts, k, 3)``; both
+    results are ``(attempts, N)``. The scores come from one matrix product
+    laid out as ``(k, attempts, N)``, updated in place (fresh arrays this
+    large are page-faulted in on every call), and are reduced over ``k`` by
+    a running minimum: NumPy's reductions over a short last axis are
+    several times slower.
+    """
+
+    attempts, k, _ = centers.shape
+    flat = centers.transpose(1, 0, 2).reshape(k * attempts, 3)
+    scores = (-2 * flat) @ points_t
+    scores += (flat**2).sum(axis=1)[:, None]
+    scores = scores.reshape(k, attempts, -1)
+    labels = np.zeros(scores.shape[1:], dtype=np.intp)
+    best = scores[0]
+    for index in range(1, k):
+        closer = scores[index] < best  # strict, so ties keep the lowest index like argmin
+        np.minimum(best, scores[index], out=best)
+        np.putmask(labels, closer, index)
+    return labels, best
+
+
+def _weighted_kmeans(
+    points: np.ndarray, weights: np.ndarray, k: int, seed: int, iterations: int, attempts: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Deterministic weighted k-means with k-means++ seeding.
+
+    Each attempt starts from the heaviest point and draws the other centres
+    from ``default_rng(seed)`` in proportion to weight times squared
+    distance; the attempt with the lowest weighted inertia wins, which keeps
+    the result from flipping between local optima when the photo changes
+    slightly. All attempts run side by side as one ``(attempts, k)`` set of
+    centres, so each Lloyd step is a fixed handful of array operations.
+    Returns the centres and the weight each one covers.
+    """
+
+    count = len(points)
+    points_t = np.ascontiguousarray(points.T)
+    rng = np.random.default_rng(seed)
+    centers = np.empty((attempts, k, 3))
+    centers[:, 0] = points[np.argmax(weights)]
+    distance = np.tile(((points_t - centers[0, 0, :, None]) ** 2).sum(axis=0), (attempts, 1))
+    # Drawn attempt by attempt, the order in which separate runs would draw them.
+    uniforms = rng.random((attempts, k - 1))
+    for index in range(1, k):
+        cumulative = np.cumsum(weights * distance, axis=1)
+        cumulative /= cumulative[:, -1:]
+        picks = np.minimum((cumulative <= uniforms[:, index - 1, None]).sum(axis=1), count - 1)
+        centers[:, index] = points[picks]
+        distance = np.minimum(distance, ((points_t[None] - centers[:, index, :, None]) ** 2).sum(axis=1))
+
+    # Cluster ids are offset per attempt so one bincount covers every attempt.
+    offsets = (k * np.arange(attempts))[:, None]
+    tiled_weights = np.tile(weights, attempts)
+    tiled_moments = [np.tile(weights * points_t[channel], attempts) for channel in range(3)]
+    labels, best = _nearest_centers(points_t, centers)
+    for _ in range(iterations):
+        flat = (labels + offsets).ravel()
+        totals = np.bincount(flat, weights=tiled_weights, minlength=attempts * k).reshape(attempts, k)
+        for channel, moments in enumerate(tiled_moments):
+            moved = np.bincount(flat, weights=moments, minlength=attempts * k).reshape(attempts, k)
+            centers[..., channel] = np.where(totals > 0, moved / np.maximum(totals, 1e-12), centers[..., channel])
+        new_labels, best = _nearest_centers(points_t, centers)
+        if np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+
+    # |p - c|^2 == |p|^2 + (|c|^2 - 2 p.c)
+    inertia = (weights * ((points_t**2).sum(axis=0) + best)).sum(axis=1)
+    winner = int(np.argmin(inertia))
+    return centers[winner], np.bincount(labels[winner], weights=weights, minlength=k)
+
+
+def _histogram_colors(
+    image: Image.Image,
+    colors: int = 6,
+    bits: int = 4,
+    seed: int = 0,
+    iterations: int = 100,
+    attempts: int = 6,
+) -> List[RGB]:
+    """Quantise by clustering a coarse colour histogram instead of pixels.
+
+    Every pixel of ``image`` contributes (no fixed 96x96 resample; very
+    large images are box-averaged first), which keeps palettes stable on
+    busy photos, while k-means only ever sees the
+    centres of the occupied bins (at most ``2**(3*bits)``), weighted by
+    their counts, so its cost does not grow with the image. Colours are
+    ranked by how many pixels they represent.
+    """
+
+    counts = _color_histogram(image, bits)
+    occupied = np.flatnonzero(counts)
+    if len(occupied) == 0:
+        return []
+    weights = counts[occupied].astype(np.float64)
+    points = _bin_centers(occupied, bits)
+    centers, totals = _weighted_kmeans(points, weights, min(colors, len(occupied)), seed, iterations, attempts)
+    ranked = np.argsort(-totals, kind="stable")
+    return [tuple(int(round(channel)) for channel in centers[index]) for index in ranked if totals[index] > 0]
+
+
+def _quantized_colors(image: Image.Image, colors: int = 6, quantizer: str = "mediancut") -> List[RGB]:
+    if quantizer == "mediancut":
+        with stage("photo.quantize", pixels=96 * 96):  # the resample it quantizes
+            return _mediancut_colors(image, colors)
+    if quantizer == "histogram":
+        with stage("photo.quantize", pixels=image.width * image.height):  # every pixel is binned
+            return _histogram_colors(image, colors)
+    raise ValueError(f"unknown quantizer {quantizer!r}; expected one of {QUANTIZERS}")
+
+
+# RGB distance beyond which the face's own median color is used as skin.
+MAX_SKIN_DISTANCE = 48.0
+
+
+def _face_color(image: Image.Image, face_box: Box) -> np.ndarray:
+    """Median RGB of the middle half of the face box, which is mostly skin.
+
+    An empty box (a degenerate photo) falls back to the whole image.
+    """
+
+    left, top, right, bottom = face_box
+    inset_x, inset_y = (right - left) // 4, (bottom - top) // 4
+    inner = image.crop((left + inset_x, top + inset_y, right - inset_x, bottom - inset_y))
+    if inner.width == 0 or inner.height == 0:
+        inner = image
+    return np.median(np.asarray(inner.convert("RGB")).reshape(-1, 3), axis=0)
+
+
+def _face_skin(image: Image.Image, candidates: List[RGB], face_box: Box) -> Tuple[RGB, List[RGB]]:
+    """Skin for ``face_skin`` plus the other candidates by brightness."""
+
+    face = _face_color(image, face_box)
+    distances = [float(np.linalg.norm(np.array(color) - face)) for color in candidates]
+    nearest = int(np.argmin(distances))
+    if distances[nearest] <= MAX_SKIN_DISTANCE:
+        return candidates[nearest], sorted(candidates[:nearest] + candidates[nearest + 1 :], key=_brightness)
+    # A small face loses to the background in quantization.
+    return tuple(int(round(channel)) for channel in face), sorted(candidates, key=_brightness)
+
+
+def derive_palette_from_photo(
+    image: Image.Image,
+    colors: int = 6,
+    quantizer: str = "mediancut",
+    face_box: Box | None = None,
+    face_skin: bool = False,
+) -> Palette:
     """Derive a Minecraft-style palette from a portrait photo.
 
     The algorithm quantizes the picture into a handful of dominant colors and
     assigns them to Minecraft body parts (skin, hair, shirt, pants, accent)
     based on relative brightness. If the image does not provide enough colors,
-    it gracefully falls back to the classic palette.
+    it gracefully falls back to the classic palette. ``quantizer`` selects
+    Pillow's MEDIANCUT on a 96x96 resample or the histogram k-means.
+
+    With ``face_skin``, skin is instead the color closest to the middle of
+    the face (``face_box``, located with ``locate_face`` if not given), or
+    that middle's median color when no dominant color is within
+    ``MAX_SKIN_DISTANCE``; the other parts still follow from brightness.
+    ``face_box`` is ignored otherwise.
     """
 
     fallback = base_palettes()["classic"]
-    candidates = _quantized_colors(image)
+    candidates = _quantized_colors(image, colors=colors, quantizer=quantizer)
     if len(candidates) < 3:
         return fallback
 
-    by_light = sorted(candidates, key=_brightness)
+    if face_skin:
+        skin, by_light = _face_skin(image, candidates, face_box or locate_face(image))
+    else:
+        by_light = sorted(candidates, key=_brightness)
+        skin = by_light[len(by_light) // 2]
     hair = by_light[0]
     accent = by_light[-1]
-    skin = by_light[len(by_light) // 2]
 
     remaining = [c for c in by_light if c not in {hair, accent, skin}]
     if len(remaining) >= 2:
@@ -82,43 +325,322 @@ def derive_palette_from_photo(image: Image.Image) -> Palette:
     )
 
 
-def face_tile_from_photo(image: Image.Image, size: int = 8) -> Image.Image:
-    """Crop the center of the photo and downscale it to an 8x8 face tile."""
+def face_tile_from_photo(
+    image: Image.Image, size: int = 8, crop_ratio: float = 0.5, face_box: Box | None = None
+) -> Image.Image:
+    """Crop the face and downscale it to a ``size`` x ``size`` face tile.
+
+    ``face_box`` defaults to ``locate_face``, which falls back to the
+    central ``crop_ratio`` square when it finds no face.
+    """
+
+    face_box = face_box or locate_face(image, fallback_ratio=crop_ratio)
+    with stage("photo.face_tile", pixels=size * size):
+        return image.crop(face_box).resize((size, size), Image.LANCZOS).convert("RGBA")
+
+
+def derive_from_photo(
+    image: Image.Image,
+    colors: int = 6,
+    quantizer: str = "mediancut",
+    tile_size: int = 8,
+    crop_ratio: float = 0.5,
+    face_box: Box | None = None,
+    face_skin: bool = False,
+) -> Tuple[Palette, Image.Image]:
+    """``(palette, face_tile)`` of a photo, locating the face once for both."""
+
+    face_box = face_box or locate_face(image, fallback_ratio=crop_ratio)
+    palette = derive_palette_from_photo(
+        image, colors=colors, quantizer=quantizer, face_box=face_box, face_skin=face_skin
+    )
+    return palette, face_tile_from_photo(image, size=tile_size, face_box=face_box)
+
+
+def face_layer(face: Image.Image, layout: SkinLayout) -> Layer:
+    """The face tile as a layer over the head's front UV, resized to fit it."""
+
+    x0, y0, x1, y1 = layout.head.front
+    if face.size != (x1 - x0, y1 - y0):
+        face = face.resize((x1 - x0, y1 - y0), Image.LANCZOS)
+    return Layer("face", face if face.mode == "RGBA" else face.convert("RGBA"), (x0, y0))
+
+
+def apply_face_tile(
+    base: Image.Image, face: Image.Image, layout: SkinLayout, *, in_place: bool = False
+) -> Image.Image:
+    """Place a small face tile onto the head UV of the generated skin.
+
+    Only the head's front face is composited. Unless ``in_place`` is set the
+    result is a new image and ``base`` is left untouched.
+    """
+
+    layer = face_layer(face, layout)
+    with stage("photo.composite", pixels=layer.image.width * layer.image.height):
+        if in_place:
+            composite_layer(base, layer)
+            return base
+        return LayerStack(base).push(layer).render()
+
+
+# Bump whenever load_photo, derive_palette_from_photo or face_tile_from_photo
+# change their output; PhotoCache entries of other versions are then ignored.
+PHOTO_ALGORITHM_VERSION = 4
+
+_CACHE_MAGIC = b"MCSP"
+_CACHE_HEADER = struct.Struct("<4sHB")
+_CACHE_BOX = struct.Struct("<4I")
+
+
+class PhotoCache:
+    """Content-addressed on-disk cache of photo-derived palettes, face tiles and face boxes.
+
+    Entries are keyed by a SHA-256 of the photo bytes plus the parameters of
+    the derivation (quantised colour count, face crop ratio, tile size) and
+    live under ``root/v<version>/``, so bumping ``PHOTO_ALGORITHM_VERSION``
+    invalidates everything at once; ``purge_stale_versions`` reclaims the
+    space. Each entry is a small binary file: a header (checked against the
+    cache's version on load), the face box, the five palette colours and
+    the raw RGBA face tile (292 bytes for an 8x8 tile).
+
+    Several processes may share one cache: entries are written to a
+    temporary file (removed again if the write fails) and moved into place
+    with ``os.replace``, readers treat missing or malformed files as misses,
+    and eviction tolerates files that vanish underneath it. Hits refresh the
+    file's mtime, and once the directory exceeds ``max_bytes`` the least
+    recently used entries are removed until it is back under 90% of the
+    budget. The size is checked every ``evict_interval`` stores per process
+    rather than on every write.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, pathlib.Path],
+        max_bytes: int = 64 * 1024 * 1024,
+        version: int = PHOTO_ALGORITHM_VERSION,
+        evict_interval: int = 256,
+    ) -> None:
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.evict_interval = evict_interval
+        self.directory = self.root / f"v{version}"
+        self._stores_since_evict = 0
+
+    def key(
+        self,
+        data: bytes,
+        *,
+        colors: int = 6,
+        crop_ratio: float = 0.5,
+        tile_size: int = 8,
+        quantizer: str = "mediancut",
+    ) -> str:
+        params = {"colors": colors, "crop_ratio": crop_ratio, "tile_size": tile_size, "version": self.version}
+        if quantizer != "mediancut":
+            params["quantizer"] = quantizer
+        params = json.dumps(params, sort_keys=True)
+        digest = hashlib.sha256(data)
+        digest.update(params.encode("ascii"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.bin"
+
+    def load(self, key: str) -> Optional[Tuple[Palette, Image.Image, Box]]:
+        path = self._path(key)
+        try:
+            payload = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return _decode_entry(payload, self.version)
+
+    def store(self, key: str, palette: Palette, tile: Image.Image, face_box: Box) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = _encode_entry(palette, tile, face_box, self.version)
+        handle = tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False)
+        try:
+            with handle:
+                handle.write(payload)
+            os.replace(handle.name, path)
+        finally:
+            # Already gone after a successful replace; removes the leftover otherwise.
+            try:
+                os.unlink(handle.name)
+            except FileNotFoundError:
+                pass
+        self._stores_since_evict += 1
+        if self._stores_since_evict >= self.evict_interval:
+            self.evict()
+
+    def derive(
+        self,
+        photo: Union[str, pathlib.Path, bytes],
+        *,
+        colors: int = 6,
+        crop_ratio: float = 0.5,
+        tile_size: int = 8,
+        quantizer: str = "mediancut",
+    ) -> Tuple[Palette, Image.Image, Box]:
+        """Return ``(palette, face_tile, face_box)`` for a photo path or its raw bytes."""
+
+        with stage("photo.cache_lookup"):
+            data = photo if isinstance(photo, bytes) else pathlib.Path(photo).read_bytes()
+            key = self.key(data, colors=colors, crop_ratio=crop_ratio, tile_size=tile_size, quantizer=quantizer)
+            cached = self.load(key)
+        if cached is not None:
+            return cached
+        image = load_photo(io.BytesIO(data))
+        face_box = locate_face(image, fallback_ratio=crop_ratio)
+        palette, tile = derive_from_photo(
+            image, colors=colors, quantizer=quantizer, tile_size=tile_size, face_box=face_box
+        )
+        self.store(key, palette, tile, face_box)
+        return palette, tile, face_box
+
+    def _entries(self) -> List[Tuple[float, int, pathlib.Path]]:
+        entries = []
+        for path in self.directory.glob("*/*.bin"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Drop least recently used entries once over budget; returns the count removed."""
+
+        self._stores_since_evict = 0
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
 
-    cropped = _central_crop(image, ratio=0.5)
-    return cropped.resize((size, size), Image.LANCZOS).convert("RGBA")
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
 
+    def purge_stale_versions(self) -> None:
+        """Remove entries written by other algorithm versions."""
 
-def apply_face_tile(base: Image.Image, face: Image.Image, layout: SkinLayout) -> Image.Image:
-    """Place a small face tile onto the head UV of the generated skin."""
+        if not self.root.is_dir():
+            return
+        for child in self.root.iterdir():
+            if child.is_dir() and child.name.startswith("v") and child != self.directory:
+                shutil.rmtree(child, ignore_errors=True)
 
-    result = base.copy()
-    x0, y0, x1, y1 = layout.head["front"]
-    tile = face.resize((x1 - x0, y1 - y0), Image.LANCZOS)
-    layer = Image.new("RGBA", base.size, (0, 0, 0, 0))
-    layer.paste(tile, (x0, y0))
-    return Image.alpha_composite(result, layer)
+
+def _encode_entry(palette: Palette, tile: Image.Image, face_box: Box, version: int) -> bytes:
+    tile = tile.convert("RGBA")
+    if tile.width != tile.height or tile.width > 255:
+        raise ValueError("face tiles must be square and at most 255 px")
+    colors = bytes(
+        channel
+        for color in (palette.skin, palette.hair, palette.shirt, palette.pants, palette.accent)
+        for channel in color
+    )
+    header = _CACHE_HEADER.pack(_CACHE_MAGIC, version, tile.width)
+    return header + _CACHE_BOX.pack(*face_box) + colors + tile.tobytes()
+
+
+def _decode_entry(payload: bytes, version: int) -> Optional[Tuple[Palette, Image.Image, Box]]:
+    if len(payload) < _CACHE_HEADER.size + _CACHE_BOX.size + 20:
+        return None
+    magic, entry_version, tile_size = _CACHE_HEADER.unpack_from(payload)
+    if magic != _CACHE_MAGIC or entry_version != version:
+        return None
+    face_box = _CACHE_BOX.unpack_from(payload, _CACHE_HEADER.size)
+    body = payload[_CACHE_HEADER.size + _CACHE_BOX.size:]
+    if len(body) != 20 + tile_size * tile_size * 4:
+        return None
+    colors = [tuple(body[index:index + 4]) for index in range(0, 20, 4)]
+    palette = Palette(*colors)
+    tile = Image.frombytes("RGBA", (tile_size, tile_size), body[20:])
+    return palette, tile, face_box
 
 
 class PhotoSkinGenerator:
     """Generate a Minecraft skin from a portrait photo."""
 
-    def __init__(self, photo_path: pathlib.Path, seed: int | None = None) -> None:
+    def __init__(
+        self,
+        photo_path: pathlib.Path,
+        seed: int | None = None,
+        cache: PhotoCache | None = None,
+        quantizer: str = "mediancut",
+        layout: str = "classic",
+        scale: int = 1,
+    ) -> None:
         self.photo_path = pathlib.Path(photo_path)
-        self.image = Image.open(self.photo_path).convert("RGBA")
-        self.palette = derive_palette_from_photo(self.image)
         self.seed = seed
+        self.cache = cache
+        self.quantizer = quantizer
+        self.layout = layout
+        self.scale = scale
+
+    @cached_property
+    def image(self) -> Image.Image:
+        """The photo, decoded lazily at reduced resolution by ``load_photo``."""
+
+        return load_photo(self.photo_path)
+
+    @cached_property
+    def _derived(self) -> Tuple[Palette, Image.Image, Box]:
+        if self.cache is not None:
+            return self.cache.derive(self.photo_path, quantizer=self.quantizer, tile_size=8 * self.scale)
+        face_box = locate_face(self.image)
+        palette, tile = derive_from_photo(
+            self.image, quantizer=self.quantizer, tile_size=8 * self.scale, face_box=face_box
+        )
+        return palette, tile, face_box
+
+    @property
+    def face_box(self) -> Box:
+        """The face crop ``(left, top, right, bottom)`` in ``image`` pixels, cached with the tile."""
+
+        return self._derived[2]
+
+    @property
+    def palette(self) -> Palette:
+        return self._derived[0]
+
+    @property
+    def face_tile(self) -> Image.Image:
+        return self._derived[1]
 
     def generate(self) -> Image.Image:
-        base_generator = SkinGenerator(palette=self.palette, seed=self.seed)
+        base_generator = SkinGenerator(palette=self.palette, seed=self.seed, layout=self.layout, scale=self.scale)
         skin = base_generator.generate()
-        face = face_tile_from_photo(self.image)
-        return apply_face_tile(skin, face, base_generator.layout)
+        return apply_face_tile(skin, self.face_tile, base_generator.layout, in_place=True)
 
 
 __all__ = [
+    "MAX_SKIN_DISTANCE",
+    "PHOTO_ALGORITHM_VERSION",
+    "PhotoCache",
     "PhotoSkinGenerator",
+    "QUANTIZERS",
     "apply_face_tile",
+    "face_layer",
+    "derive_from_photo",
     "derive_palette_from_photo",
     "face_tile_from_photo",
+    "load_photo",
 ]
@@ -0,0 +1,392 @@
+"""Isometric player previews and contact sheets for reviewing many skins.
+
+A preview is an orthographic view of the player model (head, body, arms
+and legs plus their overlays, inflated like in game) seen from above the
+front-left (``front``) or back-right (``back``). Everything that depends
+on the skin format, the view and the zoom but not on the skin's pixels is
+computed once into a ``ProjectionTable``: for every preview pixel, the
+skin texels that can show there, nearest first, with the face shading.
+Overlay texels only show where they are not transparent; base texels are
+opaque, as in game, so the list for a pixel stops at the first base face.
+Legacy 64x32 skins reuse (mirrored) right limbs for the left ones.
+
+``render_isometric`` then renders a whole batch of equally sized skins
+with one gather through the table plus a pick of the first visible layer,
+and ``iter_contact_sheets`` tiles thousands of skins into large sheets.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+import pathlib
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from .analysis import SourceItem, map_chunks
+from .layout import SCALES, SkinLayout, get_layout
+
+# Yaw (degrees around the vertical axis) of each view; both look down at
+# ``PITCH`` degrees.
+VIEWS = {"front": -35.0, "back": 145.0}
+VIEW_NAMES = tuple(VIEWS)
+PITCH = 25.0
+
+# Preview pixels per 1x skin pixel.
+DEFAULT_ZOOM = 2
+
+# Shading per face as in game (top, bottom, sides, front/back), in 1/256.
+_SHADES = (256, 128, 154, 205, 154, 205)
+
+# Model-space boxes (x0, y0, z0, x1, y1, z1) of each part in 1x skin
+# pixels: x to the viewer's right when facing the skin, y up, z towards
+# the front. Overlays are inflated by the given amount on every side.
+_ARM_WIDTH = {"slim": 3}
+_INFLATE = {"head_overlay": 0.5}
+_OVERLAY_INFLATE = 0.25
+
+
+def _part_boxes(layout_name: str) -> Dict[str, Tuple[float, ...]]:
+    arm = _ARM_WIDTH.get(layout_name, 4)
+    boxes = {
+        "head": (-4, 24, -4, 4, 32, 4),
+        "body": (-4, 12, -2, 4, 24, 2),
+        "right_arm": (-4 - arm, 12, -2, -4, 24, 2),
+        "left_arm": (4, 12, -2, 4 + arm, 24, 2),
+        "right_leg": (-4, 0, -2, 0, 12, 2),
+        "left_leg": (0, 0, -2, 4, 12, 2),
+    }
+    for part in list(boxes):
+        grow = _INFLATE.get(f"{part}_overlay", _OVERLAY_INFLATE)
+        x0, y0, z0, x1, y1, z1 = boxes[part]
+        boxes[f"{part}_overlay"] = (x0 - grow, y0 - grow, z0 - grow, x1 + grow, y1 + grow, z1 + grow)
+    return boxes
+
+
+def _faces_3d(box: Sequence[float]) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """``(origin, u_edge, v_edge, normal)`` of each face, in ``Faces`` order.
+
+    ``origin`` is the corner at texel (0, 0) of the face's UV box and the
+    edges span its full width and height, following the skin UV unwrap.
+    """
+
+    x0, y0, z0, x1, y1, z1 = box
+    w, h, d = x1 - x0, y1 - y0, z1 - z0
+    down = np.array([0, -h, 0.0])
+    return [
+        (np.array([x0, y1, z0]), np.array([w, 0, 0.0]), np.array([0, 0, d]), np.array([0, 1, 0.0])),
+        (np.array([x0, y0, z1]), np.array([w, 0, 0.0]), np.array([0, 0, -d]), np.array([0, -1, 0.0])),
+        (np.array([x0, y1, z0]), np.array([0, 0, d]), down, np.array([-1, 0, 0.0])),
+        (np.array([x0, y1, z1]), np.array([w, 0, 0.0]), down, np.array([0, 0, 1.0])),
+        (np.array([x1, y1, z1]), np.array([0, 0, -d]), down, np.array([1, 0, 0.0])),
+        (np.array([x1, y1, z0]), np.array([-w, 0, 0.0]), down, np.array([0, 0, -1.0])),
+    ]
+
+
+def _camera(view: str) -> np.ndarray:
+    """``(3, 3)`` rows: screen x (right), screen y (up) and depth (towards the viewer)."""
+
+    if view not in VIEWS:
+        raise ValueError(f"unknown view {view!r}; expected one of {VIEW_NAMES}")
+    yaw, pitch = math.radians(VIEWS[view]), math.radians(PITCH)
+    rotate = np.array([[math.cos(yaw), 0, math.sin(yaw)], [0, 1, 0], [-math.sin(yaw), 0, math.cos(yaw)]])
+    tilt = np.array([[1, 0, 0], [0, math.cos(pitch), -math.sin(pitch)], [0, math.sin(pitch), math.cos(pitch)]])
+    return tilt @ rotate
+
+
+@lru_cache(maxsize=None)
+def preview_size(zoom: int = DEFAULT_ZOOM) -> Tuple[int, int]:
+    """``(width, height)`` of one view; the same for every view and skin format."""
+
+    return tuple(int(math.ceil(extent * zoom)) for extent in _bounds()[1] - _bounds()[0])
+
+
+@lru_cache(maxsize=None)
+def _bounds() -> Tuple[np.ndarray, np.ndarray]:
+    corners = np.array(
+        [
+            [box[i], box[j], box[k]]
+            for box in _part_boxes("classic").values()
+            for i in (0, 3)
+            for j in (1, 4)
+            for k in (2, 5)
+        ]
+    )
+    screens = [corners @ _camera(view)[:2].T for view in VIEW_NAMES]
+    low = np.min([screen.min(axis=0) for screen in screens], axis=0)
+    high = np.max([screen.max(axis=0) for screen in screens], axis=0)
+    return low, high
+
+
+class ProjectionTable(NamedTuple):
+    """Per-pixel texel stacks for one layout, view and zoom, as flat entries.
+
+    Entry ``i`` says that flat skin texel ``index[i]`` can show at flat
+    preview pixel ``pixel[i]``, with face shading ``shade[i]`` (in 1/256);
+    ``opaque`` marks base-layer texels. Entries are grouped into layers by
+    their depth rank within their pixel, farthest layer first, and
+    ``layers`` holds the slice of each group, so drawing the layers in
+    order leaves the nearest visible texel on top. Every pixel appears at
+    most once per layer.
+    """
+
+    size: Tuple[int, int]
+    index: np.ndarray
+    pixel: np.ndarray
+    opaque: np.ndarray
+    shade: np.ndarray
+    layers: Tuple[slice, ...]
+
+
+def _texel_sources(layout: SkinLayout) -> Iterator[Tuple[str, np.ndarray, bool]]:
+    """Yield ``(part, (6, 4) UV boxes, mirrored)`` for every part the model draws."""
+
+    for part in _part_boxes(layout.name):
+        faces = getattr(layout, part)
+        if faces is not None:
+            yield part, np.asarray(faces), False
+            continue
+        # Legacy skins draw the left limbs with the right limbs' texture mirrored;
+        # their overlays simply do not exist.
+        twin = getattr(layout, part.replace("left_", "right_"))
+        if not part.endswith("_overlay") and twin is not None:
+            yield part, np.asarray(twin)[[0, 1, 4, 3, 2, 5]], True
+
+
+@lru_cache(maxsize=64)
+def projection_table(layout: SkinLayout, view: str = "front", zoom: int = DEFAULT_ZOOM) -> ProjectionTable:
+    """The shared ``ProjectionTable`` for ``layout`` (any scale), ``view`` and ``zoom``."""
+
+    camera = _camera(view)
+    low, high = _bounds()
+    width, height = preview_size(zoom)
+    ys, xs = np.mgrid[0:height, 0:width]
+    # Pixel centres in model units; screen y points down.
+    points = np.stack([low[0] + (xs.ravel() + 0.5) / zoom, high[1] - (ys.ravel() + 0.5) / zoom])
+    skin_width = layout.size[0]
+    model = _part_boxes(layout.name)
+
+    pixels, depths, texels, opaque, shades = [], [], [], [], []
+    for part, uv_boxes, mirrored in _texel_sources(layout):
+        for face, (origin, u_edge, v_edge, normal) in enumerate(_faces_3d(model[part])):
+            if (camera @ normal)[2] <= 1e-9:
+                continue  # facing away
+            origin, u_edge, v_edge = camera @ origin, camera @ u_edge, camera @ v_edge
+            edges = np.array([[u_edge[0], v_edge[0]], [u_edge[1], v_edge[1]]])
+            a, b = np.linalg.solve(edges, points - origin[:2, None])
+            inside = np.flatnonzero((a >= 0) & (a < 1) & (b >= 0) & (b < 1))
+            a, b = a[inside], b[inside]
+            left, top, right, bottom = (int(value) for value in uv_boxes[face])
+            u = np.minimum(((1 - a) if mirrored else a) * (right - left), right - left - 1).astype(np.int64)
+            v = np.minimum(b * (bottom - top), bottom - top - 1).astype(np.int64)
+            pixels.append(inside)
+            depths.append(origin[2] + a * u_edge[2] + b * v_edge[2])
+            texels.append((top + v) * skin_width + left + u)
+            opaque.append(np.full(len(inside), not part.endswith("_overlay")))
+            shades.append(np.full(len(inside), _SHADES[face], dtype=np.uint16))
+
+    pixels, depths, texels = np.concatenate(pixels), np.concatenate(depths), np.concatenate(texels)
+    opaque, shades = np.concatenate(opaque), np.concatenate(shades)
+    order = np.lexsort((-depths, pixels))
+    pixels, texels, opaque, shades = pixels[order], texels[order], opaque[order], shades[order]
+    # Rank of each hit within its pixel; drop everything behind the first base texel.
+    starts = np.flatnonzero(np.r_[True, pixels[1:] != pixels[:-1]])
+    rank = np.arange(len(pixels)) - np.repeat(starts, np.diff(np.r_[starts, len(pixels)]))
+    covered = np.cumsum(opaque) - opaque
+    covered -= np.repeat(covered[starts], np.diff(np.r_[starts, len(pixels)]))
+    keep = covered == 0
+    pixels, texels, opaque, shades, rank = pixels[keep], texels[keep], opaque[keep], shades[keep], rank[keep]
+
+    order = np.argsort(-rank, kind="stable")
+    rank = rank[order]
+    arrays = [array[order] for array in (texels.astype(np.intp), pixels.astype(np.intp), opaque, shades)]
+    for array in arrays:
+        array.setflags(write=False)
+    bounds = np.flatnonzero(np.r_[True, rank[1:] != rank[:-1], True])
+    layers = tuple(slice(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]))
+    return ProjectionTable((width, height), *arrays, layers)
+
+
+def render_isometric(
+    pixels: np.ndarray, layout: SkinLayout, view: str = "front", zoom: int = DEFAULT_ZOOM
+) -> np.ndarray:
+    """Render a ``(N, H, W, 4)`` uint8 batch of ``layout`` skins to ``(N, h, w, 4)`` previews.
+
+    Uncovered preview pixels are fully transparent; the rest are opaque.
+    """
+
+    table = projection_table(layout, view, zoom)
+    count = len(pixels)
+    width, height = table.size
+    gathered = np.ascontiguousarray(pixels).view("<u4").reshape(count, -1)[:, table.index]
+    visible = (gathered > 0xFFFFFF) | table.opaque
+    chosen = np.zeros((count, width * height), dtype="<u4")
+    shade = np.zeros((count, width * height), dtype=np.uint16)
+    for layer in table.layers:
+        target, shown = table.pixel[layer], visible[:, layer]
+        chosen[:, target] = np.where(shown, gathered[:, layer], chosen[:, target])
+        shade[:, target] = np.where(shown, table.shade[layer], shade[:, target])
+
+    out = chosen.view(np.uint8).reshape(count, height, width, 4)
+    out[..., :3] = (out[..., :3] * shade.reshape(count, height, width, 1)) >> 8
+    out[..., 3] = np.where(shade > 0, 255, 0).reshape(count, height, width)
+    return out
+
+
+def guess_layout(pixels: np.ndarray, square: str | None = None) -> Optional[SkinLayout]:
+    """The layout of an ``(H, W, 4)`` skin, or ``None`` for unsupported sizes.
+
+    64x32 (and its HD multiples) is ``legacy``. Square skins use the
+    ``square`` layout name if given, else are ``slim`` when the columns a
+    slim right arm leaves unused are fully transparent and ``classic``
+    otherwise; generated skins fill those columns, so pass ``square``
+    where the format is known.
+    """
+
+    height, width = pixels.shape[:2]
+    scale = width // 64
+    if width % 64 or scale not in SCALES:
+        return None
+    if height * 2 == width:
+        return get_layout("legacy", scale)
+    if height != width:
+        return None
+    if square is None:
+        unused = pixels[20 * scale : 32 * scale, 54 * scale : 56 * scale, 3]
+        square = "classic" if unused.any() else "slim"
+    return get_layout(square, scale)
+
+
+def render_previews(
+    pixels: np.ndarray,
+    layout: SkinLayout,
+    views: Sequence[str] = VIEW_NAMES,
+    zoom: int = DEFAULT_ZOOM,
+) -> np.ndarray:
+    """``render_isometric`` for each of ``views``, side by side: ``(N, h, len(views) * w, 4)``."""
+
+    return np.concatenate([render_isometric(pixels, layout, view, zoom) for view in views], axis=2)
+
+
+def render_thumbnail(
+    image: Image.Image,
+    layout: SkinLayout | None = None,
+    views: Sequence[str] = VIEW_NAMES,
+    zoom: int = DEFAULT_ZOOM,
+) -> Image.Image:
+    """Isometric ``views`` of one skin side by side, as an RGBA image.
+
+    ``layout`` defaults to ``guess_layout``; raises ``ValueError`` for
+    sizes that are not a skin.
+    """
+
+    pixels = np.asarray(image.convert("RGBA"))
+    layout = layout or guess_layout(pixels)
+    if layout is None or pixels.shape[:2] != tuple(layout.size[::-1]):
+        raise ValueError(f"not a skin of a supported size: {image.size}")
+    return Image.fromarray(render_previews(pixels[None], layout, views, zoom)[0], "RGBA")
+
+
+def _decode(data: Union[pathlib.Path, bytes]) -> Optional[np.ndarray]:
+    try:
+        with Image.open(data if isinstance(data, pathlib.Path) else io.BytesIO(data)) as image:
+            return np.asarray(image.convert("RGBA"))
+    except (OSError, UnidentifiedImageError):
+        return None
+
+
+def _render_chunk(
+    chunk: List[SourceItem], square: str | None, views: Sequence[str], zoom: int
+) -> Tuple[List[str], Optional[np.ndarray]]:
+    decoded = [(name, _decode(data)) for name, data in chunk]
+    groups: Dict[SkinLayout, List[int]] = {}
+    for position, (_, pixels) in enumerate(decoded):
+        layout = None if pixels is None else guess_layout(pixels, square)
+        if layout is not None:
+            groups.setdefault(layout, []).append(position)
+    positions = sorted(position for members in groups.values() for position in members)
+    if not positions:
+        return [], None
+    width, height = preview_size(zoom)
+    tiles = np.empty((len(positions), height, width * len(views), 4), dtype=np.uint8)
+    slot = {position: index for index, position in enumerate(positions)}
+    for skin_layout, members in groups.items():
+        rendered = render_previews(np.stack([decoded[position][1] for position in members]), skin_layout, views, zoom)
+        tiles[[slot[position] for position in members]] = rendered
+    return [decoded[position][0] for position in positions], tiles
+
+
+class ContactSheet(NamedTuple):
+    image: Image.Image
+    names: List[str]  # row-major, one per filled tile
+    columns: int
+
+
+def iter_contact_sheets(
+    items: Iterable[SourceItem],
+    columns: int = 40,
+    rows: int = 25,
+    square: str | None = None,
+    views: Sequence[str] = VIEW_NAMES,
+    zoom: int = DEFAULT_ZOOM,
+    background: Tuple[int, int, int, int] = (0, 0, 0, 0),
+    workers: int | None = None,
+) -> Iterator[ContactSheet]:
+    """Tile previews of ``(name, path_or_bytes)`` skins into sheets of ``columns * rows``.
+
+    Skins are decoded and rendered in chunks on a thread pool (see
+    ``analysis.map_chunks``); each chunk renders every skin format in it
+    with one batched call. ``square`` names the layout of square skins
+    (see ``guess_layout``); by default it is guessed per skin.
+    Unreadable files and images that are not skins are skipped. The last
+    sheet only has as many rows as it needs.
+    """
+
+    width, height = preview_size(zoom)
+    tile_width, tile_height = width * len(views), height
+    per_sheet = columns * rows
+    names: List[str] = []
+    tiles: List[np.ndarray] = []
+
+    def flush() -> ContactSheet:
+        used_rows = -(-len(names) // columns)
+        grid = np.empty((used_rows * columns, tile_height, tile_width, 4), dtype=np.uint8)
+        grid[len(tiles):] = background
+        grid[: len(tiles)] = tiles
+        if any(background):
+            grid[: len(tiles)] = np.where(grid[: len(tiles), ..., 3:] > 0, grid[: len(tiles)], background)
+        sheet = grid.reshape(used_rows, columns, tile_height, tile_width, 4).transpose(0, 2, 1, 3, 4)
+        sheet = sheet.reshape(used_rows * tile_height, columns * tile_width, 4)
+        return ContactSheet(Image.fromarray(sheet, "RGBA"), list(names), columns)
+
+    chunks = map_chunks(items, lambda chunk: _render_chunk(chunk, square, views, zoom), workers=workers)
+    for chunk_names, chunk_tiles in chunks:
+        for name, tile in zip(chunk_names, chunk_tiles if chunk_tiles is not None else ()):
+            names.append(name)
+            tiles.append(tile)
+            if len(names) == per_sheet:
+                yield flush()
+                names.clear()
+                tiles.clear()
+    if names:
+        yield flush()
+
+
+__all__ = [
+    "ContactSheet",
+    "DEFAULT_ZOOM",
+    "PITCH",
+    "ProjectionTable",
+    "VIEWS",
+    "VIEW_NAMES",
+    "guess_layout",
+    "iter_contact_sheets",
+    "preview_size",
+    "projection_table",
+    "render_isometric",
+    "render_previews",
+    "render_thumbnail",
+]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+_active: ContextVar[Optional["Profiler"]] = ContextVar("skin_creator_profiler", default=None)
+_NOOP = nullcontext()
+
+
+@dataclass
+class StageRecord:
+    name: str
+    wall_ms: float
+    pixels: int = 0
+    peak_bytes: Optional[int] = None
+
+
+class Profiler:
+    """Collects per-stage timings reported by the generators.
+
+    Use it as a context manager; while it is active every ``stage`` block in
+    the pipeline (photo decode, quantisation, drawing, compositing, encoding)
+    is timed and recorded here, and ``callback`` (if given) receives each
+    ``StageRecord`` as it completes. With ``trace_memory=True`` the
+    tracemalloc peak of each stage is captured as well; this only sees
+    Python and NumPy allocations, not Pillow's internal image buffers, and a
+    nested stage resets the peak of the stage around it.
+
+    The active profiler lives in a ``ContextVar``, so threads and asyncio
+    tasks only report to a profiler entered in their own context.
+    """
+
+    def __init__(self, trace_memory: bool = False, callback: Callable[[StageRecord], None] | None = None) -> None:
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.records: List[StageRecord] = []
+        self._token = None
+        self._started_tracing = False
+
+    def __enter__(self) -> "Profiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active.reset(self._token)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def record(self, record: StageRecord) -> None:
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Aggregate records by stage name: calls, total wall time, pixels and peak."""
+
+        stages: Dict[str, Dict[str, float]] = {}
+        for record in self.records:
+            entry = stages.setdefault(record.name, {"calls": 0, "wall_ms": 0.0, "pixels": 0})
+            entry["calls"] += 1
+            entry["wall_ms"] += record.wall_ms
+            entry["pixels"] += record.pixels
+            if record.peak_bytes is not None:
+                entry["peak_bytes"] = max(entry.get("peak_bytes", 0), record.peak_bytes)
+        return stages
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"stages": self.summary(), "records": [asdict(record) for record in self.records]},
+            indent=2,
+        )
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "pixels", "started")
+
+    def __init__(self, profiler: Profiler, name: str, pixels: int) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.pixels = pixels
+
+    def __enter__(self) -> "_Stage":
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = (time.perf_counter() - self.started) * 1000
+        peak = None
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+        self.profiler.record(StageRecord(self.name, elapsed, self.pixels, peak))
+
+
+def stage(name: str, pixels: int = 0):
+    """Time the enclosed block as ``name`` if a ``Profiler`` is active.
+
+    Without an active profiler this returns a shared no-op context manager,
+    so instrumented code pays one ``ContextVar.get`` per stage.
+    """
+
+    profiler = _active.get()
+    if profiler is None:
+        return _NOOP
+    return _Stage(profiler, name, pixels)
+
+
+__all__ = ["Profiler", "StageRecord", "stage"]
@@ -0,0 +1,281 @@
+"""Long-lived local HTTP service that renders skins on request.
+
+Endpoints (all responses are PNG unless noted)::
+
+    GET  /skin?palette=classic&seed=42               built-in palette
+    GET  /skin?palette=tech&shirt=ff0000&seed=7      palette with custom colours
+    GET  /skin?layout=slim&seed=7                    slim arms (or legacy 64x32)
+    GET  /skin?scale=4&seed=7                        HD 256x256 (scale 1, 2, 4 or 8)
+    POST /photo?seed=42      (body: photo bytes)     PhotoSkinGenerator path
+    POST /photo?quantizer=histogram                  histogram k-means palette
+    POST /photo?snap=1                               nearest palette from the library
+    GET  /health                                     "ok" (text/plain)
+
+Rendering runs in a worker pool so the event loop only parses requests and
+streams bytes. Concurrent identical requests (same palette and seed, or the
+same photo bytes and seed) share a single render. A client that takes
+longer than ``timeout`` seconds to send its request gets a 408, and one
+that stops reading the response for that long is disconnected.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from PIL import UnidentifiedImageError
+
+from .export import PngOptions, encode_png
+from .generator import ACCENT_MODES, SkinGenerator
+from .layout import LAYOUT_NAMES, SCALES
+from .library import snap_palette
+from .palette import Palette, resolve_palette
+from .photo import QUANTIZERS, PhotoCache, apply_face_tile, derive_from_photo, load_photo
+
+CHUNK_SIZE = 16 * 1024
+MAX_BODY_BYTES = 32 * 1024 * 1024
+DEFAULT_TIMEOUT = 30.0
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def render_palette_skin(
+    palette: Palette,
+    seed: int | None,
+    accent_mode: str = "compat",
+    png: PngOptions = PngOptions(),
+    layout: str = "classic",
+    scale: int = 1,
+) -> bytes:
+    image = SkinGenerator(palette=palette, seed=seed, accent_mode=accent_mode, layout=layout, scale=scale).generate()
+    return encode_png(image, png)
+
+
+def render_photo_skin(
+    data: bytes,
+    seed: int | None,
+    cache: PhotoCache | None = None,
+    png: PngOptions = PngOptions(),
+    quantizer: str = "mediancut",
+    scale: int = 1,
+    snap: bool = False,
+) -> bytes:
+    if cache is not None:
+        palette, face, _ = cache.derive(data, quantizer=quantizer, tile_size=8 * scale)
+    else:
+        image = load_photo(io.BytesIO(data))
+        palette, face = derive_from_photo(image, quantizer=quantizer, tile_size=8 * scale)
+    if snap:
+        palette = snap_palette(palette).palette
+    generator = SkinGenerator(palette=palette, seed=seed, scale=scale)
+    skin = apply_face_tile(generator.generate(), face, generator.layout, in_place=True)
+    return encode_png(skin, png)
+
+
+def _parse_scale(params: Dict[str, str]) -> int:
+    try:
+        scale = int(params.get("scale", "1"))
+    except ValueError:
+        scale = None
+    if scale not in SCALES:
+        raise HttpError(400, f"scale must be one of {SCALES}")
+    return scale
+
+
+def _parse_seed(params: Dict[str, str]) -> Optional[int]:
+    if "seed" not in params:
+        return None
+    try:
+        return int(params["seed"])
+    except ValueError:
+        raise HttpError(400, f"seed must be an integer, got {params['seed']!r}") from None
+
+
+class SkinServer:
+    """asyncio HTTP/1.1 server offloading renders to ``executor``.
+
+    Pass ``port=0`` to bind an ephemeral port; after ``start`` the bound
+    port is available as ``port``. Requests without a seed are random by
+    definition and are never coalesced.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        executor: Executor | None = None,
+        photo_cache: PhotoCache | None = None,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        png: PngOptions = PngOptions(),
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.executor = executor or ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+        self.photo_cache = photo_cache
+        self.max_body_bytes = max_body_bytes
+        self.png = png
+        self.timeout = timeout
+        self.renders = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def render(self, key: Hashable | None, func: Callable[..., bytes], *args) -> bytes:
+        """Run ``func(*args)`` in the pool, sharing the result with identical in-flight keys."""
+
+        if key is not None and key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, func, *args)
+        self.renders += 1
+        if key is None:
+            return await future
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[int, str, bytes]:
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        if url.path == "/health":
+            return 200, "text/plain; charset=utf-8", b"ok"
+        if url.path == "/skin":
+            if method != "GET":
+                raise HttpError(405, "use GET for /skin")
+            seed = _parse_seed(params)
+            accent_mode = params.get("accent_mode", "compat")
+            if accent_mode not in ACCENT_MODES:
+                raise HttpError(400, f"accent_mode must be one of {ACCENT_MODES}")
+            layout = params.get("layout", "classic")
+            if layout not in LAYOUT_NAMES:
+                raise HttpError(400, f"layout must be one of {LAYOUT_NAMES}")
+            scale = _parse_scale(params)
+            try:
+                palette = resolve_palette(params.get("palette", "classic"), params)
+            except ValueError as exc:
+                raise HttpError(400, str(exc)) from None
+            key = None if seed is None else ("skin", palette, seed, accent_mode, layout, scale)
+            png = await self.render(key, render_palette_skin, palette, seed, accent_mode, self.png, layout, scale)
+            return 200, "image/png", png
+        if url.path == "/photo":
+            if method != "POST":
+                raise HttpError(405, "POST the photo bytes to /photo")
+            if not body:
+                raise HttpError(400, "request body must contain the photo")
+            seed = _parse_seed(params)
+            quantizer = params.get("quantizer", "mediancut")
+            if quantizer not in QUANTIZERS:
+                raise HttpError(400, f"quantizer must be one of {QUANTIZERS}")
+            scale = _parse_scale(params)
+            snap = params.get("snap", "0") == "1"
+            digest = hashlib.sha256(body).hexdigest()
+            key = None if seed is None else ("photo", digest, seed, quantizer, scale, snap)
+            try:
+                png = await self.render(
+                    key, render_photo_skin, body, seed, self.photo_cache, self.png, quantizer, scale, snap
+                )
+            except UnidentifiedImageError:
+                raise HttpError(400, "body is not a supported image") from None
+            return 200, "image/png", png
+        raise HttpError(404, f"no route for {url.path}")
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HttpError(400, "malformed request line")
+        method, target, _ = parts
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HttpError(400, "invalid Content-Length") from None
+        if length > self.max_body_bytes:
+            raise HttpError(413, f"body exceeds {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                try:
+                    method, target, body = await asyncio.wait_for(self._read_request(reader), self.timeout)
+                except asyncio.TimeoutError:
+                    raise HttpError(408, f"request not received within {self.timeout:g} s") from None
+                status, content_type, payload = await self._route(method, target, body)
+            except HttpError as exc:
+                status, content_type = exc.status, "application/json"
+                payload = json.dumps({"error": exc.message}).encode()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except Exception as exc:  # pragma: no cover - surfaced to the client
+                status, content_type = 500, "application/json"
+                payload = json.dumps({"error": f"{type(exc).__name__}: {exc}"}).encode()
+            try:
+                await self._send(writer, status, content_type, payload)
+            except (asyncio.TimeoutError, ConnectionError):
+                writer.transport.abort()
+        finally:
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, content_type: str, payload: bytes) -> None:
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        view = memoryview(payload)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            writer.write(view[offset:offset + CHUNK_SIZE])
+            await asyncio.wait_for(writer.drain(), self.timeout)
+        await asyncio.wait_for(writer.drain(), self.timeout)
+
+
+__all__ = ["DEFAULT_TIMEOUT", "SkinServer", "render_palette_skin", "render_photo_skin"]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import abc
+import gzip
+import hashlib
+import json
+import pathlib
+import queue
+import tarfile
+import threading
+import zipfile
+from io import BytesIO
+from typing import BinaryIO, List, Optional, Union
+
+# Fixed entry timestamp so identical batches produce byte-identical archives;
+# TAR entries and the gzip header use mtime 0 for the same reason.
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+class SkinSink(abc.ABC):
+    """Destination for encoded skins. Use as a context manager."""
+
+    @abc.abstractmethod
+    def write(self, name: str, data: bytes, meta: dict) -> None:
+        """Store one encoded skin under ``name``."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "SkinSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class DirectorySink(SkinSink):
+    """Writes each skin as its own file in ``directory``; ``/`` in names makes subdirectories."""
+
+    def __init__(self, directory: Union[str, pathlib.Path]) -> None:
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, name: str, data: bytes, meta: dict) -> None:
+        path = self.directory / name
+        if "/" in name:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def archive_format(path: pathlib.Path) -> str:
+    """Map an archive path to ``zip``, ``tar`` or ``tar:gz`` by its suffix."""
+
+    name = path.name.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar.gz", ".tgz")):
+        return "tar:gz"
+    if name.endswith(".tar"):
+        return "tar"
+    raise ValueError(f"cannot infer archive format from {path.name!r}; use .zip, .tar, .tar.gz or .tgz")
+
+
+class ArchiveSink(SkinSink):
+    """Streams skins into a ZIP or TAR archive from a background thread.
+
+    ``write`` only enqueues; a writer thread appends each PNG to the archive
+    (ZIP entries are stored uncompressed, since PNG data is already deflated)
+    and a line to the manifest, ``<archive>.manifest.jsonl``, with the entry
+    name, its metadata (palette, seed) and SHA-256. The queue holds at most
+    ``queue_size`` skins, so when encoding outpaces the disk ``write``
+    blocks and the producer slows down instead of buffering without bound.
+    Errors raised by the writer thread surface on the next ``write`` or on
+    ``close``.
+    """
+
+    def __init__(self, path: Union[str, pathlib.Path], queue_size: int = 256) -> None:
+        self.path = pathlib.Path(path)
+        self.format = archive_format(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.path.with_name(self.path.name + ".manifest.jsonl")
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=queue_size)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        # Outer file objects that tarfile does not close itself, innermost first.
+        self._streams: List[BinaryIO] = []
+        if self.format == "zip":
+            self._archive = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_STORED)
+        elif self.format == "tar:gz":
+            raw = self.path.open("wb")
+            self._streams = [gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0), raw]
+            self._archive = tarfile.open(fileobj=self._streams[0], mode="w")
+        else:
+            self._archive = tarfile.open(self.path, "w")
+        self._manifest = self.manifest_path.open("w", encoding="utf-8")
+        self._thread = threading.Thread(target=self._drain, name="archive-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, name: str, data: bytes, meta: dict) -> None:
+        self._raise_pending()
+        self._queue.put((name, data, meta))
+
+    def _raise_pending(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"archive writer failed: {self._error}") from self._error
+
+    def _append(self, name: str, data: bytes) -> None:
+        if self.format == "zip":
+            info = zipfile.ZipInfo(name, date_time=_ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_STORED
+            self._archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            self._archive.addfile(info, BytesIO(data))
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue  # keep draining so producers never block forever
+            name, data, meta = item
+            try:
+                self._append(name, data)
+                record = {"name": name, **meta, "sha256": hashlib.sha256(data).hexdigest(), "bytes": len(data)}
+                self._manifest.write(json.dumps(record) + "\n")
+            except BaseException as exc:  # surfaced to the producer thread
+                self._error = exc
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._archive.close()
+        for stream in self._streams:
+            stream.close()
+        self._manifest.close()
+        self._raise_pending()
+
+
+__all__ = ["ArchiveSink", "DirectorySink", "SkinSink", "archive_format"]
@@ -0,0 +1,250 @@
+"""Long-running JSON-lines worker for build pipelines.
+
+Each line on stdin is one job, for example::
+
+    {"id": 7, "out": "build/a.png", "palette": "forest", "seed": 42}
+    {"id": 8, "out": "build/b.png", "colors": {"shirt": "ff0000"}, "seed": 1}
+    {"id": 9, "out": "build/c.png", "photo": "me.jpg", "scale": 2}
+
+Optional keys are ``palette`` (a built-in name, default ``classic``),
+``colors`` (part name to hex colour, applied on top of the palette),
+``seed``, ``photo`` (a path; the palette is derived from it unless
+``palette`` is given, and its face tile is applied), ``accent_mode``,
+``layout``, ``scale`` and ``quantizer``. For every job one JSON line is
+written to stdout, in input order and tagged with the job's ``id``::
+
+    {"id": 7, "ok": true, "out": "/abs/build/a.png", "bytes": 1843,
+     "timings_ms": {"decode": 0.0, "render": 0.41, "encode": 0.62, "total": 1.05}}
+    {"id": 9, "ok": false, "error": "FileNotFoundError: ..."}
+
+Jobs run on a small thread pool, so one job's photo decode or PNG encode
+(both of which release the GIL) overlaps with the next job's render.
+Photos are decoded once per path and modification time.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, Mapping, Optional, TextIO, Tuple
+
+from PIL import Image
+
+from .export import PngOptions, encode_png
+from .generator import ACCENT_MODES, SkinGenerator, TemplateCache
+from .layout import LAYOUT_NAMES, SCALES
+from .palette import PALETTE_FIELDS, Color, Palette, parse_hex_color, resolve_palette
+from .photo import (
+    QUANTIZERS,
+    PhotoCache,
+    apply_face_tile,
+    derive_from_photo,
+    load_photo,
+)
+
+
+@dataclass(frozen=True)
+class WorkerJob:
+    """One parsed job line. ``palette`` is ``None`` when it comes from ``photo``."""
+
+    id: object
+    out: pathlib.Path
+    palette: Optional[Palette] = None
+    overrides: Tuple[Tuple[str, Color], ...] = ()
+    seed: Optional[int] = None
+    photo: Optional[pathlib.Path] = None
+    accent_mode: str = "compat"
+    layout: str = "classic"
+    scale: int = 1
+    quantizer: str = "mediancut"
+
+
+@dataclass
+class WorkerStats:
+    count: int
+    failed: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+def _choice(record: Mapping[str, object], key: str, choices: tuple, default: object) -> object:
+    value = record.get(key, default)
+    if value not in choices:
+        raise ValueError(f"{key} must be one of {choices}, got {value!r}")
+    return value
+
+
+def parse_job(record: object) -> WorkerJob:
+    """Validate a decoded job line; raises ``ValueError`` on bad input."""
+
+    if not isinstance(record, dict):
+        raise ValueError("each line must be a JSON object")
+    if not isinstance(record.get("out"), str):
+        raise ValueError("job needs an 'out' path")
+    seed = record.get("seed")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise ValueError(f"seed must be an integer, got {seed!r}")
+    colors = record.get("colors") or {}
+    if not isinstance(colors, dict):
+        raise ValueError("colors must map part names to hex colours")
+    unknown = sorted(set(colors) - set(PALETTE_FIELDS))
+    if unknown:
+        raise ValueError(f"unknown palette parts {unknown}; expected some of {PALETTE_FIELDS}")
+    photo = record.get("photo")
+    if photo is not None and not isinstance(photo, str):
+        raise ValueError("photo must be a path")
+    palette = None
+    if photo is None or "palette" in record:
+        palette = resolve_palette(record.get("palette", "classic"))
+    return WorkerJob(
+        id=record.get("id"),
+        out=pathlib.Path(record["out"]),
+        palette=palette,
+        overrides=tuple((part, parse_hex_color(value)) for part, value in colors.items()),
+        seed=seed,
+        photo=None if photo is None else pathlib.Path(photo),
+        accent_mode=_choice(record, "accent_mode", ACCENT_MODES, "compat"),
+        layout=_choice(record, "layout", LAYOUT_NAMES, "classic"),
+        scale=_choice(record, "scale", SCALES, 1),
+        quantizer=_choice(record, "quantizer", QUANTIZERS, "mediancut"),
+    )
+
+
+class JsonLinesWorker:
+    """Runs ``WorkerJob``s on a thread pool and streams results as JSON lines.
+
+    At most ``max_pending`` jobs are queued or in flight; once that many
+    results are waiting to be written, reading stdin pauses, so a slow
+    reader of stdout throttles the worker instead of growing a backlog.
+    Derived photo palettes and face tiles are kept in an LRU of
+    ``photo_entries`` (and in ``photo_cache`` on disk, if given).
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        png: PngOptions = PngOptions(),
+        photo_cache: PhotoCache | None = None,
+        max_pending: int | None = None,
+        photo_entries: int = 32,
+    ) -> None:
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.png = png
+        self.photo_cache = photo_cache
+        self.max_pending = max_pending or self.workers * 4
+        self._photos = TemplateCache(photo_entries)
+        self._error: Optional[BaseException] = None
+
+    def _photo_state(self, job: WorkerJob) -> Tuple[Palette, Image.Image]:
+        stat = job.photo.stat()
+        tile_size = 8 * job.scale
+        key = (str(job.photo.resolve()), stat.st_mtime_ns, stat.st_size, job.quantizer, tile_size)
+
+        def derive() -> Tuple[Palette, Image.Image]:
+            if self.photo_cache is not None:
+                palette, tile, _ = self.photo_cache.derive(job.photo, tile_size=tile_size, quantizer=job.quantizer)
+                return palette, tile
+            image = load_photo(job.photo)
+            return derive_from_photo(image, quantizer=job.quantizer, tile_size=tile_size)
+
+        return self._photos.get(key, derive)
+
+    def run_job(self, job: WorkerJob) -> Dict[str, object]:
+        started = time.perf_counter()
+        palette, face = job.palette, None
+        if job.photo is not None:
+            derived, face = self._photo_state(job)
+            palette = palette or derived
+        palette = replace(palette, **dict(job.overrides))
+        decoded = time.perf_counter()
+
+        generator = SkinGenerator(
+            palette=palette, seed=job.seed, accent_mode=job.accent_mode, layout=job.layout, scale=job.scale
+        )
+        skin = generator.generate()
+        if face is not None:
+            skin = apply_face_tile(skin, face, generator.layout, in_place=True)
+        rendered = time.perf_counter()
+
+        data = encode_png(skin, self.png)
+        job.out.parent.mkdir(parents=True, exist_ok=True)
+        job.out.write_bytes(data)
+        finished = time.perf_counter()
+        return {
+            "id": job.id,
+            "ok": True,
+            "out": str(job.out.resolve()),
+            "bytes": len(data),
+            "timings_ms": {
+                "decode": round((decoded - started) * 1000, 3),
+                "render": round((rendered - decoded) * 1000, 3),
+                "encode": round((finished - rendered) * 1000, 3),
+                "total": round((finished - started) * 1000, 3),
+            },
+        }
+
+    def handle_line(self, line: str) -> Dict[str, object]:
+        """Parse and run one job line; failures become ``"ok": false`` results."""
+
+        job_id = None
+        try:
+            record = json.loads(line)
+            job_id = record.get("id") if isinstance(record, dict) else None
+            return self.run_job(parse_job(record))
+        except Exception as exc:  # reported on the job's result line
+            return {"id": job_id, "ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+    def serve(self, stdin: TextIO, stdout: TextIO) -> WorkerStats:
+        """Run every job line from ``stdin`` until EOF; blank lines are ignored.
+
+        Results are flushed as soon as they (and all earlier ones) are done,
+        so a client may also send one job at a time and wait for its line.
+        Raises ``RuntimeError`` if writing to ``stdout`` fails.
+        """
+
+        started = time.perf_counter()
+        self._error = None
+        pending: "queue.Queue[Optional[Future]]" = queue.Queue(maxsize=self.max_pending)
+        counts = {"count": 0, "failed": 0}
+
+        def drain() -> None:
+            while True:
+                future = pending.get()
+                if future is None:
+                    return
+                result = future.result()
+                if self._error is not None:
+                    continue  # keep draining so the reader never blocks forever
+                try:
+                    stdout.write(json.dumps(result) + "\n")
+                    stdout.flush()
+                except BaseException as exc:  # surfaced to the reading thread
+                    self._error = exc
+                counts["count"] += 1
+                counts["failed"] += not result["ok"]
+
+        writer = threading.Thread(target=drain, name="worker-results", daemon=True)
+        writer.start()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for line in stdin:
+                if self._error is not None:
+                    break
+                if line.strip():
+                    pending.put(pool.submit(self.handle_line, line))
+            pending.put(None)
+            writer.join()
+        if self._error is not None:
+            raise RuntimeError(f"writing results failed: {self._error}") from self._error
+        return WorkerStats(counts["count"], counts["failed"], time.perf_counter() - started)
+
+
+__all__ = ["JsonLinesWorker", "WorkerJob", "WorkerStats", "parse_job"]
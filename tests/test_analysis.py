@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.skin_creator.analysis import (
+    BASE_PARTS,
+    analyze,
+    analyze_pixels,
+    load_palettes,
+    palette_columns,
+    part_map,
+)
+from src.skin_creator.generator import SkinGenerator, TemplateCache
+from src.skin_creator.layout import PARTS, get_layout
+from src.skin_creator.palette import base_palettes
+
+A, B, C = (200, 100, 50, 255), (20, 40, 220, 255), (90, 200, 90, 255)
+PART_GRID = part_map(get_layout()).reshape(64, 64)
+
+
+def part_pixels(part):
+    return np.argwhere(PART_GRID == PARTS.index(part))
+
+
+def hand_made_skin():
+    pixels = np.zeros((64, 64, 4), dtype=np.uint8)
+    for part in BASE_PARTS:
+        pixels[tuple(part_pixels(part).T)] = A
+    pixels[tuple(part_pixels("head")[:16].T)] = B
+    body = part_pixels("body")
+    pixels[tuple(body[:10].T)] = (0, 0, 0, 0)
+    pixels[tuple(body[10:15].T)] = (*A[:3], 128)
+    overlay = part_pixels("head_overlay")
+    pixels[tuple(overlay[: len(overlay) // 2].T)] = C
+    return pixels
+
+
+def test_part_statistics_of_a_hand_made_skin():
+    pixels = hand_made_skin()
+    stats = analyze_pixels(np.stack([pixels, np.zeros_like(pixels)]))
+    head, overlay, body = (PARTS.index(part) for part in ("head", "head_overlay", "body"))
+    sizes = {part: len(part_pixels(part)) for part in PARTS}
+
+    assert tuple(stats["dominant"][0, head]) == A
+    assert tuple(stats["secondary"][0, head]) == B
+    assert tuple(stats["dominant"][0, overlay]) == C
+    assert tuple(stats["secondary"][0, overlay]) == (0, 0, 0, 0)
+    assert stats["coverage"][0, overlay] == pytest.approx(0.5)
+    assert stats["coverage"][0, body] == pytest.approx(1 - 10 / sizes["body"])
+    assert stats["translucent"][0, body] == pytest.approx(5 / sizes["body"])
+    base_total = sum(sizes[part] for part in BASE_PARTS)
+    assert stats["transparency_misuse"][0] == pytest.approx(15 / base_total)
+
+    assert stats["coverage"][1].max() == 0
+    assert stats["transparency_misuse"][1] == pytest.approx(1)
+    assert stats["dominant"][1].max() == 0
+
+    palette = palette_columns(stats)
+    assert tuple(palette["palette_skin"][0]) == A
+    assert tuple(palette["palette_hair"][0]) == C
+
+
+def brute_force(pixels):
+    """Dominant colour bin mean and coverage per part, pixel by pixel."""
+
+    dominant, coverage = {}, {}
+    for index, part in enumerate(PARTS):
+        values = pixels[PART_GRID == index]
+        visible = values[values[:, 3] > 0]
+        coverage[part] = len(visible) / len(values)
+        if not len(visible):
+            dominant[part] = (0, 0, 0, 0)
+            continue
+        bins = (visible[:, 0] >> 5).astype(int) << 6 | (visible[:, 1] >> 5).astype(int) << 3 | visible[:, 2] >> 5
+        counts = np.bincount(bins)
+        members = visible[bins == counts.argmax()].astype(np.float64)
+        dominant[part] = tuple(np.round(members.mean(axis=0)).astype(int))
+    return dominant, coverage
+
+
+def test_statistics_match_a_pixel_by_pixel_reference():
+    rng = np.random.default_rng(3)
+    colors = rng.integers(0, 256, size=(6, 4), dtype=np.uint8)
+    colors[:2, 3] = 0
+    skins = colors[rng.integers(0, len(colors), size=(4, 64, 64))]
+    stats = analyze_pixels(skins)
+    for skin, pixels in enumerate(skins):
+        dominant, coverage = brute_force(pixels)
+        for index, part in enumerate(PARTS):
+            assert tuple(stats["dominant"][skin, index]) == dominant[part]
+            assert stats["coverage"][skin, index] == pytest.approx(coverage[part])
+
+
+def test_analyze_reads_legacy_skins_and_skips_other_sizes(tmp_path):
+    palette = base_palettes()["forest"]
+    for layout in ("classic", "legacy"):
+        SkinGenerator(palette, seed=1, layout=layout, cache=TemplateCache()).generate().save(tmp_path / f"{layout}.png")
+    Image.new("RGBA", (10, 10)).save(tmp_path / "tiny.png")
+    result = analyze(tmp_path, tmp_path / "out" / "stats.npz", workers=1)
+    assert (result.count, result.skipped) == (2, 1)
+
+    with np.load(tmp_path / "out" / "stats.npz") as data:
+        assert list(data["name"]) == ["classic.png", "legacy.png"]
+        index = PARTS.index
+        for left, right in (("left_leg", "right_leg"), ("left_arm", "right_arm")):
+            np.testing.assert_array_equal(data["dominant"][1, index(left)], data["dominant"][1, index(right)])
+            assert data["coverage"][1, index(left)] == data["coverage"][1, index(right)] == 1
+        assert data["coverage"][1, index("body_overlay")] == 0
+        assert data["transparency_misuse"][1] == 0
+    names = [name for name, _ in load_palettes(tmp_path / "out" / "stats.npz")]
+    assert names == ["classic.png", "legacy.png"]
+
+
+def test_empty_analysis_has_columns_and_no_palettes(tmp_path):
+    result = analyze(tmp_path, tmp_path / "stats.npz", workers=1)
+    assert (result.count, result.skipped) == (0, 0)
+    assert list(load_palettes(tmp_path / "stats.npz")) == []
+    with np.load(tmp_path / "stats.npz") as data:
+        assert data["dominant"].shape == (0, len(PARTS), 4)
+        assert data["palette_skin"].shape == (0, 4)
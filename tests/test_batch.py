@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from src.skin_creator.batch import MANIFEST_NAME, MANIFEST_VERSION, build_jobs, iter_photo_jobs, load_manifest, run_batch, run_incremental
+from src.skin_creator.bench import synthetic_jpeg, synthetic_photo
+from src.skin_creator.export import PngOptions
+from src.skin_creator.palette import base_palettes
+from src.skin_creator.sinks import DirectorySink
+
+PALETTES = base_palettes()
+
+
+def jobs(names=("classic", "forest"), seeds=range(3)):
+    return build_jobs(PALETTES, list(names), seeds)
+
+
+def counts(result):
+    return result.count, result.unchanged, result.removed
+
+
+@pytest.fixture
+def built(tmp_path):
+    out = tmp_path / "skins"
+    assert counts(run_incremental(jobs(), out, workers=1)) == (6, 0, 0)
+    return out
+
+
+def test_second_run_renders_nothing(built):
+    before = {path.name: path.read_bytes() for path in built.glob("*.png")}
+    assert counts(run_incremental(jobs(), built, workers=1)) == (0, 6, 0)
+    assert {path.name: path.read_bytes() for path in built.glob("*.png")} == before
+
+
+def test_changed_missing_and_truncated_files_are_rebuilt(built):
+    (built / "classic_0.png").unlink()
+    (built / "classic_1.png").write_bytes(b"truncated")
+    changed = dict(PALETTES, forest=PALETTES["classic"])
+    result = run_incremental(build_jobs(changed, ["classic", "forest"], range(3)), built, workers=1)
+    assert counts(result) == (5, 1, 0)
+
+
+def test_png_options_are_part_of_the_fingerprint(built):
+    assert counts(run_incremental(jobs(), built, workers=1, png=PngOptions(indexed=True))) == (6, 0, 0)
+
+
+def test_orphans_are_removed_and_unknown_files_kept(built):
+    (built / "notes.png").write_bytes(b"mine")
+    result = run_incremental(jobs(names=("classic",), seeds=range(2)), built, workers=1)
+    assert counts(result) == (0, 2, 4)
+    assert sorted(path.name for path in built.glob("*.png")) == ["classic_0.png", "classic_1.png", "notes.png"]
+    manifest = json.loads((built / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert sorted(manifest["entries"]) == ["classic_0.png", "classic_1.png"]
+
+
+def test_orphan_already_deleted_is_not_counted(built):
+    (built / "forest_2.png").unlink()
+    assert counts(run_incremental(jobs(seeds=range(2)), built, workers=1)) == (0, 4, 1)
+
+
+@pytest.fixture
+def photos(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    paths = [tmp_path / "a" / "me.jpg", tmp_path / "b" / "me.png", tmp_path / "classic.jpg"]
+    paths[0].write_bytes(synthetic_jpeg((320, 240)))
+    synthetic_photo((320, 240), seed=5).save(paths[1])
+    paths[2].write_bytes(synthetic_jpeg((160, 120)))
+    return paths
+
+
+def test_photos_sharing_a_stem_or_a_palette_name_get_their_own_files(tmp_path, photos):
+    all_jobs = list(iter_photo_jobs(photos, range(2))) + jobs(names=("classic",), seeds=range(2))
+    names = [job.filename for job in all_jobs]
+    assert len(set(names)) == len(names) == 8
+    assert all(name.startswith("photo-") for name in names[:6])
+
+    out = tmp_path / "batch"
+    assert run_batch(all_jobs, DirectorySink(out), workers=1).count == 8
+    assert len(list(out.glob("*.png"))) == 8
+
+    out = tmp_path / "incremental"
+    assert counts(run_incremental(all_jobs, out, workers=1)) == (8, 0, 0)
+    assert counts(run_incremental(list(iter_photo_jobs(photos, range(2))), out, workers=1)) == (0, 6, 2)
+
+
+@pytest.mark.parametrize("name", ["../outside.png", "sub/inside.png", "..", "C:outside.png", "\\outside.png", "ABSOLUTE"])
+def test_manifest_names_outside_the_directory_are_ignored(tmp_path, name):
+    out = tmp_path / "skins"
+    out.mkdir()
+    victim = tmp_path / "outside.png"
+    victim.write_bytes(b"keep")
+    (out / "sub").mkdir()
+    (out / "sub" / "inside.png").write_bytes(b"keep")
+    if name == "ABSOLUTE":
+        name = str(victim)
+    entries = {name: {"fingerprint": "x", "bytes": 4}, "ok.png": {"fingerprint": "y", "bytes": 1}}
+    (out / MANIFEST_NAME).write_text(json.dumps({"version": MANIFEST_VERSION, "entries": entries}), encoding="utf-8")
+    assert list(load_manifest(out / MANIFEST_NAME)) == ["ok.png"]
+    assert counts(run_incremental([], out, workers=1)) == (0, 0, 0)
+    assert victim.read_bytes() == b"keep"
+    assert (out / "sub" / "inside.png").read_bytes() == b"keep"
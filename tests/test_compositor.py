@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.skin_creator.compositor import Layer, LayerStack
+from src.skin_creator.generator import TemplateCache
+
+
+def random_image(size, seed, mode="RGBA"):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    pixels[..., 3] = rng.choice([0, 90, 255], size[::-1])
+    return Image.fromarray(pixels, "RGBA").convert(mode)
+
+
+def layers():
+    return [
+        Layer("face", random_image((8, 8), 1), (8, 8), key="face"),
+        Layer("patch", random_image((20, 12), 2, "RGB"), (30, 40), key="patch"),
+        Layer("decal", random_image((16, 16), 3), (0, 48), key="decal"),
+        Layer("edge", random_image((10, 10), 4), (54, 54), key="edge"),
+        Layer("over", random_image((24, 24), 5), (4, 4), key="over"),
+    ]
+
+
+def sequential(base, stack_layers):
+    """Composite every layer over the whole canvas, one after another."""
+
+    canvas = base.copy()
+    for layer in stack_layers:
+        full = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        full.paste(layer.image.convert("RGBA"), layer.origin)
+        canvas = Image.alpha_composite(canvas, full)
+    return canvas
+
+
+@pytest.mark.parametrize("count", range(6))
+def test_render_matches_sequential_alpha_composite(count):
+    base = random_image((64, 64), 0)
+    stack = LayerStack(base)
+    for layer in layers()[:count]:
+        stack = stack.push(layer)
+    expected = sequential(base, layers()[:count])
+    assert stack.render().tobytes() == expected.tobytes()
+    assert stack.render(TemplateCache()).tobytes() == expected.tobytes()
+    assert base.tobytes() == random_image((64, 64), 0).tobytes()
+
+
+def test_render_starts_from_the_longest_cached_prefix():
+    base = random_image((64, 64), 0)
+    face, patch, decal, *_ = layers()
+    cache = TemplateCache()
+    lower = LayerStack(base, base_key="base").push(face)
+    lower.render(cache)
+    assert (cache.stats().hits, cache.stats().misses) == (0, 1)
+
+    for top in (patch, decal):
+        rendered = lower.push(top).render(cache)
+        assert rendered.tobytes() == sequential(base, [face, top]).tobytes()
+    # Each two-layer stack missed itself, then found the shared one-layer prefix.
+    assert (cache.stats().hits, cache.stats().misses) == (2, 3)
+
+    rendered = lower.push(patch).render(cache)
+    rendered.paste((0, 0, 0, 0), (0, 0, 64, 64))  # callers get copies
+    assert lower.push(patch).render(cache).tobytes() == sequential(base, [face, patch]).tobytes()
+    assert (cache.stats().hits, cache.stats().size) == (4, 3)
+
+
+def test_stacks_with_unkeyed_layers_skip_the_cache():
+    base = random_image((64, 64), 0)
+    cache = TemplateCache()
+    stack = LayerStack(base, base_key="base").push(Layer("anon", random_image((8, 8), 9), (8, 8)))
+    assert stack.render(cache).tobytes() == sequential(base, stack.layers).tobytes()
+    assert (cache.stats().hits, cache.stats().misses, cache.stats().size) == (0, 0, 0)
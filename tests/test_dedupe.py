@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from src.skin_creator.batch import DuplicateFilter, encode_hashed_job, iter_jobs, run_batch, seeds_distinguishable
+from src.skin_creator.dedupe import HashIndex, popcount
+from src.skin_creator.palette import base_palettes
+from src.skin_creator.sinks import SkinSink
+
+
+def brute_force(hashes, value, max_distance):
+    distances = popcount(hashes ^ np.uint64(value))
+    return sorted((int(distances[index]), int(index)) for index in np.flatnonzero(distances <= max_distance))
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 3, 5])
+def test_index_query_matches_brute_force(max_distance):
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2**64, 20000, dtype=np.uint64, endpoint=False)
+    # Plant near neighbours of the queries, so every radius has matches.
+    queries = [int(value) for value in rng.choice(hashes, 50)]
+    bits = rng.integers(0, 64, (50, 2))
+    flips = [query ^ (1 << int(first)) ^ (1 << int(second)) for query, (first, second) in zip(queries, bits)]
+    index = HashIndex(hashes[:15000])
+    index.extend(flips)
+    index.extend(hashes[15000:])  # an unsorted tail on top of the chunk tables
+    stored = index.hashes
+    for value in queries + flips:
+        expected = brute_force(stored, value, max_distance)
+        assert [(match.distance, match.id) for match in index.query(value, max_distance)] == expected
+
+
+def test_index_save_and_load(tmp_path):
+    index = HashIndex([1, 2, 3, 2**64 - 1])
+    index.save(tmp_path / "hashes.npy")
+    loaded = HashIndex.load(tmp_path / "hashes.npy")
+    assert loaded.hashes.tolist() == index.hashes.tolist()
+    assert loaded.nearest(2**64 - 2, 1).id == 3
+
+
+def test_popcount():
+    values = np.array([0, 1, 2**64 - 1, 0xF0F0], dtype=np.uint64)
+    assert popcount(values).tolist() == [0, 1, 64, 8]
+
+
+class ListSink(SkinSink):
+    def __init__(self):
+        self.names = []
+
+    def write(self, name, data, meta):
+        self.names.append(name)
+
+
+def test_seeds_of_one_palette_are_flagged_and_not_reseeded():
+    jobs = list(iter_jobs(base_palettes(), ["classic", "forest"], range(6)))
+    assert not seeds_distinguishable(jobs[0])
+    warned = []
+    duplicates = DuplicateFilter(reseeds=3, on_indistinct=warned.append)
+    sink = ListSink()
+    result = run_batch(jobs, sink, workers=1, duplicates=duplicates)
+    assert warned == ["classic", "forest"] == duplicates.indistinct
+    assert sink.names == ["classic_0.png", "forest_0.png"]
+    assert (result.count, result.rejected, result.reseeded) == (2, 10, 0)
+
+
+def test_filter_keeps_distinct_palettes():
+    jobs = list(iter_jobs(base_palettes(), sorted(base_palettes()), [7]))
+    duplicates = DuplicateFilter()
+    for job in jobs:
+        data, value = encode_hashed_job(job)
+        assert duplicates.admit(job, data, value) == (job, data)
+    assert len(duplicates.index) == len(jobs)
@@ -0,0 +1,75 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from src.skin_creator.engine import SkinEngine
+from src.skin_creator.generator import (
+    ACCENT_PROBABILITY,
+    SkinGenerator,
+    TemplateCache,
+    accent_boxes,
+    draw_base,
+    scatter_accent,
+)
+from src.skin_creator.layout import LAYOUT_NAMES, get_layout
+from src.skin_creator.palette import Palette, base_palettes
+
+SEEDS = [0, 1, 42, 2**31 - 1]
+
+
+def _palettes():
+    rng = random.Random(7)
+    random_palettes = [
+        Palette(*(tuple(rng.randrange(256) for _ in range(3)) + (255,) for _ in range(5))) for _ in range(3)
+    ]
+    return list(base_palettes().values()) + random_palettes
+
+
+def pillow_recipe(layout_name, palette, seed):
+    """The original rendering: draw every primitive, then the per-pixel accent loop."""
+
+    layout = get_layout(layout_name)
+    image = Image.new("RGBA", layout.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw_base(draw, layout, palette)
+    scatter_accent(draw, accent_boxes(layout), palette, random.Random(seed), probability=ACCENT_PROBABILITY)
+    return np.asarray(image)
+
+
+@pytest.mark.parametrize("layout_name", LAYOUT_NAMES)
+@pytest.mark.parametrize("palette", _palettes())
+def test_engine_matches_generator_and_pillow_recipe(layout_name, palette):
+    engine = SkinEngine(layout_name)
+    batch = engine.render_batch([palette] * len(SEEDS), SEEDS)
+    for seed, pixels in zip(SEEDS, batch):
+        generated = SkinGenerator(palette, seed=seed, layout=layout_name, cache=TemplateCache()).generate()
+        np.testing.assert_array_equal(pixels, np.asarray(generated))
+        np.testing.assert_array_equal(pixels, pillow_recipe(layout_name, palette, seed))
+        np.testing.assert_array_equal(engine.render(palette, seed), pixels)
+
+
+@pytest.mark.parametrize("scale", [2, 4])
+def test_hd_engine_matches_generator(scale):
+    palette = base_palettes()["classic"]
+    engine = SkinEngine("classic", scale=scale)
+    for seed in SEEDS:
+        generated = SkinGenerator(palette, seed=seed, scale=scale, cache=TemplateCache()).generate()
+        np.testing.assert_array_equal(engine.render(palette, seed), np.asarray(generated))
+
+
+@pytest.mark.parametrize("layout_name", LAYOUT_NAMES)
+@pytest.mark.parametrize("scale", [2, 8])
+def test_hd_skin_is_the_1x_skin_upscaled(layout_name, scale):
+    palette = base_palettes()["forest"]
+    for seed in SEEDS:
+        small = SkinGenerator(palette, seed=seed, layout=layout_name, cache=TemplateCache()).generate()
+        large = SkinGenerator(palette, seed=seed, layout=layout_name, scale=scale, cache=TemplateCache()).generate()
+        upscaled = small.resize(large.size, Image.NEAREST)
+        np.testing.assert_array_equal(np.asarray(large), np.asarray(upscaled))
+
+
+def test_render_batch_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        SkinEngine().render_batch([base_palettes()["classic"]], [1, 2])
@@ -0,0 +1,44 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.skin_creator.export import PngOptions, encode_png, to_indexed
+from src.skin_creator.generator import SkinGenerator, TemplateCache
+from src.skin_creator.layout import LAYOUT_NAMES
+from src.skin_creator.palette import base_palettes
+
+
+def decode(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.mode, np.asarray(image.convert("RGBA"))
+
+
+@pytest.mark.parametrize("layout_name", LAYOUT_NAMES)
+@pytest.mark.parametrize("palette_name", sorted(base_palettes()))
+def test_indexed_png_round_trips_generated_skins(layout_name, palette_name):
+    skin = SkinGenerator(base_palettes()[palette_name], seed=3, layout=layout_name, cache=TemplateCache()).generate()
+    mode, pixels = decode(encode_png(skin, PngOptions(indexed=True, verify=False)))
+    assert mode == "P"
+    np.testing.assert_array_equal(pixels, np.asarray(skin))
+
+
+def test_indexed_png_keeps_partial_alpha():
+    rng = np.random.default_rng(1)
+    colors = rng.integers(0, 256, size=(40, 4), dtype=np.uint8)
+    colors[:10, 3] = 0
+    colors[10:20, 3] = rng.integers(1, 255, size=10, dtype=np.uint8)
+    image = Image.fromarray(colors[rng.integers(0, len(colors), size=(64, 64))], "RGBA")
+    mode, pixels = decode(encode_png(image, PngOptions(indexed=True, verify=False)))
+    assert mode == "P"
+    np.testing.assert_array_equal(pixels, np.asarray(image))
+
+
+def test_images_with_too_many_colours_fall_back_to_rgba():
+    pixels = np.random.default_rng(2).integers(0, 256, size=(64, 64, 4), dtype=np.uint8)
+    image = Image.fromarray(pixels, "RGBA")
+    assert to_indexed(image) is None
+    mode, decoded = decode(encode_png(image, PngOptions(indexed=True)))
+    assert mode == "RGBA"
+    np.testing.assert_array_equal(decoded, pixels)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from src.skin_creator.face import central_box, locate_face, locate_faces
+from src.skin_creator.photo import derive_from_photo
+
+SKIN_TONES = [(225, 180, 150), (141, 85, 36), (255, 224, 196)]
+
+
+def portrait(size, centre, radius, skin):
+    """A blue-grey backdrop with an elliptical skin-coloured face at ``centre``."""
+
+    rng = np.random.default_rng(0)
+    width, height = size
+    pixels = np.empty((height, width, 3), dtype=np.float32)
+    pixels[:] = (70, 110, 160)
+    pixels += rng.normal(0, 6, pixels.shape)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+    x, y = centre
+    ImageDraw.Draw(image).ellipse((x - radius, y - 1.2 * radius, x + radius, y + 1.2 * radius), fill=skin)
+    return image
+
+
+@pytest.mark.parametrize("skin", SKIN_TONES)
+def test_off_centre_face_is_inside_the_box(skin):
+    image = portrait((384, 256), (300, 150), 50, skin)
+    left, top, right, bottom = locate_face(image)
+    assert right - left == bottom - top
+    assert left <= 300 - 25 and right >= 300 + 25
+    assert top <= 150 - 25 and bottom >= 150 + 25
+    assert 0 <= left and right <= 384 and 0 <= top and bottom <= 256
+
+
+def test_batch_matches_single_photos():
+    images = [portrait((384, 256), (x, 128), 40, SKIN_TONES[0]) for x in (80, 190, 300)]
+    images.append(portrait((192, 256), (96, 100), 40, SKIN_TONES[1]))
+    assert locate_faces(images) == [locate_face(image) for image in images]
+
+
+def test_photo_without_skin_falls_back_to_central_box():
+    image = Image.new("RGB", (400, 300), (30, 80, 200))
+    assert locate_face(image, fallback_ratio=0.6) == central_box(image.size, 0.6)
+
+
+@pytest.mark.parametrize("size", [(1, 1), (1, 50), (50, 1)])
+def test_too_thin_photos_use_central_box(size):
+    assert locate_face(Image.new("RGB", size, (200, 150, 120))) == central_box(size)
+
+
+@pytest.mark.parametrize("size", [(1, 1), (1, 50), (50, 1), (2, 2), (3, 3)])
+def test_tiny_photos_still_derive(size):
+    pixels = np.random.default_rng(1).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    palette, tile = derive_from_photo(Image.fromarray(pixels, "RGB"))
+    assert tile.size == (8, 8)
+    assert palette.skin[3] == 255
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from src.skin_creator import ingest as ingest_module
+from src.skin_creator.bench import synthetic_jpeg
+from src.skin_creator.export import PngOptions, encode_png
+from src.skin_creator.ingest import STAGES, ingest_photos, iter_photos
+from src.skin_creator.photo import PhotoSkinGenerator, load_photo
+from src.skin_creator.sinks import SkinSink
+
+WORKERS = {stage: 2 for stage in STAGES}
+
+
+class ListSink(SkinSink):
+    def __init__(self, fail_on=None):
+        self.written = []
+        self.closed = False
+        self.fail_on = fail_on
+
+    def write(self, name, data, meta):
+        if name == self.fail_on:
+            raise OSError("disk full")
+        self.written.append((name, data))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def photos(tmp_path):
+    for index in range(5):
+        folder = tmp_path / ("b" if index % 2 else "a")
+        folder.mkdir(exist_ok=True)
+        (folder / f"p{index}.jpg").write_bytes(synthetic_jpeg((160 + 40 * index, 120), seed=index))
+    return tmp_path
+
+
+def test_skins_are_written_in_input_order(photos, monkeypatch):
+    # The first photo's decode waits until every later photo has been decoded.
+    later_done = threading.Event()
+    decoded = []
+
+    def gated_load(source):
+        decoded.append(None)
+        if len(decoded) == 1:
+            assert later_done.wait(10)
+        elif len(decoded) == 5:
+            later_done.set()
+        return load_photo(source)
+
+    monkeypatch.setattr(ingest_module, "load_photo", gated_load)
+    listed = list(iter_photos(photos))
+    sink = ListSink()
+    result = ingest_photos(listed, sink, seed=4, workers=WORKERS)
+    assert [name for name, _ in sink.written] == [name for name, _ in listed]
+    assert [name for name, _ in listed] == ["a/p0.png", "a/p2.png", "a/p4.png", "b/p1.png", "b/p3.png"]
+    assert (result.count, result.failed, sink.closed) == (5, 0, True)
+    for (name, data), (_, path) in zip(sink.written, listed):
+        assert data == encode_png(PhotoSkinGenerator(path, seed=4).generate(), PngOptions())
+
+
+def test_a_failing_stage_records_the_photo_and_the_rest_go_on(photos, monkeypatch):
+    derive_from_photo = ingest_module.derive_from_photo
+    doomed = load_photo(photos / "b" / "p1.jpg").size  # the photos differ in size
+
+    def flaky_derive(image, **options):
+        if image.size == doomed:
+            raise RuntimeError("derive blew up")
+        return derive_from_photo(image, **options)
+
+    monkeypatch.setattr(ingest_module, "derive_from_photo", flaky_derive)
+    (photos / "a" / "p2.jpg").write_bytes(b"not a photo")
+    listed = list(iter_photos(photos)) + [("gone.png", photos / "gone.jpg")]
+    sink = ListSink()
+    result = ingest_photos(listed, sink, seed=1, workers=WORKERS)
+    assert [name for name, _ in sink.written] == ["a/p0.png", "a/p4.png", "b/p3.png"]
+    assert result.count == 3
+    assert [(name, error.split(":")[0]) for name, error in result.failures] == [
+        ("a/p2.png", "ValueError"),
+        ("b/p1.png", "RuntimeError"),
+        ("gone.png", "FileNotFoundError"),
+    ]
+    assert result.failures[1][1] == "RuntimeError: derive blew up"
+
+
+def test_sink_errors_are_raised_after_winding_down(photos):
+    sink = ListSink(fail_on="a/p2.png")
+    with pytest.raises(OSError, match="disk full"):
+        ingest_photos(iter_photos(photos), sink, workers=WORKERS, max_in_flight=2)
+    assert [name for name, _ in sink.written] == ["a/p0.png"]
+    assert sink.closed
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("ingest-")]
+
+
+def test_listing_errors_are_raised(photos):
+    def listing():
+        yield from iter_photos(photos)
+        raise OSError("listing failed")
+
+    sink = ListSink()
+    with pytest.raises(OSError, match="listing failed"):
+        ingest_photos(listing(), sink, workers=WORKERS)
+    assert sink.closed
@@ -0,0 +1,59 @@
+import pytest
+
+from src.skin_creator.engine import accent_indices, role_map
+from src.skin_creator.generator import SkinGenerator, TemplateCache
+from src.skin_creator.layout import FACE_FRONT, LAYOUT_NAMES, PARTS, SkinLayout, _cube, get_layout
+from src.skin_creator.palette import base_palettes
+
+
+@pytest.mark.parametrize("name", LAYOUT_NAMES)
+def test_faces_index_by_name_attribute_and_constant(name):
+    layout = get_layout(name)
+    for part in PARTS:
+        faces = getattr(layout, part)
+        if faces is None:
+            continue
+        assert faces["front"] == faces.front == faces[FACE_FRONT]
+        assert dict(zip(faces._fields, faces)) == {field: faces[field] for field in faces._fields}
+
+
+def test_faces_unknown_name_raises_key_error():
+    with pytest.raises(KeyError):
+        get_layout().head["side"]
+
+
+def test_default_layout_is_classic():
+    layout = SkinLayout()
+    classic = get_layout("classic")
+    assert layout.name == "classic" and layout.size == (64, 64)
+    assert (layout.boxes == classic.boxes).all()
+    assert layout.head["front"] == (8, 8, 16, 16)
+
+
+def test_legacy_layout_has_no_second_layer_parts():
+    legacy = get_layout("legacy")
+    assert legacy.left_arm is None and legacy.body_overlay is None
+    assert (legacy.boxes[PARTS.index("left_arm")] == -1).all()
+
+
+def test_equal_layouts_share_cached_maps():
+    classic = get_layout("classic")
+    assert SkinLayout() == classic and hash(SkinLayout()) == hash(classic)
+    assert SkinLayout() != get_layout("slim")
+    role_map(classic)
+    before = role_map.cache_info().currsize
+    for _ in range(5):
+        assert role_map(SkinLayout()) is role_map(classic)
+        assert accent_indices(SkinLayout()) is accent_indices(classic)
+    assert role_map.cache_info().currsize == before
+
+
+def test_custom_layout_named_classic_gets_its_own_template():
+    custom = SkinLayout(head=_cube(0, 0)._replace(front=(8, 8, 12, 12)))
+    assert custom.name == "classic" and custom != get_layout("classic")
+    cache = TemplateCache()
+    palette = base_palettes()["classic"]
+    shared = SkinGenerator(palette, seed=1, cache=cache).generate()
+    mine = SkinGenerator(palette, seed=1, cache=cache, layout=custom).generate()
+    assert cache.stats().misses == 2
+    assert mine.tobytes() != shared.tobytes()
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from src.skin_creator.library import PaletteLibrary, palette_vectors
+from src.skin_creator.palette import Palette
+
+
+def random_library(count, seed=0):
+    rng = np.random.default_rng(seed)
+    colors = rng.integers(0, 256, size=(count, 5, 4), dtype=np.uint8)
+    colors[..., 3] = 255
+    return PaletteLibrary([f"p{index}" for index in range(count)], colors)
+
+
+def brute_force(library, colors, k):
+    """``(distance, index)`` of the ``k`` nearest palettes, by per-colour delta E in float64."""
+
+    vectors = palette_vectors(library.colors).astype(np.float64).reshape(len(library), 5, 3)
+    query = palette_vectors(colors[None]).astype(np.float64).reshape(5, 3)
+    delta_e = np.linalg.norm(vectors - query, axis=2)
+    distances = np.sqrt((delta_e**2).mean(axis=1))
+    return sorted(zip(distances, range(len(library))))[:k]
+
+
+@pytest.mark.parametrize("k", [1, 5])
+def test_nearest_matches_brute_force(k):
+    library = random_library(3000)
+    queries = np.random.default_rng(1).integers(0, 256, size=(25, 5, 4), dtype=np.uint8)
+    indices, distances = library.nearest_many(queries, k)
+    for query, row, row_distances in zip(queries, indices, distances):
+        expected = brute_force(library, query, k)
+        assert list(row) == [index for _, index in expected]
+        np.testing.assert_allclose(row_distances, [distance for distance, _ in expected], rtol=1e-9, atol=1e-9)
+
+
+def test_nearest_returns_match_objects():
+    library = random_library(50)
+    query = library.palette(7)
+    [match] = library.nearest(query)
+    assert (match.name, match.palette, match.distance) == ("p7", query, 0.0)
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4])
+def test_ties_come_in_library_order(k):
+    library = random_library(400, seed=2)
+    colors = np.array(library.colors)
+    for index in (350, 12, 200):
+        colors[index] = colors[300]
+    library = PaletteLibrary(library.names, colors)
+    indices, distances = library.nearest_many(colors[300][None], k)
+    assert list(indices[0]) == [12, 200, 300, 350][:k]
+    assert list(distances[0]) == [0.0] * k
+
+
+def test_ties_at_the_kth_place_keep_the_lowest_indices():
+    base = Palette(*[(10 * field, 20, 30, 255) for field in range(5)])
+    far = Palette(*[(10 * field, 20, 90, 255) for field in range(5)])
+    library = PaletteLibrary.from_palettes({f"far{index}": far for index in range(6)} | {"base": base})
+    names = [match.name for match in library.nearest(base, k=3)]
+    assert names == ["base", "far0", "far1"]
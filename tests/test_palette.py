@@ -0,0 +1,10 @@
+from src.skin_creator.palette import base_palettes, resolve_palette
+
+
+def test_base_palettes_returns_a_dict_callers_may_change():
+    palettes = base_palettes()
+    classic = palettes["classic"]
+    palettes["mine"] = palettes.pop("classic")
+    assert "classic" in base_palettes() and "mine" not in base_palettes()
+    assert base_palettes()["classic"] is classic
+    assert resolve_palette("classic") == classic
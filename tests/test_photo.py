@@ -0,0 +1,76 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import astuple
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.skin_creator.bench import synthetic_photo
+from src.skin_creator.photo import PHOTO_DECODE_SIDE, _histogram_colors, derive_palette_from_photo, load_photo
+from src.skin_creator.profiling import Profiler
+from tests.test_face import SKIN_TONES, portrait
+
+# derive_palette_from_photo output before face boxes existed; the default
+# brightness assignment must keep producing it.
+LEGACY_PALETTES = {
+    0: [(181, 125, 103), (112, 84, 137), (184, 159, 133), (187, 84, 124), (215, 175, 149)],
+    2: [(140, 128, 118), (112, 85, 136), (207, 152, 125), (182, 69, 134), (214, 177, 150)],
+}
+
+
+@pytest.mark.parametrize("seed", sorted(LEGACY_PALETTES))
+def test_default_palette_assignment_is_unchanged(seed):
+    palette = derive_palette_from_photo(synthetic_photo((320, 240), seed=seed).convert("RGBA"))
+    assert [color[:3] for color in astuple(palette)] == LEGACY_PALETTES[seed]
+
+
+def test_face_box_alone_does_not_change_the_palette():
+    image = synthetic_photo((320, 240), seed=0).convert("RGBA")
+    assert derive_palette_from_photo(image, face_box=(0, 0, 40, 40)) == derive_palette_from_photo(image)
+
+
+@pytest.mark.parametrize("skin", SKIN_TONES)
+def test_face_skin_takes_skin_from_the_face(skin):
+    image = portrait((384, 256), (300, 150), 50, skin)
+    palette = derive_palette_from_photo(image, face_skin=True)
+    assert np.linalg.norm(np.subtract(palette.skin[:3], skin)) < 24
+
+
+@pytest.mark.parametrize(
+    "format, mode", [("PNG", "RGB"), ("PNG", "RGBA"), ("WEBP", "RGB"), ("GIF", "P"), ("JPEG", "RGB")]
+)
+@pytest.mark.parametrize("size", [(1000, 600), (400, 1300), (401, 385)])
+def test_load_photo_stays_within_its_size_bound(format, mode, size):
+    buffer = io.BytesIO()
+    synthetic_photo(size).convert(mode).save(buffer, format=format)
+    image = load_photo(io.BytesIO(buffer.getvalue()))
+    assert image.mode == "RGBA"
+    assert PHOTO_DECODE_SIDE <= min(image.size) < 2 * PHOTO_DECODE_SIDE
+    assert abs(image.width / image.height - size[0] / size[1]) < 0.05
+
+
+def test_load_photo_keeps_small_photos():
+    buffer = io.BytesIO()
+    synthetic_photo((300, 150)).save(buffer, format="PNG")
+    assert load_photo(io.BytesIO(buffer.getvalue())).size == (300, 150)
+
+
+def test_histogram_quantizer_is_deterministic():
+    photo = synthetic_photo((320, 240), seed=0)
+    expected = [(214, 176, 150), (183, 74, 132), (108, 120, 134), (111, 74, 138), (197, 119, 102), (153, 128, 112)]
+    assert _histogram_colors(photo) == expected
+    # Only the histogram matters: not the alpha channel, nor where the pixels are.
+    assert _histogram_colors(photo.convert("RGBA")) == expected
+    assert _histogram_colors(photo.transpose(Image.Transpose.TRANSPOSE)) == expected
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(_histogram_colors, [photo] * 8)) == [expected] * 8
+    palettes = {derive_palette_from_photo(photo, quantizer="histogram") for _ in range(3)}
+    assert len(palettes) == 1
+
+
+@pytest.mark.parametrize("quantizer, pixels", [("mediancut", 96 * 96), ("histogram", 320 * 240)])
+def test_quantize_stage_reports_the_pixels_it_samples(quantizer, pixels):
+    with Profiler() as profiler:
+        derive_palette_from_photo(synthetic_photo((320, 240)), quantizer=quantizer)
+    assert [(record.name, record.pixels) for record in profiler.records] == [("photo.quantize", pixels)]
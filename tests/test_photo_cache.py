@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+from src.skin_creator.bench import synthetic_jpeg
+from src.skin_creator.photo import PhotoCache, PhotoSkinGenerator, derive_from_photo, load_photo
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / "portrait.jpg"
+    path.write_bytes(synthetic_jpeg((320, 240)))
+    return path
+
+
+def test_cached_entry_round_trips_face_box(tmp_path, photo):
+    cache = PhotoCache(tmp_path / "cache")
+    palette, tile, face_box = cache.derive(photo)
+    key = cache.key(photo.read_bytes())
+    loaded_palette, loaded_tile, loaded_box = cache.load(key)
+    assert loaded_palette == palette
+    assert loaded_tile.tobytes() == tile.tobytes()
+    assert loaded_box == face_box
+
+
+def test_generator_face_box_agrees_with_cached_tile(tmp_path, photo):
+    cache = PhotoCache(tmp_path / "cache")
+    cache.derive(photo)
+    generator = PhotoSkinGenerator(photo, seed=1, cache=cache)
+    uncached = PhotoSkinGenerator(photo, seed=1)
+    assert generator.face_box == uncached.face_box
+    assert generator.face_tile.tobytes() == uncached.face_tile.tobytes()
+    palette, tile = derive_from_photo(load_photo(io.BytesIO(photo.read_bytes())), face_box=generator.face_box)
+    assert tile.tobytes() == generator.face_tile.tobytes()
+    assert palette == generator.palette
+
+
+def test_entries_record_and_check_the_cache_version(tmp_path, photo):
+    cache = PhotoCache(tmp_path / "cache", version=7)
+    cache.derive(photo)
+    key = cache.key(photo.read_bytes())
+    path = next(cache.directory.glob("*/*.bin"))
+    assert cache.load(key) is not None
+    other = PhotoCache(tmp_path / "cache", version=8)
+    other.directory = cache.directory
+    assert other.load(key) is None
+    assert path.exists()
+
+
+def test_failed_store_leaves_no_temporary_file(tmp_path, photo, monkeypatch):
+    cache = PhotoCache(tmp_path / "cache")
+    palette, tile, face_box = cache.derive(photo)
+    cache.clear()
+
+    def fail(source, target):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("src.skin_creator.photo.os.replace", fail)
+    with pytest.raises(OSError):
+        cache.store("ab" * 32, palette, tile, face_box)
+    assert list(cache.directory.rglob("*")) == [cache.directory / "ab"]
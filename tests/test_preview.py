@@ -0,0 +1,108 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.skin_creator.generator import SkinGenerator
+from src.skin_creator.layout import get_layout
+from src.skin_creator.palette import base_palettes
+from src.skin_creator.preview import (
+    VIEW_NAMES,
+    iter_contact_sheets,
+    preview_size,
+    projection_table,
+    render_isometric,
+    render_thumbnail,
+)
+
+PALETTES = base_palettes()
+
+
+def skin_png(name, seed, layout="classic"):
+    buffer = io.BytesIO()
+    SkinGenerator(palette=PALETTES[name], seed=seed, layout=layout).generate().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def naive_render(pixels, table):
+    """Walk each pixel's texels nearest first and take the first visible one."""
+
+    width, height = table.size
+    out = np.zeros((height * width, 4), dtype=np.uint8)
+    flat = pixels.reshape(-1, 4)
+    for layer in reversed(table.layers):
+        for entry in range(layer.start, layer.stop):
+            pixel, texel = table.pixel[entry], flat[table.index[entry]]
+            if out[pixel, 3] or not (table.opaque[entry] or texel[3]):
+                continue
+            out[pixel, :3] = (texel[:3].astype(np.uint16) * table.shade[entry]) >> 8
+            out[pixel, 3] = 255
+    return out.reshape(height, width, 4)
+
+
+@pytest.mark.parametrize("layout", ["classic", "slim", "legacy"])
+@pytest.mark.parametrize("view", VIEW_NAMES)
+def test_projection_table_is_well_formed(layout, view):
+    skin_layout = get_layout(layout)
+    table = projection_table(skin_layout, view, 2)
+    width, height = table.size
+    assert table.size == preview_size(2)
+    assert 0 <= table.index.min() and table.index.max() < skin_layout.size[0] * skin_layout.size[1]
+    assert 0 <= table.pixel.min() and table.pixel.max() < width * height
+    assert table.layers[0].start == 0 and table.layers[-1].stop == len(table.index)
+    for layer in table.layers:
+        assert len(np.unique(table.pixel[layer])) == layer.stop - layer.start
+    assert projection_table(get_layout(layout), view, 2) is table
+
+
+@pytest.mark.parametrize("layout", ["classic", "slim", "legacy"])
+@pytest.mark.parametrize("view", VIEW_NAMES)
+def test_render_matches_naive_walk(layout, view):
+    skin_layout = get_layout(layout)
+    rng = np.random.default_rng(7)
+    width, height = skin_layout.size
+    pixels = rng.integers(0, 256, (3, height, width, 4), dtype=np.uint8)
+    pixels[..., 3] = rng.choice([0, 255], (3, height, width))
+    rendered = render_isometric(pixels, skin_layout, view, 2)
+    assert rendered.shape == (3, *preview_size(2)[::-1], 4)
+    table = projection_table(skin_layout, view, 2)
+    for skin, preview in zip(pixels, rendered):
+        assert (preview == naive_render(skin, table)).all()
+
+
+def test_transparent_overlay_shows_the_base():
+    layout = get_layout("classic")
+    pixels = np.zeros((1, 64, 64, 4), dtype=np.uint8)
+    pixels[0, 8:16, 8:16] = (200, 100, 40, 0)  # head front, alpha ignored on the base layer
+    preview = render_isometric(pixels, layout, "front", 4)[0]
+    assert set(np.unique(preview[..., 3])) == {0, 255}
+    expected = (np.array([200, 100, 40]) * 205) >> 8
+    assert (preview[..., :3].reshape(-1, 3) == expected).all(axis=1).sum() > 16 * 16
+
+
+def test_contact_sheets_tile_thumbnails_in_order():
+    items = [(f"s{index}", skin_png("classic", index)) for index in range(3)]
+    items.insert(1, ("broken", b"not a png"))
+    items.append(("legacy", skin_png("forest", 9, layout="legacy")))
+    sheets = list(iter_contact_sheets(items, columns=2, rows=1, square="classic", workers=1, background=(1, 2, 3, 255)))
+    tile_width, tile_height = preview_size()[0] * len(VIEW_NAMES), preview_size()[1]
+    assert [sheet.names for sheet in sheets] == [["s0", "s1"], ["s2", "legacy"]]
+    sources = dict(items)
+    for sheet in sheets:
+        assert sheet.image.size == (2 * tile_width, tile_height) and sheet.columns == 2
+        for column, name in enumerate(sheet.names):
+            tile = np.asarray(sheet.image.crop((column * tile_width, 0, (column + 1) * tile_width, tile_height)))
+            with Image.open(io.BytesIO(sources[name])) as skin:
+                expected = np.asarray(render_thumbnail(skin))
+            assert (tile == np.where(expected[..., 3:] > 0, expected, (1, 2, 3, 255))).all()
+
+
+def test_last_sheet_only_has_the_rows_it_needs():
+    items = [(f"s{index}", skin_png("forest", index)) for index in range(3)]
+    [sheet] = iter_contact_sheets(items, columns=2, rows=5, square="classic", workers=1)
+    width, height = preview_size()
+    assert sheet.image.size == (2 * width * len(VIEW_NAMES), 2 * height)
+    empty = np.asarray(sheet.image)[height:, width * len(VIEW_NAMES):]
+    assert not empty.any()
+
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+from src.skin_creator import server as server_module
+from src.skin_creator.palette import base_palettes
+from src.skin_creator.server import SkinServer, render_palette_skin
+
+
+async def request(port, target, method="GET", body=b"", raw=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+    writer.write(raw if raw is not None else head.encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, payload
+
+
+def run(scenario, **options):
+    async def main():
+        server = SkinServer(port=0, **options)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_identical_requests_render_once(monkeypatch):
+    gate = threading.Event()
+
+    def slow_render(*args):
+        gate.wait(5)
+        return render_palette_skin(*args)
+
+    monkeypatch.setattr(server_module, "render_palette_skin", slow_render)
+
+    async def scenario(server):
+        target = "/skin?palette=forest&seed=42"
+        tasks = [asyncio.create_task(request(server.port, target)) for _ in range(5)]
+        other = asyncio.create_task(request(server.port, "/skin?palette=forest&seed=43"))
+        for _ in range(500):
+            if server.renders + server.coalesced == 6:
+                break
+            await asyncio.sleep(0.01)
+        gate.set()
+        return await asyncio.gather(*tasks), await other, server.renders, server.coalesced
+
+    responses, other, renders, coalesced = run(scenario)
+    assert (renders, coalesced) == (2, 4)
+    expected = render_palette_skin(base_palettes()["forest"], 42)
+    assert [(status, payload) for status, _, payload in responses] == [(200, expected)] * 5
+    assert other[0] == 200 and other[2] != expected
+
+
+def test_responses_are_streamed_in_chunks(monkeypatch):
+    monkeypatch.setattr(server_module, "CHUNK_SIZE", 97)
+
+    async def scenario(server):
+        return await request(server.port, "/skin?palette=tech&seed=3&scale=2")
+
+    status, headers, payload = run(scenario)
+    assert status == 200 and headers["Content-Type"] == "image/png"
+    assert int(headers["Content-Length"]) == len(payload) > 97
+    assert payload == render_palette_skin(base_palettes()["tech"], 3, scale=2)
+
+
+def test_requests_without_a_seed_are_not_coalesced():
+    async def scenario(server):
+        await asyncio.gather(*(request(server.port, "/skin") for _ in range(3)))
+        return server.renders, server.coalesced
+
+    assert run(scenario) == (3, 0)
+
+
+def test_slow_client_gets_a_timeout():
+    async def scenario(server):
+        return await request(server.port, "", raw=b"GET /skin?seed=1 HTTP/1.1\r\nHost: loc")
+
+    status, _, payload = run(scenario, timeout=0.2)
+    assert status == 408 and b"not received" in payload
+
+
+def test_bad_requests_are_reported():
+    async def scenario(server):
+        return [
+            (await request(server.port, target, method))[0]
+            for target, method in [("/skin?seed=x", "GET"), ("/nope", "GET"), ("/skin", "POST"), ("/photo", "POST")]
+        ]
+
+    assert run(scenario) == [400, 404, 405, 400]
@@ -0,0 +1,47 @@
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from src.skin_creator.sinks import ArchiveSink, SkinSink
+
+SKINS = [("a.png", b"\x89PNG first", {"seed": 1}), ("nested/b.png", b"\x89PNG second", {"seed": 2})]
+
+
+def write_archive(path):
+    with ArchiveSink(path) as sink:
+        for name, data, meta in SKINS:
+            sink.write(name, data, meta)
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".tar", ".tar.gz", ".tgz"])
+def test_identical_batches_give_identical_archives(tmp_path, suffix):
+    first = write_archive(tmp_path / f"one{suffix}")
+    assert write_archive(tmp_path / f"two{suffix}") == first
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".tar.gz"])
+def test_archive_entries_and_manifest(tmp_path, suffix):
+    path = tmp_path / f"skins{suffix}"
+    write_archive(path)
+    if suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            contents = {name: archive.read(name) for name in archive.namelist()}
+    else:
+        with tarfile.open(path) as archive:
+            contents = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    assert contents == {name: data for name, data, _ in SKINS}
+    manifest = [json.loads(line) for line in (tmp_path / f"skins{suffix}.manifest.jsonl").read_text().splitlines()]
+    assert [(record["name"], record["seed"], record["bytes"]) for record in manifest] == [
+        (name, meta["seed"], len(data)) for name, data, meta in SKINS
+    ]
+
+
+def test_sink_without_write_cannot_be_created():
+    class Incomplete(SkinSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,28 @@
+from src.skin_creator.generator import CacheStats, TemplateCache
+
+
+def test_peek_counts_hits_and_misses():
+    cache = TemplateCache(maxsize=2)
+    assert cache.peek("a") is None
+    assert cache.get("a", lambda: 1) == 1
+    assert cache.peek("a") == 1
+    assert cache.stats() == CacheStats(hits=1, misses=2, evictions=0, size=1, maxsize=2)
+
+
+def test_put_keeps_the_first_value_and_evicts_without_counting_lookups():
+    cache = TemplateCache(maxsize=2)
+    assert cache.put("a", 1) == 1
+    assert cache.put("a", 2) == 1
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert cache.peek("a") is None
+    assert cache.stats() == CacheStats(hits=0, misses=1, evictions=1, size=2, maxsize=2)
+
+
+def test_clear_resets_counters():
+    cache = TemplateCache(maxsize=1)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("b", lambda: 2)
+    cache.clear()
+    assert cache.stats() == CacheStats(hits=0, misses=0, evictions=0, size=0, maxsize=1)
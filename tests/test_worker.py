@@ -0,0 +1,88 @@
+import io
+import json
+import threading
+
+import pytest
+
+from src.skin_creator import worker as worker_module
+from src.skin_creator.bench import synthetic_jpeg
+from src.skin_creator.export import PngOptions, encode_png
+from src.skin_creator.generator import SkinGenerator
+from src.skin_creator.palette import base_palettes
+from src.skin_creator.worker import JsonLinesWorker
+
+
+def serve(lines, **options):
+    out = io.StringIO()
+    stats = JsonLinesWorker(**options).serve(io.StringIO("".join(line + "\n" for line in lines)), out)
+    return stats, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_results_come_back_in_input_order(tmp_path, monkeypatch):
+    # The first job's encode waits until every later job has been encoded.
+    later_done = threading.Event()
+    encoded = []
+
+    def gated_encode(image, options=PngOptions()):
+        if not encoded:
+            encoded.append(None)
+            assert later_done.wait(10)
+        else:
+            encoded.append(None)
+            if len(encoded) == 5:
+                later_done.set()
+        return encode_png(image, options)
+
+    monkeypatch.setattr(worker_module, "encode_png", gated_encode)
+    lines = [json.dumps({"id": index, "out": str(tmp_path / f"{index}.png"), "seed": index}) for index in range(5)]
+    stats, results = serve(lines, workers=2)
+    assert [result["id"] for result in results] == list(range(5))
+    assert all(result["ok"] for result in results)
+    assert (stats.count, stats.failed) == (5, 0)
+
+
+def test_output_matches_the_generator(tmp_path):
+    stats, [result] = serve([json.dumps({"id": "a", "out": str(tmp_path / "a.png"), "palette": "forest", "seed": 3})])
+    expected = encode_png(SkinGenerator(palette=base_palettes()["forest"], seed=3).generate(), PngOptions())
+    assert result["out"] == str((tmp_path / "a.png").resolve())
+    assert result["bytes"] == len(expected)
+    assert (tmp_path / "a.png").read_bytes() == expected
+    assert set(result["timings_ms"]) == {"decode", "render", "encode", "total"}
+
+
+def test_bad_jobs_get_error_lines_and_the_rest_still_run(tmp_path):
+    lines = [
+        json.dumps({"id": 1, "out": str(tmp_path / "1.png"), "seed": 1}),
+        "{not json",
+        json.dumps({"id": 2, "out": str(tmp_path / "2.png"), "palette": "no-such-palette"}),
+        json.dumps({"id": 3, "out": str(tmp_path / "3.png"), "photo": str(tmp_path / "missing.jpg")}),
+        json.dumps({"id": 4, "seed": 1}),
+        "",
+        json.dumps({"id": 5, "out": str(tmp_path / "5.png"), "photo": str(tmp_path / "me.jpg"), "seed": 5}),
+    ]
+    (tmp_path / "me.jpg").write_bytes(synthetic_jpeg((160, 120)))
+    stats, results = serve(lines, workers=2)
+    assert [(result["id"], result["ok"]) for result in results] == [
+        (1, True),
+        (None, False),
+        (2, False),
+        (3, False),
+        (4, False),
+        (5, True),
+    ]
+    errors = [result["error"] for result in results if not result["ok"]]
+    assert errors[0].startswith("JSONDecodeError: ")
+    assert errors[2].startswith("FileNotFoundError: ")
+    assert errors[3] == "ValueError: job needs an 'out' path"
+    assert (stats.count, stats.failed) == (6, 4)
+    assert sorted(path.name for path in tmp_path.glob("*.png")) == ["1.png", "5.png"]
+
+
+def test_failing_stdout_raises(tmp_path):
+    class Broken(io.StringIO):
+        def write(self, text):
+            raise OSError("pipe closed")
+
+    lines = "".join(json.dumps({"id": index, "out": str(tmp_path / f"{index}.png")}) + "\n" for index in range(3))
+    with pytest.raises(RuntimeError, match="pipe closed"):
+        JsonLinesWorker(workers=1).serve(io.StringIO(lines), Broken())